@@ -5,12 +5,14 @@ from functools import partial
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFileDialog, QListWidget, QFrame, QLabel, QScrollArea,
-    QSizePolicy
+    QSizePolicy, QListWidgetItem
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
+from hvac_batch import BatchRunner, ChannelSummary
+
 
 class HVAC_GUI(QMainWindow):
     def __init__(self):
@@ -46,6 +48,15 @@ class HVAC_GUI(QMainWindow):
         # Track the currently selected button
         self.selected_button = None
 
+        # Batch processing of loaded files
+        self.batch_runner = None
+        self.file_items = {}  # path -> QListWidgetItem
+        self.pending = {}  # path -> Future
+        self.results = {}  # path -> processed file summary
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(100)
+        self.progress_timer.timeout.connect(self.poll_batch)
+
     def create_sidebar(self):
         """ Create a sidebar with optimized button & text spacing """
         sidebar_widget = QWidget()
@@ -53,19 +64,29 @@ class HVAC_GUI(QMainWindow):
         sidebar_layout.setSpacing(5)
 
         # File Upload Section
-        self.file_button = QPushButton("Load Data File")
+        self.file_button = QPushButton("Load Data Files")
         self.file_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         self.file_button.clicked.connect(self.load_file)
 
         self.file_list = QListWidget()
-        self.file_list.setFixedHeight(60)
+        self.file_list.setFixedHeight(100)
+
+        # Compare mode & clear buttons
+        file_actions = QHBoxLayout()
+        self.compare_button = QPushButton("Compare: Side by side")
+        self.compare_button.clicked.connect(self.toggle_compare_mode)
+        self.clear_button = QPushButton("Clear")
+        self.clear_button.clicked.connect(self.clear_files)
+        file_actions.addWidget(self.compare_button)
+        file_actions.addWidget(self.clear_button)
 
         sidebar_layout.addWidget(self.file_button)
         sidebar_layout.addWidget(self.file_list)
+        sidebar_layout.addLayout(file_actions)
 
         # Processing Sections
         self.sections = {
-            "Data Pre-processing": [``
+            "Data Pre-processing": [
                 "Voltage (V)", "Current (I)", "Power (P)",
                 "Temp (T)", "Vibration", "Frequency", "Flow Rate"
             ],
@@ -127,6 +148,7 @@ class HVAC_GUI(QMainWindow):
             self.reset_buttons()
             self.graph_widget.update_title("Select an option to display")
             self.selected_button = None
+            self.graph_widget.set_channel(None)
             button.style().unpolish(button)  # 🔹 Force UI Refresh
             button.style().polish(button)  # 🔹 Refresh after resetting
             return
@@ -136,6 +158,8 @@ class HVAC_GUI(QMainWindow):
 
         # Update Graph Title
         self.graph_widget.update_title(f"{section} - {option}")
+        if section == "Data Pre-processing":
+            self.graph_widget.set_channel(option)
 
         # Highlight Selected Button
         button.setStyleSheet(self.selected_button_style())
@@ -178,17 +202,73 @@ class HVAC_GUI(QMainWindow):
         )
 
     def load_file(self):
-        """ Open file dialog to select a data file """
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Open File", "", "CSV Files (*.csv);;Excel Files (*.xlsx);;"
+        """ Open file dialog to select data files and process them in the background """
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Open Files", "", "CSV Files (*.csv);;Excel Files (*.xlsx);;"
             "All Files (*)"
         )
 
-        if file_path:
-            file_name = os.path.basename(file_path)
-            self.file_list.clear()
-            self.file_list.addItem(file_name)
-            self.graph_widget.plot_data_from_file(file_path)
+        if self.batch_runner is None and file_paths:
+            self.batch_runner = BatchRunner()
+
+        for file_path in file_paths:
+            if file_path in self.file_items:
+                continue
+            item = QListWidgetItem(f"{os.path.basename(file_path)} - queued")
+            self.file_list.addItem(item)
+            self.file_items[file_path] = item
+            self.pending[file_path] = self.batch_runner.submit(file_path)
+
+        if self.pending:
+            self.progress_timer.start()
+
+    def poll_batch(self):
+        """ Update per-file progress and collect finished files """
+        for file_path, fraction in self.batch_runner.poll_progress().items():
+            if file_path in self.pending:
+                self.file_items[file_path].setText(
+                    f"{os.path.basename(file_path)} - {fraction:.0%}")
+
+        finished = [path for path, future in self.pending.items() if future.done()]
+        for file_path in finished:
+            future = self.pending.pop(file_path)
+            name = os.path.basename(file_path)
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                self.file_items[file_path].setText(f"{name} - failed: {future.exception()}")
+                continue
+            result = future.result()
+            self.results[file_path] = result
+            self.file_items[file_path].setText(f"{name} - done ({result['rows']} rows)")
+
+        if finished:
+            self.graph_widget.plot_results(self.results)
+        if not self.pending:
+            self.progress_timer.stop()
+
+    def toggle_compare_mode(self):
+        """ Switch between side by side and aggregated comparison """
+        mode = "aggregated" if self.graph_widget.compare_mode == "side" else "side"
+        self.compare_button.setText(
+            "Compare: Aggregated" if mode == "aggregated" else "Compare: Side by side")
+        self.graph_widget.compare_mode = mode
+        self.graph_widget.plot_results(self.results)
+
+    def clear_files(self):
+        """ Forget all loaded files and cancel the ones still being processed """
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.results.clear()
+        self.file_items.clear()
+        self.file_list.clear()
+        self.graph_widget.plot_results(self.results)
+
+    def closeEvent(self, event):
+        if self.batch_runner is not None:
+            self.batch_runner.shutdown()
+        super().closeEvent(event)
 
 
 class GraphWidget(QWidget):
@@ -209,13 +289,55 @@ class GraphWidget(QWidget):
         self.canvas = FigureCanvas(self.figure)
         layout.addWidget(self.canvas, stretch=95)
 
-        self.ax.set_facecolor('white')  
+        self.ax.set_facecolor('white')
         self.canvas.draw()
 
+        self.channel = None
+        self.compare_mode = "side"
+        self.results = {}
+
     def update_title(self, title):
         """ Update the label above the graph """
         self.title_label.setText(title)
 
+    def set_channel(self, channel):
+        """ Select the channel plotted for every loaded file """
+        self.channel = channel
+        self.plot_results(self.results)
+
+    def plot_results(self, results):
+        """ Plot the selected channel of every processed file """
+        self.results = results
+        self.figure.clear()
+
+        series = []
+        for path, result in results.items():
+            channels = result["channels"]
+            channel = self.channel if self.channel in channels else next(iter(channels), None)
+            if channel is not None:
+                series.append((os.path.basename(path), channel, channels[channel]))
+
+        if not series:
+            self.ax = self.figure.add_subplot(1, 1, 1)
+            self.ax.set_facecolor('white')
+        elif self.compare_mode == "aggregated":
+            self.ax = self.figure.add_subplot(1, 1, 1)
+            for name, channel, summary in series:
+                self.ax.plot(summary.positions, summary.samples, label=f"{name}: {channel}")
+            pooled = ChannelSummary.pooled(summary for _, _, summary in series)
+            self.ax.set_title(
+                f"{len(series)} files - mean {pooled.mean:.2f}, std {pooled.std:.2f}, "
+                f"min {pooled.minimum:.2f}, max {pooled.maximum:.2f}")
+            self.ax.legend(fontsize="small")
+        else:
+            axes = self.figure.subplots(1, len(series), sharey=True, squeeze=False)[0]
+            for ax, (name, channel, summary) in zip(axes, series):
+                ax.plot(summary.positions, summary.samples)
+                ax.set_title(f"{name}\n{channel}: mean {summary.mean:.2f}", fontsize="small")
+            self.ax = axes[0]
+
+        self.canvas.draw_idle()
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
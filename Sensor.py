@@ -1,29 +1,79 @@
 import paho.mqtt.client as mqtt
+import os
 import time
 import random
 import json
+import threading
+import numpy as np
+from hvac_spool import Spool, SPOOL_CAPACITY
+from hvac_edge import EdgeBuffer
+from hvac_broker import create_client, load_config
 
-# ✅ MQTT Broker Settings
-MQTT_BROKER = "mqtt.eclipseprojects.io"
-MQTT_PORT = 1883
+# ✅ MQTT Broker Settings, from ymal.py and the environment
+BROKER_CONFIG = load_config()
+MQTT_BROKER = BROKER_CONFIG["host"]
+MQTT_PORT = BROKER_CONFIG["port"]
 MQTT_TOPIC = "hvac/sensor"
 SEND_INTERVAL = 2  # Time in seconds between messages
+MQTT_QOS = int(os.environ.get("HVAC_MQTT_QOS", 1))  # 1: the broker acknowledges every reading
+CLIENT_ID = os.environ.get("HVAC_SENSOR_ID", "hvac-sensor-1")  # Fixed, so the broker keeps our session
 
-# ✅ Create MQTT Client
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+# ✅ Offline Buffering
+SPOOL_PATH = os.environ.get("HVAC_SPOOL_PATH", "sensor_spool.bin")
+DRAIN_BATCH = 500  # Spooled readings published at once after a reconnect
+PUBLISH_TIMEOUT = 10  # Seconds to wait for a drained batch to be acknowledged
 
-# ✅ Ensure robust connection to the broker
-def connect_mqtt():
-    while True:
-        try:
-            client.connect(MQTT_BROKER, MQTT_PORT, 60)
-            print(f"✅ Connected to MQTT Broker: {MQTT_BROKER}")
-            return
-        except Exception as e:
-            print(f"❌ Connection failed: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
+# ✅ Edge Mode: sample at a high rate and publish one compressed batch per interval
+EDGE_MODE = os.environ.get("HVAC_EDGE_MODE", "")  # "raw" sample blocks or "aggregate" windows, "" for single readings
+EDGE_SAMPLE_RATE = int(os.environ.get("HVAC_EDGE_RATE", 1000))  # Samples per second of every channel
+EDGE_WINDOW = 100  # ms per aggregate window (min, max, mean, RMS)
+
+# ✅ Create MQTT Client with a persistent session, paho reconnects by itself
+client = create_client(client_id=CLIENT_ID, clean_session=False, config=BROKER_CONFIG)
+client.max_inflight_messages_set(DRAIN_BATCH)
+client.reconnect_delay_set(min_delay=1, max_delay=30)
+spool = Spool(SPOOL_PATH, SPOOL_CAPACITY)
+connected = threading.Event()
+drain_requested = threading.Event()
+
+def on_connect(client, userdata, flags, reason_code, properties):
+    if reason_code == 0:
+        print(f"✅ Connected to MQTT Broker: {MQTT_BROKER}")
+        connected.set()
+        drain_requested.set()
+    else:
+        print(f"❌ Connection refused: {reason_code}")
+
+# ✅ MQTT Disconnection Handling
+def on_disconnect(client, userdata, disconnect_flags, reason_code, properties):
+    connected.clear()
+    print(f"⚠️ Disconnected from MQTT Broker ({reason_code})! Buffering readings until reconnected...")
 
-connect_mqtt()
+client.on_connect = on_connect
+client.on_disconnect = on_disconnect
+
+# ✅ Publish spooled readings in bulk whenever connected
+def drain_spool():
+    while True:
+        drain_requested.wait()
+        drain_requested.clear()
+        started, sent = time.monotonic(), 0
+        while connected.is_set() and len(spool):
+            payloads, position = spool.peek(DRAIN_BATCH)
+            messages = [client.publish(MQTT_TOPIC, payload, qos=MQTT_QOS) for payload in payloads]
+            try:
+                for message in messages:
+                    message.wait_for_publish(PUBLISH_TIMEOUT)
+                if not all(message.is_published() for message in messages):
+                    break  # Kept in the spool, published again on the next drain
+            except (RuntimeError, ValueError):
+                break
+            spool.pop(payloads, position)  # Less those dropped by appends meanwhile
+            sent += len(payloads)
+        if sent:
+            elapsed = max(time.monotonic() - started, 1e-9)
+            print(f"📦 Drained {sent} spooled readings in {elapsed:.2f}s ({sent / elapsed:,.0f} readings/s), "
+                  f"{len(spool)} left")
 
 # ✅ Simulated Sensor Data Categories
 data_categories = {
@@ -36,28 +86,75 @@ data_categories = {
     "Flow Rate": lambda: round(random.uniform(10, 100), 2),
 }
 
-# ✅ MQTT Disconnection Handling
-def on_disconnect(client, userdata, rc):
-    print(f"⚠️ Disconnected from MQTT Broker! Reconnecting...")
-    connect_mqtt()
+# ✅ The same categories as blocks of `n` samples taken at EDGE_SAMPLE_RATE from `t0` seconds
+rng = np.random.default_rng()
+block_generators = {
+    "Voltage (V)": lambda t0, n: rng.uniform(200, 240, n),
+    "Current (I)": lambda t0, n: rng.uniform(5, 15, n),
+    "Power (P)": lambda t0, n: rng.uniform(500, 2000, n),
+    "Frequency (F)": lambda t0, n: rng.uniform(49, 51, n),
+    # Vibration of a 50 Hz rotating machine with broadband noise
+    "Vibration": lambda t0, n: 2.5 * np.sin(2 * np.pi * 50 * (t0 + np.arange(n) / EDGE_SAMPLE_RATE))
+                               + rng.normal(0, 0.5, n),
+    "Temp (T)": lambda t0, n: rng.uniform(20, 35, n),
+    "Flow Rate": lambda t0, n: rng.uniform(10, 100, n),
+}
 
-client.on_disconnect = on_disconnect
+# ✅ Publish a payload, or spool it while disconnected or catching up
+def publish_or_spool(payload, description):
+    if connected.is_set() and not len(spool):
+        message = client.publish(MQTT_TOPIC, payload, qos=MQTT_QOS)
+        if message.rc == mqtt.MQTT_ERR_SUCCESS:
+            print(f"📤 Sent: {description}")
+            return
+        print(f"❌ Publish failed ({mqtt.error_string(message.rc)})")
+    spool.append(payload if isinstance(payload, bytes) else payload.encode())
+    drain_requested.set()
+    print(f"💾 Spooled ({len(spool)} waiting): {description}")
 
-try:
+def run_edge():
+    buffer = EdgeBuffer(block_generators, EDGE_SAMPLE_RATE)
+    samples = int(EDGE_SAMPLE_RATE * SEND_INTERVAL)
     while True:
-        # ✅ Collect sensor readings
-        sensor_values = {category: generator() for category, generator in data_categories.items()}
-        payload = json.dumps(sensor_values)  # Convert to JSON
-        
-        # ✅ Publish sensor data
-        try:
-            client.publish(MQTT_TOPIC, payload)
-            print(f"📤 Sent: {payload}")
-        except Exception as e:
-            print(f"❌ Publish failed: {e}")
-        
-        time.sleep(SEND_INTERVAL)  # Wait before sending next batch
-
-except KeyboardInterrupt:
-    print("\n🚦 Sensor Simulation Stopped")
-    client.disconnect()
+        # ✅ Sample the last interval into the local buffers
+        t0 = time.time()
+        block = np.stack([generate(t0, samples) for generate in block_generators.values()])
+        buffer.extend(int(t0 * 1000), block)
+
+        # ✅ Publish them as one compressed batch
+        if EDGE_MODE == "raw":
+            count = len(buffer)
+            payload = buffer.pack_raw(spool.next_seq(count), device=CLIENT_ID)
+        else:
+            count = buffer.windows(EDGE_WINDOW)
+            payload = buffer.pack_aggregate(spool.next_seq(count), EDGE_WINDOW, device=CLIENT_ID)
+        publish_or_spool(payload, f"{EDGE_MODE} batch of {count} x {len(block_generators)} values, {len(payload)} bytes")
+
+        time.sleep(max(SEND_INTERVAL - (time.time() - t0), 0))
+
+if __name__ == "__main__":
+    client.connect_async(MQTT_BROKER, MQTT_PORT, 60)
+    client.loop_start()
+    threading.Thread(target=drain_spool, daemon=True).start()
+
+    try:
+        if EDGE_MODE:
+            run_edge()
+        while True:
+            # ✅ Collect sensor readings, timestamped and numbered so spooled ones keep their place
+            sensor_values = {category: generator() for category, generator in data_categories.items()}
+            sensor_values["timestamp"] = int(time.time() * 1000)
+            sensor_values["seq"] = spool.next_seq()
+            sensor_values["device"] = CLIENT_ID
+            payload = json.dumps(sensor_values)  # Convert to JSON
+
+            # ✅ Publish sensor data
+            publish_or_spool(payload, payload)
+
+            time.sleep(SEND_INTERVAL)  # Wait before sending next batch
+
+    except KeyboardInterrupt:
+        print("\n🚦 Sensor Simulation Stopped")
+        client.disconnect()
+        client.loop_stop()
+        spool.close()
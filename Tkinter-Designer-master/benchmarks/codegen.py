@@ -0,0 +1,219 @@
+"""
+Code generation benchmark on synthetic Figma designs.
+
+Generates a frame with the requested number of nodes, spread over every
+element type handled by `Frame.create_element`, and replays its Figma
+responses offline. Creating the Frame, fetching its images, rendering its
+code and writing it to disk through `Frame.write_code` are timed separately,
+and the peak memory of each phase is measured in a second, traced run.
+Without a baseline to compare against the benchmark fails.
+
+    python -m benchmarks.codegen --sizes 10 1000 50000 --save-baseline
+    python -m benchmarks.codegen --sizes 10 1000 50000  # fails on regression
+"""
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from PIL import Image
+
+from tkdesigner.figma.endpoints import Files
+from tkdesigner.figma.frame import Frame
+from tkdesigner.replay import FixtureArchive, ReplaySession
+
+API_URL = "http://figma.invalid/v1"
+IMAGE_URL = "http://figma.invalid/assets"
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+PHASES = ("create", "fetch", "render", "write")
+
+# Element names cycled through, as matched by `Frame.create_element`.
+ELEMENT_NAMES = (
+    "Button", "ButtonHover", "TextBox", "TextArea", "Image",
+    "Rectangle", "Line", "Text", "Vector",
+)
+
+
+def make_node(index, name):
+    x, y = (index * 17) % 1000, (index * 31) % 800
+    node = {
+        "id": f"1:{index}",
+        "name": name,
+        "type": "RECTANGLE",
+        "absoluteBoundingBox": {"x": x, "y": y, "width": 40, "height": 20},
+        "fills": [{"color": {"r": 0.2, "g": 0.4, "b": 0.6, "a": 1}}],
+    }
+    if name == "ButtonHover":
+        # On top of the Button created just before it.
+        node["absoluteBoundingBox"] = make_node(index - 1, "Button")["absoluteBoundingBox"]
+    elif name == "Line":
+        node.update(type="LINE", strokeWeight=1,
+                    strokes=[{"color": {"r": 0, "g": 0, "b": 0, "a": 1}}])
+    elif name == "Text":
+        node.update(type="TEXT", characters=f"Label {index}", style={
+            "fontFamily": "Inter", "fontSize": 14, "textCase": "ORIGINAL"})
+    elif name == "Vector":
+        node["type"] = "VECTOR"
+    return node
+
+
+def make_frame_node(nodes):
+    return {
+        "id": "0:1", "name": "Frame", "type": "FRAME",
+        "absoluteBoundingBox": {"x": 0, "y": 0, "width": 1000, "height": 800},
+        "children": [
+            make_node(i, ELEMENT_NAMES[i % len(ELEMENT_NAMES)])
+            for i in range(nodes)
+        ],
+    }
+
+
+def png_bytes(index, size=(32, 32)):
+    content = io.BytesIO()
+    Image.new("RGB", size, (index % 256, index // 256 % 256, 128)).save(
+        content, format="PNG")
+    return content.getvalue()
+
+
+def make_archive(frame_node, path, distinct_images=64):
+    """Record the /images responses and image bytes of every image node.
+    """
+    ids = [
+        child["id"] for child in frame_node["children"]
+        if child["name"] in ("Button", "ButtonHover", "TextBox", "TextArea", "Image")
+    ]
+    images = [png_bytes(i) for i in range(distinct_images)]
+    figma_file = Files("token", "KEY")
+
+    with FixtureArchive(path, "w") as archive:
+        for start in range(0, len(ids), figma_file.IMAGE_BATCH_SIZE):
+            batch = ids[start:start + figma_file.IMAGE_BATCH_SIZE]
+            urls = {id_: f"{IMAGE_URL}/{id_}.png" for id_ in batch}
+            archive.add(
+                f"{API_URL}/images/KEY?ids={','.join(batch)}&scale=2",
+                json.dumps({"images": urls}).encode(),
+                content_type="application/json")
+        for i, id_ in enumerate(ids):
+            archive.add(f"{IMAGE_URL}/{id_}.png", images[i % distinct_images],
+                        content_type="image/png")
+
+
+def run_phases(frame_node, archive_path, output_path):
+    """Run each phase once, yielding its name after it finishes.
+    """
+    with ReplaySession(archive_path) as session:
+        figma_file = Files("token", "KEY", session)
+        figma_file.API_ENDPOINT_URL = API_URL
+
+        frame = Frame(frame_node, figma_file, output_path, fetch_images=False)
+        yield "create"
+        frame.fetch_images()
+        yield "fetch"
+        frame.to_code()
+        yield "render"
+        # The path `Designer.design` takes, code streamed as it is rendered.
+        frame.write_code(output_path / "gui.py")
+        yield "write"
+
+
+def measure(nodes, workdir: Path, repeat=3) -> dict:
+    """Return seconds, nodes per second and peak traced memory per phase,
+    timings being the fastest of `repeat` runs.
+    """
+    frame_node = make_frame_node(nodes)
+    archive_path = workdir / f"figma_{nodes}.zip"
+    make_archive(frame_node, archive_path)
+
+    seconds = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for phase in run_phases(frame_node, archive_path, workdir / f"timed_{nodes}"):
+            end = time.perf_counter()
+            seconds[phase] = min(seconds.get(phase, end - start), end - start)
+            start = time.perf_counter()
+    results = {
+        phase: {"seconds": s, "nodes_per_second": nodes / max(s, 1e-9)}
+        for phase, s in seconds.items()}
+
+    tracemalloc.start()
+    try:
+        for phase in run_phases(frame_node, archive_path, workdir / f"traced_{nodes}"):
+            results[phase]["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.reset_peak()
+    finally:
+        tracemalloc.stop()
+
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """Return a message for every phase whose throughput dropped by more than
+    `threshold` (a fraction) compared to `baseline`.
+    """
+    regressions = []
+    for nodes, phases in results.items():
+        for phase, result in phases.items():
+            expected = baseline.get(nodes, {}).get(phase, {}).get("nodes_per_second")
+            if expected and result["nodes_per_second"] < expected * (1 - threshold):
+                regressions.append(
+                    f"{phase} with {nodes} nodes: {result['nodes_per_second']:.0f} "
+                    f"nodes/s, baseline {expected:.0f} nodes/s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark code generation on synthetic Figma designs.")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 1000, 50000],
+        help="Number of nodes of each synthetic design.")
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE_PATH,
+        help="Baseline results to compare against.")
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="Store these results as the new baseline instead of comparing.")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Timed runs per design, the fastest is reported.")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="Tolerated throughput drop against the baseline (fraction).")
+    args = parser.parse_args(argv)
+
+    results = {}
+    # Element creation logs every element, keep that out of the report.
+    with tempfile.TemporaryDirectory() as workdir, \
+            open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for nodes in args.sizes:
+            results[str(nodes)] = measure(nodes, Path(workdir), args.repeat)
+
+    print(f"{'nodes':>8} {'phase':>8} {'seconds':>10} {'nodes/s':>12} {'peak MB':>9}")
+    for nodes, phases in results.items():
+        for phase, result in phases.items():
+            print(f"{nodes:>8} {phase:>8} {result['seconds']:>10.4f} "
+                  f"{result['nodes_per_second']:>12.0f} {result['peak_mb']:>9.2f}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=1))
+        print(f"\nBaseline saved to {args.baseline}.")
+        return 0
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline first.")
+        return 1
+
+    regressions = find_regressions(
+        results, json.loads(args.baseline.read_text()), args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
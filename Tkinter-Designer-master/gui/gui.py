@@ -68,7 +68,10 @@ def btn_clicked():
         if not response:
             return
 
-    designer = Designer(token, file_key, output)
+    # This module builds the window at import time, which process-pool
+    # workers would re-run on platforms that spawn them, so images are
+    # processed in-thread here.
+    designer = Designer(token, file_key, output, image_workers=0)
     designer.design()
 
     tk.messagebox.showinfo(
@@ -0,0 +1,116 @@
+import io
+import json
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from PIL import Image
+
+
+def png_bytes(size=(8, 8), color=(255, 0, 0)):
+    content = io.BytesIO()
+    Image.new("RGB", size, color).save(content, format="PNG")
+    return content.getvalue()
+
+
+def prune(node, depth):
+    """Return `node` without descendants deeper than `depth` levels.
+    """
+    node = dict(node)
+    if depth <= 0:
+        node.pop("children", None)
+    elif "children" in node:
+        node["children"] = [prune(child, depth - 1) for child in node["children"]]
+    return node
+
+
+class FigmaStub:
+    """Local stand-in for the Figma REST API and its image CDN.
+    """
+
+    def __init__(self):
+        self.file_data = {"document": {"children": [{"children": []}]}}
+        self.requests = []
+        # Number of upcoming `/images` requests answered with 429.
+        self.rate_limited = 0
+        # Status of every API response when set, as for a wrong token.
+        self.refused = None
+        # Image color of node ids; others get a color derived from the id.
+        self.image_colors = {}
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(self.path)
+                status, content_type, body = stub.handle(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def handle(self, path):
+        url = urlparse(path)
+        if self.refused and url.path.startswith("/v1/"):
+            body = {"status": self.refused, "err": "Invalid token"}
+            return self.refused, "application/json", json.dumps(body).encode()
+        if url.path.startswith("/v1/files/") and url.path.endswith("/nodes"):
+            ids = parse_qs(url.query)["ids"][0].split(",")
+            nodes = {id_: {"document": self.find_node(id_)} for id_ in ids}
+            return 200, "application/json", json.dumps({"nodes": nodes}).encode()
+        if url.path.startswith("/v1/files/"):
+            file_data = dict(self.file_data)
+            if "depth" in parse_qs(url.query):
+                depth = int(parse_qs(url.query)["depth"][0])
+                file_data["document"] = prune(file_data["document"], depth)
+            return 200, "application/json", json.dumps(file_data).encode()
+        if url.path.startswith("/v1/images/"):
+            with self._lock:
+                if self.rate_limited:
+                    self.rate_limited -= 1
+                    return 429, "text/plain", b"rate limited"
+            ids = parse_qs(url.query)["ids"][0].split(",")
+            images = {id_: f"{self.url}/assets/{id_}.png" for id_ in ids}
+            return 200, "application/json", json.dumps({"images": images}).encode()
+        if url.path.startswith("/assets/"):
+            id_ = url.path[len("/assets/"):-len(".png")]
+            color = self.image_colors.get(id_)
+            if color is None:
+                color = tuple(zlib.crc32(id_.encode()).to_bytes(4, "big")[:3])
+            return 200, "image/png", png_bytes(color=color)
+        return 404, "text/plain", b"not found"
+
+    def find_node(self, id_):
+        nodes = [self.file_data["document"]]
+        while nodes:
+            node = nodes.pop()
+            if node.get("id") == id_:
+                return node
+            nodes.extend(node.get("children", []))
+
+    def requests_to(self, prefix):
+        return [path for path in self.requests if path.startswith(prefix)]
+
+
+@pytest.fixture
+def figma_stub():
+    stub = FigmaStub()
+    thread = threading.Thread(
+        target=stub.server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
@@ -0,0 +1,27 @@
+from benchmarks.codegen import PHASES, find_regressions, main, measure
+
+
+def test_benchmark_measures_every_phase(tmp_path):
+    results = measure(20, tmp_path)
+
+    assert tuple(results) == PHASES
+    assert all(r["seconds"] > 0 and r["peak_mb"] > 0 for r in results.values())
+    assert (tmp_path / "timed_20" / "gui.py").exists()
+
+
+def test_find_regressions():
+    baseline = {"10": {"render": {"nodes_per_second": 1000}}}
+
+    slower = {"10": {"render": {"nodes_per_second": 700}}}
+    assert len(find_regressions(slower, baseline, threshold=0.25)) == 1
+    assert find_regressions(slower, baseline, threshold=0.5) == []
+    assert find_regressions({"20": slower["10"]}, baseline, threshold=0.25) == []
+
+
+def test_missing_baseline_fails(tmp_path):
+    argv = ["--sizes", "10", "--repeat", "1",
+            "--baseline", str(tmp_path / "baseline.json")]
+    assert main(argv) == 1
+
+    assert main(argv + ["--save-baseline"]) == 0
+    assert main(argv + ["--threshold", "1"]) == 0
@@ -0,0 +1,143 @@
+import copy
+import json
+
+from tkdesigner.cache import BuildCache
+from tkdesigner.designer import Designer
+from tkdesigner.figma import endpoints
+
+from test_frame import bbox, make_frame_node
+
+
+def make_document(frame_count=2, images=2):
+    frames = [
+        make_frame_node([
+            {"id": f"{f}:{i}", "name": "Image", "type": "RECTANGLE",
+             "absoluteBoundingBox": bbox()}
+            for i in range(images)
+        ])
+        for f in range(frame_count)
+    ]
+    for f, frame in enumerate(frames):
+        frame["id"] = f"0:{f}"
+    return {"version": "1", "document": {"children": [{"children": frames}]}}
+
+
+def design(figma_stub, tmp_path, monkeypatch, use_cache=True, **options):
+    monkeypatch.setattr(
+        endpoints.Files, "API_ENDPOINT_URL", f"{figma_stub.url}/v1")
+    figma_stub.requests.clear()
+    Designer("token", "KEY", tmp_path, use_cache=use_cache, **options).design()
+
+
+def test_unchanged_file_is_not_regenerated(figma_stub, tmp_path, monkeypatch):
+    figma_stub.file_data = make_document()
+    design(figma_stub, tmp_path, monkeypatch)
+    mtime = (tmp_path / "gui.py").stat().st_mtime_ns
+
+    design(figma_stub, tmp_path, monkeypatch)
+
+    assert figma_stub.requests == ["/v1/files/KEY?depth=1"]
+    assert (tmp_path / "gui.py").stat().st_mtime_ns == mtime
+
+
+def test_only_changed_frame_is_regenerated(figma_stub, tmp_path, monkeypatch):
+    figma_stub.file_data = make_document()
+    design(figma_stub, tmp_path, monkeypatch)
+    mtime = (tmp_path / "gui.py").stat().st_mtime_ns
+
+    document = copy.deepcopy(figma_stub.file_data)
+    document["version"] = "2"
+    frame = document["document"]["children"][0]["children"][1]
+    frame["children"][0]["absoluteBoundingBox"]["x"] = 50
+    figma_stub.file_data = document
+    design(figma_stub, tmp_path, monkeypatch)
+
+    assert figma_stub.requests_to("/assets/") == ["/assets/1:0.png"]
+    assert (tmp_path / "gui.py").stat().st_mtime_ns == mtime
+    assert "    55,\n" in (tmp_path / "gui1.py").read_text()
+
+
+def test_no_cache_regenerates_everything(figma_stub, tmp_path, monkeypatch):
+    figma_stub.file_data = make_document()
+    design(figma_stub, tmp_path, monkeypatch)
+
+    design(figma_stub, tmp_path, monkeypatch, use_cache=False)
+
+    assert len(figma_stub.requests_to("/assets/")) == 4
+
+
+def test_deleted_output_is_regenerated(figma_stub, tmp_path, monkeypatch):
+    figma_stub.file_data = make_document()
+    design(figma_stub, tmp_path, monkeypatch)
+    (tmp_path / "gui1.py").unlink()
+
+    design(figma_stub, tmp_path, monkeypatch)
+
+    assert (tmp_path / "gui1.py").exists()
+    assert figma_stub.requests_to("/assets/") == []
+
+
+def test_changed_options_regenerate_everything(figma_stub, tmp_path, monkeypatch):
+    figma_stub.file_data = make_document()
+    design(figma_stub, tmp_path, monkeypatch)
+
+    design(figma_stub, tmp_path, monkeypatch, sprite_atlas=True)
+
+    assert len(figma_stub.requests_to("/assets/")) == 4
+    assert "load_image(" in (tmp_path / "gui.py").read_text()
+
+
+def test_deleted_frames_are_pruned(figma_stub, tmp_path, monkeypatch):
+    figma_stub.file_data = make_document(frame_count=3)
+    design(figma_stub, tmp_path, monkeypatch)
+
+    document = copy.deepcopy(figma_stub.file_data)
+    document["version"] = "2"
+    del document["document"]["children"][0]["children"][2]
+    document["document"]["children"][0]["children"][1]["id"] = "0:5"
+    figma_stub.file_data = document
+    design(figma_stub, tmp_path, monkeypatch)
+
+    cache = json.loads((tmp_path / BuildCache.FILE_NAME).read_text())
+    assert sorted(cache["frames"]) == ["0:0", "0:5"]
+    assert sorted(cache["images"]) == [
+        f"assets/frame{f}/image_{i}.png" for f in range(2) for i in (1, 2)]
+
+    design(figma_stub, tmp_path, monkeypatch)
+    assert figma_stub.requests == ["/v1/files/KEY?depth=1"]
+
+
+def test_identical_images_are_not_downloaded_again(
+        figma_stub, tmp_path, monkeypatch):
+    figma_stub.file_data = make_document(frame_count=1, images=3)
+    figma_stub.image_colors = {"0:0": (0, 0, 0), "0:1": (0, 0, 0)}
+    design(figma_stub, tmp_path, monkeypatch)
+    assets = tmp_path / "assets" / "frame0"
+    assert sorted(p.name for p in assets.iterdir()) == [
+        "image_1.png", "image_3.png"]
+
+    # Only the third image changed, the second is still the first one's.
+    document = copy.deepcopy(figma_stub.file_data)
+    document["version"] = "2"
+    frame = document["document"]["children"][0]["children"][0]
+    frame["children"][2]["absoluteBoundingBox"]["x"] = 50
+    figma_stub.file_data = document
+    design(figma_stub, tmp_path, monkeypatch)
+
+    assert figma_stub.requests_to("/assets/") == ["/assets/0:2.png"]
+    code = (tmp_path / "gui.py").read_text()
+    assert 'relative_to_assets("image_2.png")' not in code
+    assert code.count('relative_to_assets("image_1.png")') == 2
+
+    # The image it is identical to changed, both are downloaded again.
+    document = copy.deepcopy(document)
+    document["version"] = "3"
+    frame = document["document"]["children"][0]["children"][0]
+    frame["children"][0]["absoluteBoundingBox"]["x"] = 50
+    figma_stub.file_data = document
+    design(figma_stub, tmp_path, monkeypatch)
+
+    assert figma_stub.requests_to("/assets/") == [
+        "/assets/0:0.png", "/assets/0:1.png"]
+    cache = json.loads((tmp_path / BuildCache.FILE_NAME).read_text())
+    assert list(cache["aliases"]) == ["assets/frame0/image_2.png"]
@@ -0,0 +1,88 @@
+import pytest
+
+from tkdesigner.figma import endpoints
+
+
+def make_files(figma_stub):
+    figma_file = endpoints.Files("token", "KEY")
+    figma_file.API_ENDPOINT_URL = f"{figma_stub.url}/v1"
+    return figma_file
+
+
+def test_get_images_batches_ids(figma_stub):
+    figma_file = make_files(figma_stub)
+    figma_file.IMAGE_BATCH_SIZE = 10
+    ids = [f"1:{i}" for i in range(25)]
+
+    images = figma_file.get_images(ids + ids[:5])
+
+    assert sorted(images) == sorted(ids)
+    assert images["1:3"] == f"{figma_stub.url}/assets/1:3.png"
+    assert len(figma_stub.requests_to("/v1/images/")) == 3
+
+
+def test_get_images_retries_when_rate_limited(figma_stub):
+    figma_stub.rate_limited = 2
+
+    images = make_files(figma_stub).get_images(["1:1"])
+
+    assert images == {"1:1": f"{figma_stub.url}/assets/1:1.png"}
+    assert len(figma_stub.requests_to("/v1/images/")) == 3
+
+
+def test_get_image(figma_stub):
+    assert make_files(figma_stub).get_image("1:1").endswith("/assets/1:1.png")
+
+
+def make_document(pages=2, frames=3):
+    def frame(p, f):
+        return {"id": f"{p}:{f}", "name": "Frame", "type": "FRAME", "children": [
+            {"id": f"{p}:{f}:{i}", "name": "Rectangle", "type": "RECTANGLE"}
+            for i in range(2)
+        ]}
+    return {"version": "7", "document": {"id": "document", "children": [
+        {"id": f"{p}", "name": f"Page {p}", "type": "CANVAS",
+         "children": [frame(p, f) for f in range(frames)]}
+        for p in range(pages)
+    ]}}
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_get_file_page_loads_only_that_page(figma_stub, monkeypatch, streaming):
+    if not streaming:
+        monkeypatch.setattr(endpoints, "ijson", None)
+    figma_stub.file_data = make_document(frames=25)
+    figma_file = make_files(figma_stub)
+
+    file_data = figma_file.get_file_page(0)
+
+    assert file_data["version"] == "7"
+    pages = file_data["document"]["children"]
+    assert pages[0] == figma_stub.file_data["document"]["children"][0]
+    assert all("children" not in frame for frame in pages[1]["children"])
+    assert figma_stub.requests_to("/v1/files/")[0] == "/v1/files/KEY?depth=2"
+    assert len(figma_stub.requests_to("/v1/files/KEY/nodes")) == 3
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_refused_requests_raise_a_clear_error(
+        figma_stub, monkeypatch, streaming):
+    if not streaming:
+        monkeypatch.setattr(endpoints, "ijson", None)
+    figma_stub.refused = 403
+    figma_file = make_files(figma_stub)
+
+    for call in (figma_file.get_file,
+                 lambda: figma_file.get_images(["1:1"]),
+                 lambda: list(figma_file.iter_nodes(["1:1"]))):
+        with pytest.raises(RuntimeError, match="403: Invalid token"):
+            call()
+
+
+def test_get_images_gives_up_when_still_rate_limited(figma_stub):
+    figma_stub.rate_limited = 3
+    figma_file = make_files(figma_stub)
+    figma_file.MAX_RETRIES = 2
+
+    with pytest.raises(RuntimeError, match="429"):
+        figma_file.get_images(["1:1"])
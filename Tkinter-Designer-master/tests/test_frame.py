@@ -0,0 +1,198 @@
+import pytest
+from PIL import Image
+
+from tkdesigner.designer import Designer
+from tkdesigner.figma import endpoints
+from tkdesigner.figma.frame import Frame
+
+
+def bbox(x=0, y=0, width=10, height=10):
+    return {"x": x, "y": y, "width": width, "height": height}
+
+
+def make_frame_node(children):
+    return {
+        "id": "0:1", "name": "Frame", "type": "FRAME",
+        "absoluteBoundingBox": bbox(width=200, height=200),
+        "children": children,
+    }
+
+
+def make_files(figma_stub):
+    figma_file = endpoints.Files("token", "KEY")
+    figma_file.API_ENDPOINT_URL = f"{figma_stub.url}/v1"
+    return figma_file
+
+
+def test_frame_downloads_all_images(figma_stub, tmp_path):
+    children = [
+        {"id": f"1:{i}", "name": name, "type": "RECTANGLE",
+         "absoluteBoundingBox": bbox(x=i * 10)}
+        for i, name in enumerate(["Button", "Image", "TextBox", "Image"])
+    ]
+    frame = Frame(make_frame_node(children), make_files(figma_stub), tmp_path)
+
+    assets = tmp_path / "assets" / "frame0"
+    assert sorted(p.name for p in assets.iterdir()) == [
+        "button_1.png", "entry_1.png", "image_1.png", "image_2.png"]
+    assert len(frame.elements) == 4
+    assert len(figma_stub.requests_to("/v1/images/")) == 1
+    assert len(figma_stub.requests_to("/assets/")) == 4
+
+
+def test_frame_without_images_makes_no_requests(figma_stub, tmp_path):
+    children = [{"id": "1:1", "name": "Rectangle", "type": "RECTANGLE",
+                 "absoluteBoundingBox": bbox()}]
+    Frame(make_frame_node(children), make_files(figma_stub), tmp_path)
+
+    assert figma_stub.requests == []
+
+
+def test_designer_exports_images_of_all_frames_at_once(
+        figma_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        endpoints.Files, "API_ENDPOINT_URL", f"{figma_stub.url}/v1")
+    frames = [
+        make_frame_node([
+            {"id": f"{f}:{i}", "name": "Image", "type": "RECTANGLE",
+             "absoluteBoundingBox": bbox()}
+            for i in range(3)
+        ])
+        for f in range(4)
+    ]
+    figma_stub.file_data = {"document": {"children": [{"children": frames}]}}
+
+    Designer("token", "KEY", tmp_path).design()
+
+    assert len(figma_stub.requests_to("/v1/images/")) == 1
+    assert len(figma_stub.requests_to("/assets/")) == 12
+    assert sorted(p.name for p in tmp_path.glob("*.py")) == [
+        "gui.py", "gui1.py", "gui2.py", "gui3.py"]
+
+
+def test_frame_reuses_identical_images(figma_stub, tmp_path):
+    figma_stub.image_colors = {"1:0": (0, 0, 0), "1:1": (0, 0, 0)}
+    children = [
+        {"id": f"1:{i}", "name": "Image", "type": "RECTANGLE",
+         "absoluteBoundingBox": bbox(x=i * 10)}
+        for i in range(3)
+    ]
+    frame = Frame(make_frame_node(children), make_files(figma_stub), tmp_path)
+
+    assets = tmp_path / "assets" / "frame0"
+    assert sorted(p.name for p in assets.iterdir()) == [
+        "image_1.png", "image_3.png"]
+    assert [str(e.image_path) for e in frame.elements] == [
+        "image_1.png", "image_1.png", "image_3.png"]
+    assert 'relative_to_assets("image_1.png")' in frame.elements[1].to_code()
+
+
+def test_button_hover_is_matched_within_its_frame(figma_stub, tmp_path):
+    def children(frame):
+        return [
+            {"id": f"{frame}:{i}", "name": name, "type": "RECTANGLE",
+             "absoluteBoundingBox": bbox(x=20, y=20)}
+            for i, name in enumerate(["Button", "ButtonHover"])
+        ]
+    first = Frame(make_frame_node(children(1)), make_files(figma_stub), tmp_path, 0)
+    second = Frame(make_frame_node(children(2)), make_files(figma_stub), tmp_path, 1)
+
+    assert first.position_id_map == second.position_id_map == {(20, 20): "1"}
+    assert "button_1.bind('<Enter>'" in second.elements[1].to_code()
+
+    lonely = Frame(make_frame_node(children(3)[1:]), make_files(figma_stub), tmp_path, 2)
+    assert lonely.elements[0].to_code() == ""
+
+
+@pytest.mark.parametrize("partial", [True, False])
+def test_designer_output_follows_document_order(
+        figma_stub, tmp_path, monkeypatch, partial):
+    monkeypatch.setattr(
+        endpoints.Files, "API_ENDPOINT_URL", f"{figma_stub.url}/v1")
+    frames = []
+    for f in range(12):
+        frame = make_frame_node([
+            {"id": f"{f}:0", "name": "Image", "type": "RECTANGLE",
+             "absoluteBoundingBox": bbox()}
+        ])
+        frame["id"] = f"0:{f}"
+        frame["absoluteBoundingBox"]["width"] = 100 + f
+        frames.append(frame)
+    figma_stub.file_data = {"document": {"children": [{"children": frames}]}}
+
+    designer = Designer("token", "KEY", tmp_path, partial=partial)
+    designer.design()
+
+    assert designer.frameCounter == 12
+    for f in range(12):
+        code = tmp_path.joinpath("gui.py" if f == 0 else f"gui{f}.py").read_text()
+        assert f'window.geometry("{100 + f}x200")' in code
+        assert f"frame{f}" in code
+        assert (tmp_path / "assets" / f"frame{f}" / "image_1.png").exists()
+
+
+def test_write_code_streams_rendered_code(figma_stub, tmp_path):
+    children = [{"id": f"1:{i}", "name": "Rectangle", "type": "RECTANGLE",
+                 "absoluteBoundingBox": bbox(x=i)} for i in range(50)]
+    frame = Frame(make_frame_node(children), make_files(figma_stub), tmp_path)
+
+    frame.write_code(tmp_path / "gui.py")
+
+    code = (tmp_path / "gui.py").read_text(encoding="UTF-8")
+    assert code == frame.to_code()
+    assert code.count("canvas.create_rectangle(") == 50
+
+
+@pytest.mark.parametrize("lazy_images, sprite_atlas", [
+    (True, False), (False, True), (True, True)])
+def test_frame_with_image_loader(figma_stub, tmp_path, lazy_images, sprite_atlas):
+    children = [
+        {"id": f"1:{i}", "name": name, "type": "RECTANGLE",
+         "absoluteBoundingBox": bbox(x=x, y=20)}
+        for i, (name, x) in enumerate([
+            ("Button", 20), ("ButtonHover", 20), ("TextBox", 60),
+            ("Image", 100), ("Image", 500)])
+    ]
+    frame = Frame(make_frame_node(children), make_files(figma_stub), tmp_path,
+                  lazy_images=lazy_images, sprite_atlas=sprite_atlas)
+
+    code = frame.to_code()
+    compile(code, "gui.py", "exec")
+    assert "PhotoImage(\n    file=" not in code
+    assert 'button_image_1 = load_image("button_1.png")' in code
+    assert 'image=load_image("button_hover_1.png")' in code
+    assert 'canvas.itemconfig(\n    image_2, image=load_image("image_2.png"))' in code
+
+    atlas = tmp_path / "assets" / "frame0" / "sprites.png"
+    if sprite_atlas:
+        assert frame.sprites == {
+            "button_1.png": (0, 0, 4, 4), "button_hover_1.png": (4, 0, 4, 4),
+            "entry_1.png": (8, 0, 4, 4), "image_1.png": (12, 0, 4, 4),
+            "image_2.png": (16, 0, 4, 4)}
+        assert Image.open(atlas).size == (20, 4)
+        assert 'relative_to_assets("sprites.png")' in code
+    else:
+        assert not atlas.exists()
+        assert "SPRITES" not in code
+
+
+def test_designer_packs_sprite_atlases_of_concurrent_frames(
+        figma_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        endpoints.Files, "API_ENDPOINT_URL", f"{figma_stub.url}/v1")
+    frames = [
+        make_frame_node([
+            {"id": f"{f}:{i}", "name": "Image", "type": "RECTANGLE",
+             "absoluteBoundingBox": bbox(x=i * 10)}
+            for i in range(6)
+        ])
+        for f in range(8)
+    ]
+    figma_stub.file_data = {"document": {"children": [{"children": frames}]}}
+
+    Designer("token", "KEY", tmp_path, sprite_atlas=True,
+             image_workers=2).design()
+
+    for f in range(8):
+        atlas = tmp_path / "assets" / f"frame{f}" / "sprites.png"
+        assert Image.open(atlas).size == (24, 4)
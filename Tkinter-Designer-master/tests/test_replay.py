@@ -0,0 +1,76 @@
+import pytest
+import requests
+
+from tkdesigner import cli
+from tkdesigner.designer import Designer
+from tkdesigner.figma import endpoints
+from tkdesigner.replay import FixtureArchive, RecordingSession, ReplaySession
+from tkdesigner.utils import download_image
+
+from test_cache import make_document
+
+
+def read_outputs(path):
+    # Generated code refers to assets by absolute path.
+    return {
+        p.relative_to(path).as_posix(): p.read_bytes().replace(
+            str(path).encode(), b"<output>")
+        for p in sorted(path.rglob("*"))
+        if p.is_file() and p.name != ".tkdesigner_cache.json"
+    }
+
+
+def test_replay_reproduces_recorded_build(figma_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        endpoints.Files, "API_ENDPOINT_URL", f"{figma_stub.url}/v1")
+    figma_stub.file_data = make_document(frame_count=3, images=2)
+    archive = tmp_path / "figma.zip"
+
+    with RecordingSession(archive) as session:
+        Designer("token", "KEY", tmp_path / "recorded", session=session).design()
+    figma_stub.requests.clear()
+    with ReplaySession(archive) as session:
+        Designer("token", "KEY", tmp_path / "replayed", session=session).design()
+
+    assert figma_stub.requests == []
+    assert read_outputs(tmp_path / "replayed") == read_outputs(tmp_path / "recorded")
+
+
+def test_cli_replays_into_the_recorded_output(
+        figma_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        endpoints.Files, "API_ENDPOINT_URL", f"{figma_stub.url}/v1")
+    figma_stub.file_data = make_document(frame_count=2, images=1)
+    archive = tmp_path / "figma.zip"
+    output = tmp_path / "out"
+
+    for flag in ("--record", "--replay"):
+        monkeypatch.setattr("sys.argv", [
+            "tkdesigner", "-f", "-o", str(output), flag, str(archive),
+            "https://www.figma.com/file/KEY/Design", "token"])
+        recorded = read_outputs(output)  # Before the replay, those of the recording
+        figma_stub.requests.clear()
+        cli.main()
+
+    assert figma_stub.requests == []
+    assert read_outputs(output) == recorded
+
+
+def test_replay_of_unknown_url_fails(tmp_path):
+    with FixtureArchive(tmp_path / "empty.zip", "w"):
+        pass
+
+    with ReplaySession(tmp_path / "empty.zip") as session:
+        with pytest.raises(requests.ConnectionError):
+            download_image("http://example.com/a.png", tmp_path / "a.png", session)
+
+
+def test_archive_round_trip(tmp_path):
+    with FixtureArchive(tmp_path / "a.zip", "w") as archive:
+        archive.add("http://a/1", b"one", content_type="text/plain")
+        archive.add("http://a/2", b"two", status=404)
+
+    with FixtureArchive(tmp_path / "a.zip") as archive:
+        assert archive.get("http://a/1") == (200, "text/plain", b"one")
+        assert archive.get("http://a/2") == (404, None, b"two")
+        assert archive.get("http://a/3") is None
@@ -1,6 +1,12 @@
+import io
 import os
+from PIL import Image
 from tkdesigner.constants import ASSETS_PATH
-from tkdesigner.utils import find_between, download_image
+from tkdesigner.utils import (
+    find_between, download_image, process_image, ImageProcessor,
+    pack_sprite_atlas)
+
+from conftest import png_bytes
 
 
 def test_assets_path():
@@ -15,8 +21,57 @@ def test_find_between():
                         ) == "/someurl.com/"
 
 
-def test_download_image():
-    url = "https://www.python.org/static/opengraph-icon-200x200.png"
+def test_download_image(figma_stub):
+    url = f"{figma_stub.url}/assets/1:1.png"
     download_image(url, "test.png")
     assert os.path.exists("test.png")
     os.remove("test.png")
+
+
+def test_process_image_halves_size():
+    for optimize in (False, True):
+        content = process_image(png_bytes(size=(40, 20)), optimize)
+        assert Image.open(io.BytesIO(content)).size == (20, 10)
+
+
+def test_image_processor_writes_identical_images_once(tmp_path):
+    contents = [png_bytes(color=(1, 2, 3)), png_bytes(color=(1, 2, 3)),
+                png_bytes(color=(4, 5, 6))]
+
+    with ImageProcessor(max_workers=1) as processor:
+        paths = [
+            processor.save(content, tmp_path / f"{name}.png")
+            for name, content in zip("abc", contents)
+        ]
+
+    assert paths == [tmp_path / "a.png", tmp_path / "a.png", tmp_path / "c.png"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.png", "c.png"]
+
+
+def test_image_processor_waits_for_given_images(tmp_path):
+    with ImageProcessor(max_workers=1) as processor:
+        for name, color in (("a", (1, 2, 3)), ("b", (4, 5, 6))):
+            processor.save(png_bytes(color=color), tmp_path / f"{name}.png")
+
+        processor.wait([tmp_path / "a.png"])
+
+        assert (tmp_path / "a.png").exists()
+        assert list(processor._pending) == [tmp_path / "b.png"]
+    assert (tmp_path / "b.png").exists()
+
+
+def test_pack_sprite_atlas(tmp_path):
+    sizes = {"a": (30, 10), "b": (20, 20), "c": (30, 5), "big": (200, 10)}
+    for name, size in sizes.items():
+        tmp_path.joinpath(f"{name}.png").write_bytes(png_bytes(size=size))
+
+    boxes = pack_sprite_atlas(
+        [tmp_path / f"{name}.png" for name in sizes], tmp_path / "atlas.png",
+        max_size=128, width=50)
+
+    assert boxes == {
+        tmp_path / "b.png": (0, 0, 20, 20),
+        tmp_path / "a.png": (20, 0, 30, 10),
+        tmp_path / "c.png": (0, 20, 30, 5),
+    }
+    assert Image.open(tmp_path / "atlas.png").size == (50, 25)
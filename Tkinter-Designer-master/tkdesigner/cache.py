@@ -0,0 +1,136 @@
+"""
+Build cache used to regenerate only what changed since the last run.
+"""
+import json
+import hashlib
+
+from pathlib import Path
+
+
+def node_hash(node: dict) -> str:
+    """Return a digest of a Figma node and everything below it.
+    """
+    content = json.dumps(node, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    """Remembers the Figma file version, every generated frame and every
+    downloaded image of a build, stored next to the generated code.
+
+    When `enabled` is False every lookup reports a change, so everything is
+    regenerated, but the cache is still refreshed for the next build. A cache
+    made with different generation `options` is discarded. Entries of frames
+    and images not looked up during a build are dropped by `prune`.
+    """
+
+    FILE_NAME = ".tkdesigner_cache.json"
+
+    def __init__(self, output_path: Path, enabled=True, options=None):
+        self.output_path = output_path
+        self.path = output_path / self.FILE_NAME
+        self.enabled = enabled
+        # Frame ids and image keys looked up during this build.
+        self._seen_frames = set()
+        self._seen_images = set()
+
+        options = options or {}
+        self.data = {"version": None, "options": options, "frames": {},
+                     "images": {}, "aliases": {}}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="UTF-8"))
+            except ValueError:
+                data = {}  # Corrupted cache, rebuild everything.
+            if data.get("options", {}) == options:
+                self.data.update(data)
+
+    def save(self):
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.data, indent=1), encoding="UTF-8")
+
+    def _relative(self, path: Path) -> str:
+        return Path(path).relative_to(self.output_path).as_posix()
+
+    def is_current(self, version) -> bool:
+        """Whether the last build was made from `version` of the file and
+        all of its generated code is still there.
+        """
+        if not self.enabled or version is None:
+            return False
+        if version != self.data["version"]:
+            return False
+        return all(
+            (self.output_path / frame["code"]).exists()
+            for frame in self.data["frames"].values())
+
+    def set_version(self, version):
+        self.data["version"] = version
+
+    def frame_changed(self, node: dict, index: int, code_path: Path) -> bool:
+        self._seen_frames.add(node["id"])
+        entry = self.data["frames"].get(node["id"])
+        if not self.enabled or entry is None or not code_path.exists():
+            return True
+        current = (index, node_hash(node), self._relative(code_path))
+        return current != (entry["index"], entry["hash"], entry["code"])
+
+    def update_frame(self, node: dict, index: int, code_path: Path,
+                     image_paths=()):
+        """Record a generated frame along with the paths of all its images,
+        which are kept for as long as the frame is.
+        """
+        self.data["frames"][node["id"]] = {
+            "index": index,
+            "hash": node_hash(node),
+            "code": self._relative(code_path),
+            "images": [self._relative(path) for path in image_paths],
+        }
+
+    def image_changed(self, node: dict, image_path: Path) -> bool:
+        key = self._relative(image_path)
+        self._seen_images.add(key)
+        target, digest = self.data["aliases"].get(key, (key, None))
+        if not self.enabled or not (self.output_path / target).exists():
+            return True
+        if target != key and self.data["images"].get(target) != digest:
+            return True  # The image it was identical to changed since.
+        return self.data["images"].get(key) != node_hash(node)
+
+    def update_image(self, node: dict, image_path: Path):
+        key = self._relative(image_path)
+        self.data["images"][key] = node_hash(node)
+        self.data["aliases"].pop(key, None)
+
+    def alias_image(self, image_path: Path, target_path: Path):
+        """Record that the image at `image_path` was identical to the one at
+        `target_path`, so only the latter was written.
+        """
+        target = self._relative(target_path)
+        self.data["aliases"][self._relative(image_path)] = [
+            target, self.data["images"].get(target)]
+
+    def image_alias(self, image_path: Path) -> Path:
+        """Return the path the image at `image_path` was written to.
+        """
+        key = self._relative(image_path)
+        return self.output_path / self.data["aliases"].get(key, (key,))[0]
+
+    def prune(self):
+        """Drop the frames not looked up during this build, deleted or renamed
+        in Figma since, and the images no remaining frame uses.
+        """
+        frames = {
+            node_id: entry for node_id, entry in self.data["frames"].items()
+            if node_id in self._seen_frames}
+        used = self._seen_images.union(
+            *(entry.get("images", ()) for entry in frames.values()))
+        aliases = {
+            key: alias for key, alias in self.data["aliases"].items()
+            if key in used}
+        used.update(target for target, _ in aliases.values())
+        self.data["frames"] = frames
+        self.data["images"] = {
+            key: digest for key, digest in self.data["images"].items()
+            if key in used}
+        self.data["aliases"] = aliases
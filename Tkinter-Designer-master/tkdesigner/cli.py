@@ -3,6 +3,7 @@ TKinter Designer command-line interface.
 """
 
 from tkdesigner.designer import Designer
+from tkdesigner.replay import RecordingSession, ReplaySession
 
 import re
 import os
@@ -34,6 +35,39 @@ def main():
         help=(
             "If this flag is passed in, the output directory given "
             "will be overwritten if it exists."))
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help=(
+            "Regenerate all code and re-download all image assets, "
+            "even those unchanged since the last build."))
+    parser.add_argument(
+        "--optimize-images", action="store_true",
+        help=(
+            "Encode image assets with PNG optimization. "
+            "Smaller files, slower to generate."))
+
+    parser.add_argument(
+        "--lazy-images", action="store_true",
+        help=(
+            "Generate code loading images on first use: "
+            "hover and off-screen images are not loaded at startup."))
+    parser.add_argument(
+        "--sprite-atlas", action="store_true",
+        help=(
+            "Pack the small images of each frame into one sprite atlas "
+            "read once by the generated code. Implies lazy hover images."))
+
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument(
+        "--record", type=str, metavar="ARCHIVE",
+        help=(
+            "Save all Figma responses and images to this archive "
+            "while generating. Implies --no-cache."))
+    replay.add_argument(
+        "--replay", type=str, metavar="ARCHIVE",
+        help=(
+            "Generate offline from the responses saved with --record "
+            "instead of contacting Figma. Implies --no-cache."))
 
     parser.add_argument(
         "file_url", type=str, help="File url of the Figma design.")
@@ -66,8 +100,22 @@ def main():
                 print("Aborting!")
                 exit(-1)
 
-    designer = Designer(token, file_key, output_path)
-    designer.design()
+    session = None
+    if args.record:
+        session = RecordingSession(Path(args.record).expanduser())
+    elif args.replay:
+        session = ReplaySession(Path(args.replay).expanduser())
+
+    try:
+        designer = Designer(
+            token, file_key, output_path,
+            use_cache=not (args.no_cache or args.record or args.replay),
+            optimize_images=args.optimize_images, session=session,
+            lazy_images=args.lazy_images, sprite_atlas=args.sprite_atlas)
+        designer.design()
+    finally:
+        if session is not None:
+            session.close()
     print(f"\nProject successfully generated at {output_path}.\n")
 
 
@@ -1,2 +1,15 @@
 # Path to assets directory (i.e. images) relative to the output directory.
 ASSETS_PATH = "./assets"
+
+# Maximum number of image assets downloaded concurrently.
+DOWNLOAD_WORKERS = 8
+
+# Maximum number of frames generated concurrently.
+FRAME_WORKERS = 4
+
+# Sprite atlas of a frame's small images, when generating with sprite atlases.
+SPRITE_ATLAS_NAME = "sprites.png"
+# Images up to this many pixels wide and high are packed into the atlas.
+SPRITE_MAX_SIZE = 128
+# Width of the sprite atlas image in pixels.
+SPRITE_ATLAS_WIDTH = 2048
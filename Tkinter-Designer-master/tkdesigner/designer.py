@@ -1,38 +1,112 @@
 import tkdesigner.figma.endpoints as endpoints
 from tkdesigner.figma.frame import Frame
 
+from tkdesigner.cache import BuildCache
+from tkdesigner.constants import FRAME_WORKERS
 from tkdesigner.template import TEMPLATE
+from tkdesigner.utils import ImageProcessor
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 class Designer:
-    def __init__(self, token, file_key, output_path: Path):
+    def __init__(self, token, file_key, output_path: Path, use_cache=True,
+                 optimize_images=False, image_workers=None, partial=True,
+                 session=None, lazy_images=False, sprite_atlas=False):
         self.output_path = output_path
-        self.figma_file = endpoints.Files(token, file_key)
-        self.file_data = self.figma_file.get_file()
+        self.optimize_images = optimize_images
+        self.image_workers = image_workers
+        self.lazy_images = lazy_images
+        self.sprite_atlas = sprite_atlas
+        self.figma_file = endpoints.Files(token, file_key, session)
+        self.cache = BuildCache(output_path, enabled=use_cache, options={
+            "optimize_images": optimize_images,
+            "lazy_images": lazy_images,
+            "sprite_atlas": sprite_atlas,
+        })
+
+        # Only the file header is fetched when the last build is up to date.
+        self.file_data = None
+        self.version = None
+        if self.cache.enabled and self.cache.data["version"] is not None:
+            self.version = self.figma_file.get_file(depth=1).get("version")
+        if not self.cache.is_current(self.version):
+            # Only the first page is used, `partial` avoids loading the rest.
+            if partial:
+                self.file_data = self.figma_file.get_file_page(0)
+            else:
+                self.file_data = self.figma_file.get_file()
+            self.version = self.file_data.get("version")
         self.frameCounter = 0
 
-    def to_code(self) -> str:
-        """Return main code.
+    def code_path(self, index) -> Path:
+        # tutorials on youtube mention `python3 gui.py` added the below check to keep them valid
+        if (index == 0):
+            return self.output_path.joinpath("gui.py")
+        return self.output_path.joinpath(f"gui{index}.py")
+
+    def create_frame(self, index, node):
+        """Return the Frame of `node`, or None when unchanged since the last
+        cached build.
         """
-        frames = [];
-        for f in self.file_data["document"]["children"][0]["children"]:
-            try:
-                frame = Frame(f, self.figma_file, self.output_path, self.frameCounter)
-            except Exception:
-                raise Exception("Frame not found in figma file or is empty")
-            frames.append(frame.to_code(TEMPLATE))
-            self.frameCounter += 1
-        return frames
+        code_path = self.code_path(index)
+        if not self.cache.frame_changed(node, index, code_path):
+            return None
+        try:
+            frame = Frame(node, self.figma_file, self.output_path, index,
+                          fetch_images=False, cache=self.cache,
+                          lazy_images=self.lazy_images,
+                          sprite_atlas=self.sprite_atlas)
+        except Exception:
+            raise Exception("Frame not found in figma file or is empty")
+        self.cache.update_frame(node, index, code_path, frame.image_paths)
+        return frame
+
+    def generate(self, render) -> list:
+        """Return `render(index, frame)` of every frame, or None for frames
+        unchanged since the last cached build.
+
+        Frames are created, have their images downloaded and are rendered
+        concurrently; the result is in document order.
+        """
+        if self.file_data is None:
+            return [None] * len(self.cache.data["frames"])
+
+        nodes = self.file_data["document"]["children"][0]["children"]
+        indices = range(self.frameCounter, self.frameCounter + len(nodes))
+        self.frameCounter += len(nodes)
 
+        with ThreadPoolExecutor(max_workers=FRAME_WORKERS) as executor:
+            frames = list(executor.map(self.create_frame, indices, nodes))
+
+            # Export the images of every frame in as few requests as possible.
+            changed = [frame for frame in frames if frame is not None]
+            image_urls = self.figma_file.get_images(
+                item_id for frame in changed for item_id, _ in frame.downloads)
+
+            with ImageProcessor(self.image_workers, self.optimize_images) as processor:
+                def fetch_and_render(index, frame):
+                    if frame is None:
+                        return None
+                    frame.fetch_images(image_urls, processor)
+                    return render(index, frame)
+
+                return list(executor.map(fetch_and_render, indices, frames))
+
+    def to_code(self) -> list:
+        """Return main code of every frame, or None for frames unchanged
+        since the last cached build.
+        """
+        return self.generate(lambda index, frame: frame.to_code(TEMPLATE))
 
     def design(self):
         """Write code and assets to the specified directories.
         """
-        code = self.to_code()
-        for index in range(len(code)):
-            # tutorials on youtube mention `python3 gui.py` added the below check to keep them valid
-            if (index == 0):
-                self.output_path.joinpath("gui.py").write_text(code[index], encoding='UTF-8')
-            else:
-                self.output_path.joinpath(f"gui{index}.py").write_text(code[index], encoding='UTF-8')
+        # Code is streamed straight to each frame's file.
+        self.generate(
+            lambda index, frame: frame.write_code(self.code_path(index), TEMPLATE))
+
+        if self.file_data is not None:
+            self.cache.prune()
+        self.cache.set_version(self.version)
+        self.cache.save()
@@ -4,20 +4,29 @@ TEXT_INPUT_ELEMENT_TYPES = {
     "TextArea": "Text",
     "TextBox": "Entry"
 }
-position_id_map ={}
+
+
+def photo_image(image_path, image_loader=False):
+    """Code creating the PhotoImage of `image_path`, through the generated
+    `load_image` when the frame uses lazy loading or a sprite atlas.
+    """
+    if image_loader:
+        return f'load_image("{image_path}")'
+    return f"""PhotoImage(
+    file=relative_to_assets("{image_path}"))"""
 
 
 class Button(Rectangle):
     def __init__(self, node, frame, image_path, *, id_):
         super().__init__(node, frame)
         self.image_path = image_path
+        self.image_loader = frame.image_loader
         self.id_ = id_
-        position_id_map[(self.x, self.y)] = self.id_
+        frame.position_id_map[(self.x, self.y)] = self.id_
 
     def to_code(self):
         return f"""
-button_image_{self.id_} = PhotoImage(
-    file=relative_to_assets("{self.image_path}"))
+button_image_{self.id_} = {photo_image(self.image_path, self.image_loader)}
 button_{self.id_} = Button(
     image=button_image_{self.id_},
     borderwidth=0,
@@ -38,16 +47,32 @@ class ButtonHover(Rectangle):
     def __init__(self, node, frame, image_path):
         super().__init__(node, frame)
         self.image_path = image_path
+        self.image_loader = frame.image_loader
 
-        if((self.x, self.y) in position_id_map):
-            self.id_ = position_id_map[(self.x, self.y)]
-        else:
+        self.id_ = frame.position_id_map.get((self.x, self.y))
+        if self.id_ is None:
             print(
                 f"`ButtonHover` element must be placed on top of Button element with the same position.\n"
                 "`ButtonHover` element will not be rendered") 
 
     def to_code(self):
-        if((self.x, self.y) in position_id_map):
+        if self.id_ is not None and self.image_loader:
+            # The hover image is only loaded when first hovered.
+            return f"""
+def button_{self.id_}_hover(e):
+    button_{self.id_}.config(
+        image=load_image("{self.image_path}")
+    )
+def button_{self.id_}_leave(e):
+    button_{self.id_}.config(
+        image=button_image_{self.id_}
+    )
+
+button_{self.id_}.bind('<Enter>', button_{self.id_}_hover)
+button_{self.id_}.bind('<Leave>', button_{self.id_}_leave)
+
+"""
+        elif self.id_ is not None:
             return f"""
 button_image_hover_{self.id_} = PhotoImage(
     file=relative_to_assets("{self.image_path}"))
@@ -143,12 +168,26 @@ class Image(Vector):
         self.y += height // 2
 
         self.image_path = image_path
+        self.image_loader = frame.image_loader
         self.id_ = id_
 
+        self.offscreen = (
+            self.x + width / 2 <= 0 or self.x - width / 2 >= frame.width
+            or self.y + height / 2 <= 0 or self.y - height / 2 >= frame.height)
+
     def to_code(self):
+        if self.offscreen and self.image_loader:
+            # Not visible at startup, loaded once the event loop runs.
+            return f"""
+image_{self.id_} = canvas.create_image(
+    {self.x},
+    {self.y}
+)
+window.after_idle(lambda: canvas.itemconfig(
+    image_{self.id_}, image=load_image("{self.image_path}")))
+"""
         return f"""
-image_image_{self.id_} = PhotoImage(
-    file=relative_to_assets("{self.image_path}"))
+image_image_{self.id_} = {photo_image(self.image_path, self.image_loader)}
 image_{self.id_} = canvas.create_image(
     {self.x},
     {self.y},
@@ -163,6 +202,7 @@ class TextEntry(Vector):
 
         self.id_ = id_
         self.image_path = image_path
+        self.image_loader = frame.image_loader
 
         self.x, self.y = self.position(frame)
         width, height = self.size()
@@ -183,8 +223,7 @@ class TextEntry(Vector):
 
     def to_code(self):
         return f"""
-entry_image_{self.id_} = PhotoImage(
-    file=relative_to_assets("{self.image_path}"))
+entry_image_{self.id_} = {photo_image(self.image_path, self.image_loader)}
 entry_bg_{self.id_} = canvas.create_image(
     {self.x},
     {self.y},
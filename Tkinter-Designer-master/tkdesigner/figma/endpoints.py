@@ -1,7 +1,16 @@
 """Utility classes and functions for Figma API endpoints.
 """
+import time
+
 import requests
 
+from ..utils import create_session
+
+try:
+    import ijson
+except ImportError:  # Optional, node responses are then parsed at once.
+    ijson = None
+
 
 class Files:
     """https://www.figma.com/developers/api#files-endpoints
@@ -9,19 +18,60 @@ class Files:
 
     API_ENDPOINT_URL = "https://api.figma.com/v1"
 
-    def __init__(self, token, file_key):
+    # Node ids exported per `/images` request, keeps the URL reasonably short.
+    IMAGE_BATCH_SIZE = 100
+    # Frames fetched per `/nodes` request, bounds the size of each response.
+    NODE_BATCH_SIZE = 10
+    # Retries of a rate-limited (429) request before giving up.
+    MAX_RETRIES = 5
+
+    def __init__(self, token, file_key, session=None):
         self.token = token
         self.file_key = file_key
+        # Shared by API calls and asset downloads to reuse connections.
+        self.session = session or create_session()
 
     def __str__(self):
         return f"Files {{ Token: {self.token}, File: {self.file_key} }}"
 
-    def get_file(self) -> dict:
+    def _get(self, url, stream=False):
+        """GET an API url, backing off while Figma answers 429 Too Many Requests.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            response = self.session.get(
+                url, headers={"X-FIGMA-TOKEN": self.token}, stream=stream)
+            if response.status_code != 429 or attempt == self.MAX_RETRIES:
+                return response
+
+            response.close()
+            retry_after = response.headers.get("Retry-After")
+            time.sleep(float(retry_after) if retry_after else 2 ** attempt)
+
+    @staticmethod
+    def _check(response):
+        """Raise a clear error when Figma refused the request (e.g. a wrong
+        token or file key, or still rate-limited after `MAX_RETRIES`).
+        """
+        if response.ok:
+            return response
         try:
-            response = requests.get(
-                f"{self.API_ENDPOINT_URL}/files/{self.file_key}",
-                headers={"X-FIGMA-TOKEN": self.token}
-            )
+            message = response.json().get("err")
+        except ValueError:
+            message = None
+        response.close()
+        reason = f": {message}" if message else "."
+        raise RuntimeError(
+            "Invalid Input. Please check your input and try again.\n"
+            f"Figma answered {response.status_code}{reason}")
+
+    def get_file(self, depth=None) -> dict:
+        """Return the file JSON, only `depth` levels deep into the document
+        when given (`depth=1` is a cheap way to read `version`).
+        """
+        query = f"?depth={depth}" if depth is not None else ""
+        try:
+            response = self._get(
+                f"{self.API_ENDPOINT_URL}/files/{self.file_key}{query}")
         except ValueError:
             raise RuntimeError(
                 "Invalid Input. Please check your input and try again.")
@@ -29,12 +79,56 @@ class Files:
             raise RuntimeError(
                 "Tkinter Designer requires internet access to work.")
         else:
-            return response.json()
+            return self._check(response).json()
 
-    def get_image(self, item_id) -> str:
-        response = requests.get(
-            f"{self.API_ENDPOINT_URL}/images/{self.file_key}?ids={item_id}&scale=2",
-            headers={"X-FIGMA-TOKEN": self.token}
-        )
+    def get_file_page(self, page=0) -> dict:
+        """Return the file JSON with only the frames of page `page` loaded,
+        instead of the whole document tree.
+        """
+        file_data = self.get_file(depth=2)
+        canvas = file_data["document"]["children"][page]
+        nodes = dict(self.iter_nodes(
+            child["id"] for child in canvas.get("children", [])))
+        canvas["children"] = [
+            nodes.get(child["id"]) or child
+            for child in canvas.get("children", [])]
+        return file_data
+
+    def iter_nodes(self, ids):
+        """Yield (id, node) pairs with the full subtree of every node,
+        `NODE_BATCH_SIZE` nodes per request. Responses are parsed
+        incrementally when `ijson` is installed.
+        """
+        ids = list(dict.fromkeys(ids))
+        for start in range(0, len(ids), self.NODE_BATCH_SIZE):
+            batch = ",".join(ids[start:start + self.NODE_BATCH_SIZE])
+            url = f"{self.API_ENDPOINT_URL}/files/{self.file_key}/nodes?ids={batch}"
+
+            if ijson is None:
+                nodes = self._check(self._get(url)).json()["nodes"].items()
+                for item_id, node in nodes:
+                    yield item_id, node and node["document"]
+                continue
 
-        return response.json()["images"][item_id]
+            with self._check(self._get(url, stream=True)) as response:
+                response.raw.decode_content = True
+                nodes = ijson.kvitems(response.raw, "nodes", use_float=True)
+                for item_id, node in nodes:
+                    yield item_id, node and node["document"]
+
+    def get_images(self, ids) -> dict:
+        """Return a map of node id to image URL, exporting `IMAGE_BATCH_SIZE`
+        ids per request.
+        """
+        ids = list(dict.fromkeys(ids))
+        images = {}
+        for start in range(0, len(ids), self.IMAGE_BATCH_SIZE):
+            batch = ",".join(ids[start:start + self.IMAGE_BATCH_SIZE])
+            response = self._get(
+                f"{self.API_ENDPOINT_URL}/images/{self.file_key}"
+                f"?ids={batch}&scale=2")
+            images.update(self._check(response).json()["images"])
+        return images
+
+    def get_image(self, item_id) -> str:
+        return self.get_images([item_id])[item_id]
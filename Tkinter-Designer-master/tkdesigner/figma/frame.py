@@ -1,24 +1,35 @@
-from ..constants import ASSETS_PATH
-from ..utils import download_image
+from ..constants import ASSETS_PATH, SPRITE_ATLAS_NAME
+from ..template import TEMPLATE, get_template
+from ..utils import ImageProcessor, pack_sprite_atlas
 
 from .node import Node
 from .vector_elements import Line, Rectangle, UnknownElement
 from .custom_elements import Button, Text, Image, TextEntry, ButtonHover
 
-from jinja2 import Template
 from pathlib import Path
 
 
 class Frame(Node):
-    def __init__(self, node, figma_file, output_path, frameCount=0):
+    def __init__(self, node, figma_file, output_path, frameCount=0,
+                 fetch_images=True, cache=None, lazy_images=False,
+                 sprite_atlas=False):
         super().__init__(node)
 
+        self.lazy_images = lazy_images
+        self.sprite_atlas = sprite_atlas
+        # Image path to (x, y, width, height) in the sprite atlas.
+        self.sprites = {}
+
         self.width, self.height = self.size()
         self.bg_color = self.color()
 
         self.counter = {}
+        # Button positions to ids, ButtonHover elements attach to the
+        # Button at their position.
+        self.position_id_map = {}
 
         self.figma_file = figma_file
+        self.cache = cache
 
         self.output_path: Path = output_path
         self.assets_path: Path = output_path / ASSETS_PATH / f"frame{frameCount}"
@@ -26,12 +37,25 @@ class Frame(Node):
         self.output_path.mkdir(parents=True, exist_ok=True)
         self.assets_path.mkdir(parents=True, exist_ok=True)
 
+        # Images are collected while creating elements as (item_id, path)
+        # pairs and downloaded together afterwards by `fetch_images`.
+        self.downloads = []
+        # Paths of all images of the frame, including those the build cache
+        # already has.
+        self.image_paths = []
+        # Image paths, relative to the assets, of images identical to an
+        # earlier one to the path of that image, which is the only one written.
+        self.aliases = {}
+
         self.elements = [
             self.create_element(child)
             for child in self.children
             if Node(child).visible
         ]
 
+        if fetch_images:
+            self.fetch_images()
+
     def create_element(self, element):
         element_name = element["name"].strip().lower()
         element_type = element["type"].strip().lower()
@@ -44,11 +68,9 @@ class Frame(Node):
         if element_name == "button":
             self.counter[Button] = self.counter.get(Button, 0) + 1
 
-            item_id = element["id"]
-            image_url = self.figma_file.get_image(item_id)
             image_path = (
                 self.assets_path / f"button_{self.counter[Button]}.png")
-            download_image(image_url, image_path)
+            self.collect_image(element, image_path)
 
             image_path = image_path.relative_to(self.assets_path)
 
@@ -59,11 +81,9 @@ class Frame(Node):
         elif element_name == "buttonhover":
             self.counter[ButtonHover] = self.counter.get(ButtonHover, 0) + 1
 
-            item_id = element["id"]
-            image_url = self.figma_file.get_image(item_id)
             image_path = (
                 self.assets_path / f"button_hover_{self.counter[ButtonHover]}.png")
-            download_image(image_url, image_path)
+            self.collect_image(element, image_path)
 
             image_path = image_path.relative_to(self.assets_path)
 
@@ -73,11 +93,9 @@ class Frame(Node):
         elif element_name in ("textbox", "textarea"):
             self.counter[TextEntry] = self.counter.get(TextEntry, 0) + 1
 
-            item_id = element["id"]
-            image_url = self.figma_file.get_image(item_id)
             image_path = (
                 self.assets_path / f"entry_{self.counter[TextEntry]}.png")
-            download_image(image_url, image_path)
+            self.collect_image(element, image_path)
 
             image_path = image_path.relative_to(self.assets_path)
 
@@ -87,10 +105,8 @@ class Frame(Node):
         elif element_name == "image":
             self.counter[Image] = self.counter.get(Image, 0) + 1
 
-            item_id = element["id"]
-            image_url = self.figma_file.get_image(item_id)
             image_path = self.assets_path / f"image_{self.counter[Image]}.png"
-            download_image(image_url, image_path)
+            self.collect_image(element, image_path)
 
             image_path = image_path.relative_to(self.assets_path)
 
@@ -112,6 +128,97 @@ class Frame(Node):
                 "Would be displayed as Black Rectangle")
             return UnknownElement(element, self)
 
+    def collect_image(self, element, image_path):
+        """Queue the image of `element` for download, unless the build cache
+        already has it at `image_path`.
+        """
+        self.image_paths.append(image_path)
+        if self.cache is not None:
+            if not self.cache.image_changed(element, image_path):
+                written_path = self.cache.image_alias(image_path)
+                if written_path != image_path:
+                    self.aliases[image_path.relative_to(self.assets_path)] = (
+                        written_path.relative_to(self.assets_path))
+                return
+            self.cache.update_image(element, image_path)
+        self.downloads.append((element["id"], image_path))
+
+    def fetch_images(self, image_urls=None, processor=None):
+        """Download the collected images, then pack the sprite atlas if the
+        frame uses one. The atlas is packed once all of the frame's images
+        are written, whatever other frames share `processor`.
+        """
+        if self.downloads:
+            self.download_images(image_urls, processor)
+        for element in self.elements:
+            image_path = getattr(element, "image_path", None)
+            if image_path in self.aliases:
+                element.image_path = self.aliases[image_path]
+        if self.sprite_atlas:
+            self.pack_sprites()
+
+    def download_images(self, image_urls=None, processor=None):
+        """Download the images of all collected elements concurrently.
+
+        `image_urls` maps node ids to export URLs; when not given they are
+        requested from Figma in batches. Images identical to an earlier one
+        are not written but recorded in `aliases`, and in the build cache.
+        """
+        if image_urls is None:
+            image_urls = self.figma_file.get_images(
+                item_id for item_id, _ in self.downloads)
+        session = self.figma_file.session
+        own_processor = processor is None
+        if own_processor:
+            processor = ImageProcessor()
+
+        def fetch(download):
+            item_id, _ = download
+            image_url = image_urls.get(item_id)
+            if image_url is None:
+                raise RuntimeError(
+                    f"Figma could not export an image for node {item_id}.")
+            return session.get(image_url).content
+
+        try:
+            # Images are handed to the processor in collection order as
+            # they arrive, so the first of identical images is the one kept.
+            contents = processor.downloads.map(fetch, self.downloads)
+            written = []
+            for (_, image_path), content in zip(self.downloads, contents):
+                written_path = processor.save(content, image_path)
+                written.append(written_path)
+                if written_path != image_path:
+                    self.aliases[image_path.relative_to(self.assets_path)] = (
+                        written_path.relative_to(self.assets_path))
+                    if self.cache is not None:
+                        self.cache.alias_image(image_path, written_path)
+            processor.wait(written)
+        finally:
+            if own_processor:
+                processor.close()
+
+    def pack_sprites(self):
+        """Pack the small images of all elements into the frame's sprite atlas.
+        """
+        image_paths = sorted({
+            element.image_path for element in self.elements
+            if getattr(element, "image_path", None) is not None
+        })
+        boxes = pack_sprite_atlas(
+            [self.assets_path / path for path in image_paths],
+            self.assets_path / SPRITE_ATLAS_NAME)
+        self.sprites = {
+            f"{path.relative_to(self.assets_path)}": box
+            for path, box in sorted(boxes.items())
+        }
+
+    @property
+    def image_loader(self) -> bool:
+        """Whether images are loaded through the generated `load_image`.
+        """
+        return self.lazy_images or self.sprite_atlas
+
     @property
     def children(self):
         # TODO: Convert nodes to Node objects before returning a list of them.
@@ -135,10 +242,23 @@ class Frame(Node):
         height = bbox["height"]
         return int(width), int(height)
 
-    def to_code(self, template):
-        t = Template(template)
-        return t.render(
-            window=self, elements=self.elements, assets_path=self.assets_path)
+    def generate(self, template=TEMPLATE):
+        """Yield the code of the frame piece by piece.
+        """
+        t = get_template(template)
+        return t.generate(
+            window=self, elements=self.elements, assets_path=self.assets_path,
+            image_loader=self.image_loader, sprites=self.sprites,
+            atlas=SPRITE_ATLAS_NAME)
+
+    def to_code(self, template=TEMPLATE):
+        return "".join(self.generate(template))
+
+    def write_code(self, path, template=TEMPLATE):
+        """Stream the code of the frame to the file at `path`.
+        """
+        with open(path, "w", encoding="UTF-8") as file:
+            file.writelines(self.generate(template))
 
 
 # Frame Subclasses
@@ -0,0 +1,123 @@
+"""
+Recording and offline replay of the HTTP traffic of a build.
+
+A `RecordingSession` saves every response (Figma API JSON and image bytes)
+into a fixture archive; a `ReplaySession` serves them back from it without
+any network access. Both are drop-in `requests.Session`s for `Files`.
+"""
+import io
+import json
+import hashlib
+import threading
+import zipfile
+
+import requests
+
+from pathlib import Path
+
+from .utils import create_session
+
+
+class FixtureArchive:
+    """Zip file of recorded responses, keyed by URL.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, path, mode="r"):
+        self.path = Path(path)
+        self.mode = mode
+        self._zip = zipfile.ZipFile(
+            self.path, mode, compression=zipfile.ZIP_DEFLATED)
+        self._lock = threading.Lock()
+        if mode == "r":
+            self._index = json.loads(self._zip.read(self.INDEX_NAME))
+        else:
+            self._index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._zip.fp is None:
+                return
+            if self.mode != "r":
+                self._zip.writestr(self.INDEX_NAME, json.dumps(self._index, indent=1))
+            self._zip.close()
+
+    def add(self, url, content: bytes, status=200, content_type=None):
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        with self._lock:
+            if url not in self._index:
+                self._zip.writestr(name, content)
+            self._index[url] = {
+                "name": name, "status": status, "content_type": content_type}
+
+    def get(self, url):
+        """Return (status, content type, content) recorded for `url`, or None.
+        """
+        entry = self._index.get(url)
+        if entry is None:
+            return None
+        with self._lock:
+            content = self._zip.read(entry["name"])
+        return entry["status"], entry["content_type"], content
+
+
+def _response(url, status, content_type, content) -> requests.Response:
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    if content_type:
+        response.headers["Content-Type"] = content_type
+    response._content = content
+    # Also readable as a stream, like `stream=True` responses.
+    response.raw = io.BytesIO(content)
+    return response
+
+
+class RecordingSession(requests.Session):
+    """Session saving every response it receives to the archive at `path`.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        create_session(session=self)
+        self.archive = FixtureArchive(path, "w")
+
+    def request(self, method, url, *args, **kwargs):
+        response = super().request(method, url, *args, **kwargs)
+        content = response.content
+        if response.status_code != 429:
+            self.archive.add(
+                url, content, response.status_code,
+                response.headers.get("Content-Type"))
+        response.raw = io.BytesIO(content)
+        return response
+
+    def close(self):
+        super().close()
+        self.archive.close()
+
+
+class ReplaySession(requests.Session):
+    """Session answering requests from the archive at `path`, offline.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.archive = FixtureArchive(path)
+
+    def request(self, method, url, *args, **kwargs):
+        recorded = self.archive.get(url)
+        if recorded is None:
+            raise requests.ConnectionError(f"No recorded response for {url}.")
+        return _response(url, *recorded)
+
+    def close(self):
+        super().close()
+        self.archive.close()
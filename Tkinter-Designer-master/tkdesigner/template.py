@@ -1,3 +1,7 @@
+from functools import lru_cache
+
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
 TEMPLATE = """
 # This file was generated by the Tkinter Designer by Parth Jadhav
 # https://github.com/ParthJadhav/Tkinter-Designer
@@ -15,7 +19,38 @@ ASSETS_PATH = OUTPUT_PATH / Path(r"{{ assets_path }}")
 
 
 def relative_to_assets(path: str) -> Path:
-    return ASSETS_PATH / Path(path)
+    return ASSETS_PATH / Path(path){% if image_loader %}
+
+
+images = {}
+{%- if sprites %}
+sprite_atlas = []
+SPRITES = {
+{%- for path, box in sprites.items() %}
+    "{{ path }}": {{ box }},
+{%- endfor %}
+}
+{%- endif %}
+
+
+# Images are loaded on first use{% if sprites %}, small ones cut from the sprite atlas{% endif %}.
+def load_image(path: str) -> PhotoImage:
+    if path not in images:
+{%- if sprites %}
+        if path in SPRITES:
+            if not sprite_atlas:
+                sprite_atlas.append(
+                    PhotoImage(file=relative_to_assets("{{ atlas }}")))
+            x, y, width, height = SPRITES[path]
+            image = PhotoImage(width=width, height=height)
+            image.tk.call(
+                image, "copy", sprite_atlas[0],
+                "-from", x, y, x + width, y + height)
+            images[path] = image
+            return image
+{%- endif %}
+        images[path] = PhotoImage(file=relative_to_assets(path))
+    return images[path]{% endif %}
 
 
 window = Tk()
@@ -46,3 +81,19 @@ window.resizable(False, False)
 window.mainloop()
 
 """
+
+# Compiled templates are kept by the environment and their bytecode is cached
+# on disk, so TEMPLATE is only compiled once per installation.
+environment = Environment(
+    loader=DictLoader({"gui.py": TEMPLATE}),
+    bytecode_cache=FileSystemBytecodeCache(),
+)
+
+
+@lru_cache(maxsize=16)
+def get_template(template=TEMPLATE):
+    """Return the compiled Jinja template of the `template` source.
+    """
+    if template == TEMPLATE:
+        return environment.get_template("gui.py")
+    return environment.from_string(template)
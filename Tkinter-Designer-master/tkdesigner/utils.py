@@ -2,8 +2,16 @@
 Small utility functions.
 """
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 import io
+import hashlib
+import threading
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from .constants import DOWNLOAD_WORKERS, SPRITE_ATLAS_WIDTH, SPRITE_MAX_SIZE
 
 
 def find_between(s, first, last):
@@ -16,10 +24,139 @@ def find_between(s, first, last):
         return ""
 
 
-def download_image(url, image_path):
-    response = requests.get(url)
-    content = io.BytesIO(response.content)
-    im = Image.open(content)
+def create_session(pool_size=DOWNLOAD_WORKERS, session=None):
+    """Return a `requests.Session` (`session` if given) keeping up to
+    `pool_size` connections alive per host, so that concurrent downloads
+    reuse connections.
+    """
+    session = session or requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def process_image(content, optimize=False) -> bytes:
+    """Halve the size of an image exported at scale 2 and re-encode it as PNG.
+    """
+    im = Image.open(io.BytesIO(content))
     im = im.resize((im.size[0] // 2, im.size[1] // 2), Image.LANCZOS)
+    output = io.BytesIO()
+    im.save(output, format="PNG", optimize=optimize)
+    return output.getvalue()
+
+
+def save_image(content, image_path, optimize=False):
     with open(image_path, "wb") as file:
-        im.save(file)
+        file.write(process_image(content, optimize))
+
+
+def download_image(url, image_path, session=None, optimize=False):
+    response = (session or requests).get(url)
+    save_image(response.content, image_path, optimize)
+
+
+def pack_sprite_atlas(image_paths, atlas_path, max_size=SPRITE_MAX_SIZE,
+                      width=SPRITE_ATLAS_WIDTH) -> dict:
+    """Pack the images no larger than `max_size` into rows of one image,
+    written to `atlas_path`. Returns the (x, y, width, height) box of every
+    packed image by path; nothing is written when no image is small enough.
+    """
+    images = []
+    for path in image_paths:
+        with Image.open(path) as im:
+            if im.width <= max_size and im.height <= max_size:
+                images.append((path, im.convert("RGBA")))
+    if not images:
+        return {}
+
+    # Tallest first, so each row wastes little height.
+    images.sort(key=lambda item: item[1].height, reverse=True)
+    boxes = {}
+    x = y = row_height = atlas_width = 0
+    for path, im in images:
+        if x + im.width > width and x > 0:
+            x, y, row_height = 0, y + row_height, 0
+        boxes[path] = (x, y, im.width, im.height)
+        x += im.width
+        row_height = max(row_height, im.height)
+        atlas_width = max(atlas_width, x)
+
+    atlas = Image.new("RGBA", (atlas_width, y + row_height), (0, 0, 0, 0))
+    for path, im in images:
+        atlas.paste(im, boxes[path][:2])
+    atlas.save(atlas_path, format="PNG")
+    return boxes
+
+
+class ImageProcessor:
+    """Post-processes and writes downloaded images in a process pool, so the
+    CPU work overlaps with downloads still in flight. Identical images of the
+    same directory are only processed and written once.
+
+    With `max_workers=0` images are processed on the calling thread.
+
+    Downloads feeding the processor go through its `downloads` thread pool,
+    shared by every frame of a build so that the concurrent downloads stay
+    bounded by `download_workers`.
+    """
+
+    def __init__(self, max_workers=None, optimize=False,
+                 download_workers=DOWNLOAD_WORKERS):
+        self.optimize = optimize
+        self.executor = (
+            ProcessPoolExecutor(max_workers) if max_workers != 0 else None)
+        self.downloads = ThreadPoolExecutor(max_workers=download_workers)
+        self._written = {}
+        # Image path to the future of its write, until waited for.
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.downloads.shutdown()
+        self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def save(self, content, image_path) -> Path:
+        """Process image `content` and write it to `image_path`, in the
+        background unless running in-thread. Returns the path the image is
+        written to: that of an identical, earlier saved image if there is one.
+        """
+        image_path = Path(image_path)
+        key = (image_path.parent, hashlib.sha1(content).hexdigest())
+        with self._lock:
+            original = self._written.setdefault(key, image_path)
+        if original != image_path:
+            return original
+
+        if self.executor is None:
+            save_image(content, image_path, self.optimize)
+        else:
+            future = self.executor.submit(
+                save_image, content, image_path, self.optimize)
+            with self._lock:
+                self._pending[image_path] = future
+        return image_path
+
+    def wait(self, image_paths=None):
+        """Block until the images saved to `image_paths` are written, every
+        saved image when not given, re-raising failures. Several threads can
+        each wait for their own images.
+        """
+        with self._lock:
+            if image_paths is None:
+                pending, self._pending = self._pending, {}
+            else:
+                pending = {
+                    path: self._pending.pop(path)
+                    for path in map(Path, image_paths)
+                    if path in self._pending}
+        for future in pending.values():
+            future.result()
@@ -0,0 +1,35 @@
+# Gunicorn settings for the dashboard, read from the working directory.
+#
+# gevent workers serve every viewer in its own greenlet, so slow clients no
+# longer tie up a whole worker. gevent patches the worker before the app is
+# imported: the paho MQTT loop thread then runs as a greenlet too, and the
+# shared sensor buffers are only touched between cooperative switches.
+# Set GUNICORN_WORKER_CLASS=sync to go back to the default sync workers.
+#
+# The dashboard module connects nothing at import, every worker starts its own
+# ingestion once booted. GUNICORN_PRELOAD=1 imports it once in the master
+# instead, workers then fork ready to serve (best with sync workers, gevent
+# can only patch modules imported after the fork).
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ['PORT']}" if "PORT" in os.environ else "127.0.0.1:8000"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))  # Every worker runs its own MQTT client
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))  # Viewers per gevent worker
+timeout = 30
+keepalive = 5
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+startup_target = float(os.environ.get("GUNICORN_STARTUP_TARGET", 2.0))  # s from fork until a worker serves
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    from python_hvac_iot_dashboard import start_ingest
+    start_ingest()
+    elapsed = time.monotonic() - worker.forked_at
+    log = worker.log.warning if elapsed > startup_target else worker.log.info
+    log("Worker %s started in %.2fs (target %.1fs)", worker.pid, elapsed, startup_target)
@@ -0,0 +1,298 @@
+"""
+Rule-based alerting on the sensor stream.
+
+Rules are declared as dicts and compiled once. Every distinct signal - a
+channel, its rate of change or an expression over channels - is evaluated
+once per micro-batch of messages, then all rules are checked against their
+limits for all messages at once. An alert is raised when a rule has been
+violated for its `for` seconds on a device and stays active, deduplicated,
+until the reading is back in range.
+
+    {"name": "Frequency out of band", "channel": "Frequency (F)", "min": 49, "max": 51}
+    {"name": "Temp above setpoint", "channel": "Temp (T)", "max": 30, "for": 10}
+    {"name": "Temp rising fast", "channel": "Temp (T)", "rate": True, "max": 0.5}
+    {"name": "Power factor", "expr": "{Power (P)} / ({Voltage (V)} * {Current (I)})", "max": 1}
+"""
+import re
+import ast
+import json
+import time
+import argparse
+import threading
+from collections import deque
+
+import numpy as np
+
+DEFAULT_DEVICE = "hvac"  # Device of messages that don't name one
+BATCH_INTERVAL = 0.5  # Seconds between micro-batches
+MAX_EVENTS = 200  # Raised and resolved alerts kept for display
+SEVERITIES = ("critical", "warning", "info")
+
+_EXPR_FUNCTIONS = {"abs": np.abs, "sqrt": np.sqrt, "log": np.log, "exp": np.exp,
+                   "min": np.minimum, "max": np.maximum}
+_EXPR_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Constant,
+               ast.Load, ast.operator, ast.unaryop)
+_CHANNEL_REF = re.compile(r"\{([^}]*)\}")
+
+
+def compile_expression(source):
+    """ Compile an expression over `{channel}` references into (channels, evaluate(columns)) """
+    channels = list(dict.fromkeys(_CHANNEL_REF.findall(source)))
+    code = _CHANNEL_REF.sub(lambda match: f"_{channels.index(match.group(1))}", source)
+    tree = ast.parse(code, mode="eval")
+    for node in ast.walk(tree):
+        if (not isinstance(node, _EXPR_NODES)
+                or isinstance(node, ast.Name) and node.id not in _EXPR_FUNCTIONS
+                and not re.fullmatch(r"_\d+", node.id)):
+            raise ValueError(f"Unsupported rule expression: {source}")
+    compiled = compile(tree, "<rule>", "eval")
+
+    def evaluate(columns):
+        scope = dict(_EXPR_FUNCTIONS)
+        scope.update({f"_{i}": columns[channel] for i, channel in enumerate(channels)})
+        with np.errstate(all="ignore"):
+            return np.broadcast_to(eval(compiled, {"__builtins__": {}}, scope), columns["time"].shape)
+
+    return channels, evaluate
+
+
+def load_rules(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+class AlertEngine:
+    """ Evaluates compiled rules over micro-batches of messages from many devices """
+    def __init__(self, rules, max_events=MAX_EVENTS):
+        self.rules = list(rules)
+        self.channels = set()
+        self._last = {}  # Per rate channel, last (time, value) of each device
+        self._signals = {}  # Signal key -> index
+        self._evaluators = []
+        rule_signals = []
+        for rule in self.rules:
+            if "expr" in rule:
+                key = ("expr", rule["expr"])
+            else:
+                key = ("rate" if rule.get("rate") else "channel", rule["channel"])
+            if key not in self._signals:
+                self._signals[key] = len(self._evaluators)
+                self._evaluators.append(self._compile_signal(*key))
+            rule_signals.append(self._signals[key])
+
+        self.names = [rule.get("name", f"Rule {i + 1}") for i, rule in enumerate(self.rules)]
+        self.severities = [rule.get("severity", "warning") for rule in self.rules]
+        self._rule_signals = np.array(rule_signals, dtype=int)
+        self._low = np.array([rule.get("min", -np.inf) for rule in self.rules], dtype=float)
+        self._high = np.array([rule.get("max", np.inf) for rule in self.rules], dtype=float)
+        self._duration = np.array([rule.get("for", 0) * 1000 for rule in self.rules], dtype=float)
+
+        self.devices = {}
+        self._device_names = []
+        self._since = np.empty((0, len(self.rules)))  # Per device, start of the ongoing violation
+        self._active = np.empty((0, len(self.rules)), dtype=bool)
+
+        self.active = {}  # (rule, device) -> alert
+        self.events = deque(maxlen=max_events)
+        self.version = 0  # Incremented whenever alerts change
+        self._raised = {}  # (rule, device) -> times raised
+        self.on_status = None  # Called with (device, severity of its worst active alert or None) on changes
+        self._pending = []
+        self._lock = threading.Lock()  # Guards the queued messages
+        self._state_lock = threading.Lock()  # Guards the rule state and alerts
+        self._thread = None
+
+    def _compile_signal(self, kind, source):
+        if kind == "channel":
+            self.channels.add(source)
+            return lambda columns: columns[source]
+        if kind == "rate":
+            self.channels.add(source)
+            self._last[source] = np.empty((0, 2))
+            return lambda columns: self._rate(source, columns)
+        channels, evaluate = compile_expression(source)
+        self.channels.update(channels)
+        return evaluate
+
+    def _device(self, name):
+        index = self.devices.get(name)
+        if index is None:
+            index = self.devices[name] = len(self.devices)
+            self._device_names.append(name)
+            if index >= len(self._since):
+                grow = max(len(self._since), 16)
+                self._since = np.vstack([self._since, np.full((grow, len(self.rules)), np.nan)])
+                self._active = np.vstack([self._active, np.zeros((grow, len(self.rules)), dtype=bool)])
+                for channel, last in self._last.items():
+                    self._last[channel] = np.vstack([last, np.full((grow, 2), np.nan)])
+        return index
+
+    def _rate(self, channel, columns):
+        """ Change per second of a channel since the previous message of the same device """
+        times, devices, values = columns["time"], columns["device"], columns[channel]
+        order = np.lexsort((times, devices))
+        times, devices, values = times[order], devices[order], values[order]
+        first = np.r_[True, devices[1:] != devices[:-1]]
+        last = np.r_[devices[1:] != devices[:-1], True]
+        state = self._last[channel]
+        previous = np.column_stack([np.r_[np.nan, times[:-1]], np.r_[np.nan, values[:-1]]])
+        previous[first] = state[devices[first]]
+        with np.errstate(all="ignore"):
+            rate = (values - previous[:, 1]) / ((times - previous[:, 0]) / 1000)
+        state[devices[last]] = np.column_stack([times[last], values[last]])
+        result = np.empty_like(rate)
+        result[order] = rate
+        return result
+
+    def submit(self, timestamp, sample, device=None):
+        """ Queue a message (a dict of channel values) for the next micro-batch """
+        self.submit_batch([timestamp], {channel: [value] for channel, value in sample.items()}, device)
+
+    def submit_batch(self, times, columns, device=None):
+        """ Queue messages of one device, `columns` of channel values aligned with `times` in ms """
+        times = np.asarray(times, dtype=float)
+        columns = {channel: np.asarray(columns[channel], dtype=float) if channel in columns
+                   else np.full(len(times), np.nan) for channel in self.channels}
+        with self._lock:
+            self._pending.append((times, device or DEFAULT_DEVICE, columns))
+
+    def flush(self):
+        """ Evaluate every rule over the queued messages """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self.evaluate(
+                np.concatenate([times for times, _, _ in batch]),
+                np.repeat([device for _, device, _ in batch], [len(times) for times, _, _ in batch]),
+                {channel: np.concatenate([columns[channel] for _, _, columns in batch]) for channel in self.channels}
+            )
+
+    def evaluate(self, times, devices, columns):
+        """ Evaluate every rule over messages given as columns, `times` in ms """
+        with self._state_lock:
+            columns = {channel: np.asarray(values, dtype=float) for channel, values in columns.items()}
+            columns["time"] = times = np.asarray(times, dtype=float)
+            names, inverse = np.unique(np.asarray(devices, dtype=str), return_inverse=True)
+            devices = np.array([self._device(name) for name in names], dtype=int)[inverse.reshape(-1)]
+            columns["device"] = devices
+            if not len(times):
+                return
+
+            signals = np.stack([evaluate(columns) for evaluate in self._evaluators])
+            values = signals[self._rule_signals].T  # (messages, rules)
+            violations = (values < self._low) | (values > self._high)
+
+            # Every device's messages in order, the first following on from the state left by the previous batch
+            order = np.argsort(devices, kind="stable")
+            t, device, violated = times[order, None], devices[order], violations[order]
+            first = np.r_[True, device[1:] != device[:-1]]
+            last = np.r_[device[1:] != device[:-1], True]
+            rows = np.arange(len(t), dtype=np.int32)[:, None]
+            was_violated = np.r_[violated[:1], violated[:-1]]
+            was_violated[first] = ~np.isnan(self._since[device[first]])
+            was_active = np.zeros_like(violated)
+            was_active[first] = self._active[device[first]]
+
+            # Every run of violations starts at its first message, or earlier for one ongoing at a device's first
+            run = violated & (~was_violated | first[:, None])
+            start = np.maximum.accumulate(run * rows, axis=0)  # Row where the ongoing run begins here
+            since = np.where(run, t, np.nan)
+            since[first] = np.where(was_violated[first], self._since[device[first]], since[first])
+            since = np.where(violated, np.take_along_axis(since, start, axis=0), np.nan)
+
+            # A rule is active from the first message violating it for `for`, until one doesn't
+            due = violated & (t - since >= self._duration)
+            last_due = np.maximum.accumulate(due * (rows + 1), axis=0) - 1
+            active = violated & ((last_due >= start) | np.take_along_axis(was_active & violated, start, axis=0))
+            was_active[~first] = active[:-1][~first[1:]]
+            raised = active & ~was_active
+            resolved = was_active & ~active
+
+            self._since[device[last]] = since[last]
+            self._active[device[last]] = active[last]
+            changed = np.flatnonzero(raised.any(axis=1) | resolved.any(axis=1))
+            for k in changed[np.argsort(order[changed], kind="stable")]:  # In message order
+                self._record(float(t[k, 0]), device[k], np.flatnonzero(raised[k]), np.flatnonzero(resolved[k]),
+                             values[order[k]], since[k], active[k])
+
+    def _record(self, t, device, raised, resolved, values, since, active):
+        name = self._device_names[device]
+        for rule in raised:
+            key = (int(rule), name)
+            self._raised[key] = self._raised.get(key, 0) + 1
+            alert = {"rule": self.names[rule], "device": name, "severity": self.severities[rule],
+                     "value": float(values[rule]), "since": float(since[rule]),
+                     "raised": float(t), "count": self._raised[key]}
+            self.active[key] = alert
+            self.events.append(dict(alert, event="raised"))
+        for rule in resolved:
+            alert = self.active.pop((int(rule), name), None)
+            if alert is not None:
+                self.events.append(dict(alert, event="resolved", resolved=float(t)))
+        self.version += 1
+        if self.on_status:
+            severities = {self.severities[rule] for rule in np.flatnonzero(active)}
+            self.on_status(name, next((severity for severity in SEVERITIES if severity in severities), None))
+
+    def alerts(self):
+        """ Active alerts, most severe and most recent first """
+        with self._state_lock:
+            alerts = list(self.active.values())
+        rank = {severity: i for i, severity in enumerate(SEVERITIES)}
+        return sorted(alerts, key=lambda alert: (rank.get(alert["severity"], len(rank)), -alert["raised"]))
+
+    def start(self, interval=BATCH_INTERVAL):
+        """ Flush queued messages every `interval` seconds in a background thread """
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"❌ Alert evaluation failed: {e}")
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=run, daemon=True)
+            self._thread.start()
+
+
+def benchmark(n_rules=1000, n_devices=500, seconds=10, rate=1.0):
+    """ Evaluate `n_rules` random rules over `seconds` of messages from `n_devices` devices """
+    rng = np.random.default_rng(0)
+    channels = ["Voltage (V)", "Current (I)", "Power (P)", "Frequency (F)", "Vibration", "Temp (T)", "Flow Rate"]
+    rules = []
+    for i in range(n_rules):
+        channel = channels[i % len(channels)]
+        kind = i % 4
+        if kind == 3:
+            rule = {"expr": "{Power (P)} / ({Voltage (V)} * {Current (I)})", "max": float(rng.uniform(0.5, 2))}
+        else:
+            rule = {"channel": channel, "rate": kind == 2, "max": float(rng.uniform(90, 110)), "for": kind}
+        rules.append(dict(rule, name=f"Rule {i + 1}"))
+    engine = AlertEngine(rules)
+
+    devices = [f"chiller-{i}" for i in range(n_devices)]
+    start, elapsed, messages = 0.0, 0.0, 0
+    for second in range(seconds):
+        batch = int(n_devices * rate)
+        columns = {channel: rng.uniform(0, 100, batch) for channel in channels}
+        times = second * 1000.0 + np.arange(batch) * 1000.0 / batch
+        start = time.perf_counter()
+        engine.evaluate(times, [devices[i % n_devices] for i in range(batch)], columns)
+        elapsed += time.perf_counter() - start
+        messages += batch
+    return {"rules": n_rules, "devices": n_devices, "messages": messages,
+            "seconds": elapsed, "messages_per_second": messages / elapsed,
+            "realtime_factor": seconds / elapsed, "active": len(engine.active)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the alert engine on synthetic rules and devices.")
+    parser.add_argument("--rules", type=int, default=1000)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--seconds", type=int, default=10, help="Seconds of ingest simulated")
+    parser.add_argument("--rate", type=float, default=1.0, help="Messages per device per second")
+    args = parser.parse_args()
+    result = benchmark(args.rules, args.devices, args.seconds, args.rate)
+    print(f"{result['rules']} rules, {result['devices']} devices: {result['messages_per_second']:,.0f} messages/s, "
+          f"{result['realtime_factor']:.1f}x real time, {result['active']} active alerts")
@@ -0,0 +1,177 @@
+"""
+Batch processing of HVAC data files.
+
+Every file goes through the same pipeline, chunk by chunk, so memory stays
+bounded however large the file is: only running statistics and a decimated
+copy of each channel are kept per file. Files are processed in parallel in a
+process pool and report their progress through a shared queue.
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from hvac_preprocess import Preprocessor
+
+CHUNK_SIZE = 50_000  # Rows read from a file at a time
+MAX_POINTS = 2_000  # Samples kept per channel for plotting
+OUTLIER_SIGMA = 6  # Samples further from the running mean are clipped
+SEQ_COLUMN = "seq"  # Column of sequence numbers, rows repeating one are dropped
+
+
+class ChannelSummary:
+    """ Running statistics and a bounded, evenly decimated series of one channel """
+    def __init__(self, max_points=MAX_POINTS):
+        self.max_points = max_points
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        # Every `stride`-th sample is kept; the stride doubles whenever the
+        # kept samples would exceed `max_points`.
+        self.stride = 1
+        self.samples = np.empty(0)
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+
+        offset = (-self.count) % self.stride
+        self.samples = np.concatenate([self.samples, values[offset::self.stride]])
+        while len(self.samples) > self.max_points:
+            self.samples = self.samples[::2]
+            self.stride *= 2
+
+        self.count += values.size
+        self.total += float(values.sum())
+        self.total_sq += float(np.square(values).sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    @property
+    def positions(self):
+        """ Sample index of every kept sample """
+        return np.arange(len(self.samples)) * self.stride
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        if not self.count:
+            return np.nan
+        return float(np.sqrt(max(self.total_sq / self.count - self.mean ** 2, 0.0)))
+
+    @classmethod
+    def pooled(cls, summaries):
+        """ Combine the statistics of several summaries (samples are not merged) """
+        result = cls()
+        for summary in summaries:
+            result.count += summary.count
+            result.total += summary.total
+            result.total_sq += summary.total_sq
+            result.minimum = min(result.minimum, summary.minimum)
+            result.maximum = max(result.maximum, summary.maximum)
+        return result
+
+
+def iter_chunks(path, chunksize=CHUNK_SIZE):
+    """ Yield (DataFrame, fraction of the file read) chunks of a CSV or Excel file """
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        yield from _iter_excel_chunks(path, chunksize)
+        return
+
+    size = os.path.getsize(path) or 1
+    with open(path, "rb") as file:
+        for chunk in pd.read_csv(file, chunksize=chunksize):
+            yield chunk, min(file.tell() / size, 1.0)
+
+
+def _iter_excel_chunks(path, chunksize):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        total = max((sheet.max_row or 1) - 1, 1)
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(name) for name in next(rows, ())]
+        read, buffer = 0, []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunksize:
+                read += len(buffer)
+                yield pd.DataFrame(buffer, columns=header), min(read / total, 1.0)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header), 1.0
+    finally:
+        workbook.close()
+
+
+def process_chunk(chunk):
+    """ Numeric channels of a chunk as float arrays """
+    channels = {}
+    for column in chunk.columns:
+        if str(column).strip() == SEQ_COLUMN:
+            continue
+        values = pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype=float)
+        if not np.isnan(values).all():
+            channels[str(column).strip()] = values
+    return channels
+
+
+def process_file(path, progress=None, chunksize=CHUNK_SIZE, max_points=MAX_POINTS):
+    """ Stream one file through the pipeline and return its per-channel summaries """
+    rows = 0
+    summaries = {}
+    preprocessor = None
+
+    def summarize(channels):
+        for name, values in channels.items():
+            summaries.setdefault(name, ChannelSummary(max_points)).update(values)
+
+    for chunk, fraction in iter_chunks(path, chunksize):
+        rows += len(chunk)
+        channels = process_chunk(chunk)
+        if preprocessor is None:
+            preprocessor = Preprocessor(channels, sigma=OUTLIER_SIGMA)
+        seq = pd.to_numeric(chunk[SEQ_COLUMN], errors="coerce") if SEQ_COLUMN in chunk else None
+        summarize(preprocessor.process(channels, seq=seq)[1])
+        if progress is not None:
+            progress.put((path, fraction))
+    if preprocessor is not None:
+        summarize(preprocessor.flush()[1])
+    return {"path": path, "rows": rows, "channels": summaries}
+
+
+class BatchRunner:
+    """ Process pool that runs `process_file` on many files at once """
+    def __init__(self, max_workers=None):
+        self._manager = multiprocessing.Manager()
+        self._progress = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, path):
+        return self._pool.submit(process_file, path, self._progress)
+
+    def poll_progress(self):
+        """ Return the latest progress reported for each file since the last poll """
+        updates = {}
+        while not self._progress.empty():
+            path, fraction = self._progress.get_nowait()
+            updates[path] = fraction
+        return updates
+
+    def shutdown(self):
+        """ Cancel queued files, wait for the running ones, then stop the progress manager process """
+        if self._manager is None:
+            return
+        self._pool.shutdown(wait=True, cancel_futures=True)  # Workers report progress through the manager
+        self._manager.shutdown()
+        self._manager = None
@@ -0,0 +1,263 @@
+"""
+Message transport between the sensors and the dashboard.
+
+`create_client()` returns a client with the paho API for the backend set in
+the broker configuration (ymal.py, overridden by HVAC_BROKER_BACKEND,
+HVAC_MQTT_HOST and HVAC_MQTT_PORT):
+
+- "paho": a paho MQTT client for the configured broker.
+- "inprocess": a client of a broker living in this process, with no network
+  at all. Publishing, subscriptions with wildcards, QoS and persistent
+  sessions behave like MQTT, and `InProcessBroker.set_online()` simulates an
+  outage, so the whole pipeline can be tested and benchmarked in isolation.
+"""
+import os
+import queue
+import threading
+from collections import deque
+
+import paho.mqtt.client as mqtt
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ymal.py")
+DEFAULTS = {"Backend": "paho", "Broker": "mqtt.eclipseprojects.io", "Port": "1883"}
+SESSION_LIMIT = 100_000  # Messages kept for a disconnected persistent session
+
+
+def load_config(path=CONFIG_PATH):
+    """ Broker settings as {"backend", "host", "port"}, from `Key: value` lines and the environment """
+    settings = dict(DEFAULTS)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                key, separator, value = line.partition(":")
+                if separator and value.strip():
+                    settings[key.strip()] = value.strip()
+    return {
+        "backend": os.environ.get("HVAC_BROKER_BACKEND", settings["Backend"]).lower(),
+        "host": os.environ.get("HVAC_MQTT_HOST", settings["Broker"]),
+        "port": int(os.environ.get("HVAC_MQTT_PORT", settings["Port"])),
+    }
+
+
+def topic_matches(pattern, topic):
+    """ Whether a topic matches a subscription pattern with MQTT `+` and `#` wildcards """
+    pattern, topic = pattern.split("/"), topic.split("/")
+    for i, level in enumerate(pattern):
+        if level == "#":
+            return True
+        if i >= len(topic) or level not in ("+", topic[i]):
+            return False
+    return len(pattern) == len(topic)
+
+
+class InProcessBroker:
+    """ MQTT-like broker delivering messages between the clients of this process """
+    def __init__(self):
+        self.online = True
+        self._lock = threading.Lock()
+        self._clients = {}  # Client id -> connected client
+        self._subscriptions = {}  # Client id -> {pattern: qos}
+        self._sessions = {}  # Client id -> messages queued while a persistent session is disconnected
+        self._next_id = 0
+
+    def _client_id(self, client):
+        if not client.client_id:
+            with self._lock:
+                self._next_id += 1
+                client.client_id = f"inprocess-{self._next_id}"
+        return client.client_id
+
+    def attach(self, client):
+        """ Connect a client, returns whether a previous session was resumed """
+        client_id = self._client_id(client)
+        with self._lock:
+            if not self.online:
+                raise ConnectionRefusedError("In-process broker is offline")
+            resumed = not client.clean_session and client_id in self._subscriptions
+            if client.clean_session:
+                self._subscriptions.pop(client_id, None)
+                self._sessions.pop(client_id, None)
+            self._clients[client_id] = client
+            pending = self._sessions.pop(client_id, ())
+        for message in pending:
+            client._deliver(message)
+        return resumed
+
+    def detach(self, client):
+        with self._lock:
+            if self._clients.get(client.client_id) is client:
+                del self._clients[client.client_id]
+            if client.clean_session:
+                self._subscriptions.pop(client.client_id, None)
+
+    def subscribe(self, client, pattern, qos):
+        with self._lock:
+            self._subscriptions.setdefault(self._client_id(client), {})[pattern] = qos
+
+    def publish(self, topic, payload, qos):
+        """ Deliver a message to every matching subscription, returns an MQTT error code """
+        with self._lock:
+            if not self.online:
+                return mqtt.MQTT_ERR_NO_CONN
+            targets = []
+            for client_id, patterns in self._subscriptions.items():
+                granted = max((sub_qos for pattern, sub_qos in patterns.items() if topic_matches(pattern, topic)),
+                              default=None)
+                if granted is None:
+                    continue
+                message = mqtt.MQTTMessage(topic=topic.encode())
+                message.payload, message.qos = payload, min(qos, granted)
+                client = self._clients.get(client_id)
+                if client is not None:
+                    targets.append((client, message))
+                elif message.qos > 0:
+                    self._sessions.setdefault(client_id, deque(maxlen=SESSION_LIMIT)).append(message)
+        for client, message in targets:
+            client._deliver(message)
+        return mqtt.MQTT_ERR_SUCCESS
+
+    def set_online(self, online):
+        """ Simulate an outage: disconnect every client, which reconnect when back online """
+        with self._lock:
+            self.online = online
+            clients = list(self._clients.values()) if not online else []
+            if not online:
+                self._clients.clear()
+        for client in clients:
+            client._connection_lost()
+
+
+class InProcessClient:
+    """ Client of an InProcessBroker with the subset of the paho Client API used here """
+    def __init__(self, callback_api_version=None, client_id="", clean_session=None, broker=None):
+        self.client_id = client_id
+        self.clean_session = True if clean_session is None else clean_session
+        self.broker = broker or default_broker()
+        self.on_connect = self.on_disconnect = self.on_message = None
+        self._userdata = None
+        self._connected = False
+        self._wanted = False  # Connection requested, reconnect after an outage
+        self._inbox = queue.Queue()
+        self._thread = None
+        self._mid = 0
+
+    def _deliver(self, message):
+        self._inbox.put(("message", message))
+
+    def _connection_lost(self):
+        self._connected = False
+        self._inbox.put(("disconnect", 7))  # MQTT_ERR_CONN_LOST
+
+    def _connect(self):
+        session_present = self.broker.attach(self)
+        self._connected = True
+        if self.on_connect:
+            self.on_connect(self, self._userdata, mqtt.ConnectFlags(session_present), 0, None)
+
+    def _handle(self, event, value):
+        if event == "message":
+            if self.on_message:
+                self.on_message(self, self._userdata, value)
+        elif event == "disconnect":
+            if self.on_disconnect:
+                self.on_disconnect(self, self._userdata, mqtt.DisconnectFlags(False), value, None)
+
+    def connect(self, host=None, port=None, keepalive=60):
+        self._wanted = True
+        self._connect()
+        return mqtt.MQTT_ERR_SUCCESS
+
+    def connect_async(self, host=None, port=None, keepalive=60):
+        self._wanted = True
+
+    def disconnect(self):
+        self._wanted = False
+        if self._connected:
+            self._connected = False
+            self.broker.detach(self)
+            self._inbox.put(("disconnect", 0))
+        return mqtt.MQTT_ERR_SUCCESS
+
+    def subscribe(self, topic, qos=0):
+        self.broker.subscribe(self, topic, qos)
+        self._mid += 1
+        return mqtt.MQTT_ERR_SUCCESS, self._mid
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._mid += 1
+        message = mqtt.MQTTMessageInfo(self._mid)
+        message.rc = self.broker.publish(topic, payload or b"", qos) if self._connected else mqtt.MQTT_ERR_NO_CONN
+        if message.rc == mqtt.MQTT_ERR_SUCCESS:
+            message._set_as_published()
+        return message
+
+    def loop(self, timeout=1.0):
+        """ Connect if needed and handle every pending event, for use without loop_start """
+        if self._wanted and not self._connected:
+            try:
+                self._connect()
+            except ConnectionRefusedError:
+                return mqtt.MQTT_ERR_NO_CONN
+        while True:
+            try:
+                self._handle(*self._inbox.get_nowait())
+            except queue.Empty:
+                return mqtt.MQTT_ERR_SUCCESS
+
+    def loop_start(self):
+        def run():
+            while self._thread is not None:
+                if self._wanted and not self._connected:
+                    try:
+                        self._connect()
+                    except ConnectionRefusedError:
+                        pass
+                try:
+                    event = self._inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if event is None:
+                    return
+                self._handle(*event)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=run, daemon=True)
+            self._thread.start()
+
+    def loop_stop(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._inbox.put(None)
+            thread.join()
+
+    def max_inflight_messages_set(self, inflight):
+        pass  # Delivery is immediate
+
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        pass  # Reconnects as soon as the broker is back online
+
+    def user_data_set(self, userdata):
+        self._userdata = userdata
+
+
+_default_broker = None
+
+
+def default_broker():
+    """ The in-process broker shared by the clients of this process """
+    global _default_broker
+    if _default_broker is None:
+        _default_broker = InProcessBroker()
+    return _default_broker
+
+
+def create_client(client_id="", clean_session=None, config=None):
+    """ Client for the configured backend, see the module docstring """
+    config = config or load_config()
+    if config["backend"] == "inprocess":
+        return InProcessClient(client_id=client_id, clean_session=clean_session)
+    if config["backend"] != "paho":
+        raise ValueError(f"Unknown broker backend: {config['backend']}")
+    return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, clean_session=clean_session)
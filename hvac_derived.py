@@ -0,0 +1,39 @@
+"""
+Derived channels computed from the raw sensor channels.
+
+Formulas use the expression syntax of alert rules, `{channel}` for a channel,
+and may refer to the derived channels defined before them. They are compiled
+once and evaluated over whole batches of messages; values that can't be
+computed, because an input is missing or a division is by zero, are NaN.
+"""
+import numpy as np
+
+from hvac_alerts import compile_expression
+
+
+class DerivedChannels:
+    """ Ordered formulas evaluated over batches of messages """
+    def __init__(self, formulas):
+        self.formulas = dict(formulas)
+        self.names = list(self.formulas)
+        self._compiled = [(name, *compile_expression(source)) for name, source in self.formulas.items()]
+
+    def compute(self, times, columns):
+        """ Derived channel arrays of a batch given as raw channel columns, `times` in ms """
+        times = np.asarray(times, dtype=float)
+        columns = {channel: np.asarray(values, dtype=float) for channel, values in columns.items()}
+        columns["time"] = times
+        derived = {}
+        for name, channels, evaluate in self._compiled:
+            for channel in channels:
+                if channel not in columns:
+                    columns[channel] = np.full(times.shape, np.nan)
+            values = np.array(evaluate(columns), dtype=float)
+            values[~np.isfinite(values)] = np.nan
+            columns[name] = derived[name] = values
+        return derived
+
+    def compute_sample(self, timestamp, sample):
+        """ Derived values of one message, a dict of channel values """
+        columns = {channel: [value] for channel, value in sample.items() if isinstance(value, (int, float))}
+        return {name: float(values[0]) for name, values in self.compute([timestamp], columns).items()}
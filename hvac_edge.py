@@ -0,0 +1,99 @@
+"""
+Batched payloads of high-rate sensors.
+
+At the edge, samples of every channel are kept in NumPy buffers and published
+as one message per interval, either as the raw sample block or aggregated into
+windows of min, max, mean and RMS. A batch is zlib compressed and made of a
+JSON header line followed by float32 values, channel by channel:
+
+    {"kind": "raw", "start": <epoch ms>, "rate": <Hz>, "count": n, "seq": s, "channels": [...]}
+    {"kind": "aggregate", "start": <epoch ms>, "window": <ms>, "count": n, "seq": s, "channels": [...]}
+
+Every sample (or window) i of a batch has the sequence number `seq + i`.
+Single readings are plain JSON objects, so the two can share a topic.
+"""
+import json
+import zlib
+
+import numpy as np
+
+STATISTICS = ("min", "max", "mean", "rms")  # Values of every aggregate window, in order
+STATISTIC_NAMES = {"min": "Min", "max": "Max", "rms": "RMS"}  # Channel suffixes, the mean keeps the channel's name
+COMPRESSION_LEVEL = 6
+
+
+def is_batch(payload):
+    """ Whether a payload is a batch rather than a single JSON reading """
+    return not payload.lstrip()[:1] == b"{"
+
+
+def pack(header, values):
+    data = np.ascontiguousarray(values, dtype="<f4").tobytes()
+    return zlib.compress(json.dumps(header).encode() + b"\n" + data, COMPRESSION_LEVEL)
+
+
+def unpack(payload):
+    """ Header, sample times (epoch ms), channel columns and sequence numbers of a batch """
+    header, data = zlib.decompress(payload).split(b"\n", 1)
+    header = json.loads(header)
+    channels, count = header["channels"], header["count"]
+    values = np.frombuffer(data, dtype="<f4").astype(float)
+    if header["kind"] == "raw":
+        values = values.reshape(len(channels), count)
+        times = header["start"] + np.arange(count) * 1000.0 / header["rate"]
+        columns = dict(zip(channels, values))
+    else:
+        values = values.reshape(len(channels), len(STATISTICS), count)
+        times = header["start"] + np.arange(count) * float(header["window"])
+        columns = {}
+        for channel, statistics in zip(channels, values):
+            for statistic, column in zip(STATISTICS, statistics):
+                name = f"{channel} {STATISTIC_NAMES[statistic]}" if statistic in STATISTIC_NAMES else channel
+                columns[name] = column
+    return header, times, columns, header["seq"] + np.arange(count)
+
+
+class EdgeBuffer:
+    """ Samples of every channel at a fixed rate, kept until they are published """
+    def __init__(self, channels, rate):
+        self.channels = list(channels)
+        self.rate = rate
+        self.start = None  # Epoch ms of the first buffered sample
+        self.values = np.empty((len(self.channels), 0), dtype=np.float32)
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    def extend(self, start, block):
+        """ Add a block of samples of shape (channels, samples), the first taken at `start` epoch ms """
+        if self.start is None:
+            self.start = start
+        self.values = np.concatenate([self.values, np.asarray(block, dtype=np.float32)], axis=1)
+
+    def _take(self, count):
+        start, values = self.start, self.values[:, :count]
+        self.values = self.values[:, count:]
+        self.start = start + count * 1000.0 / self.rate if len(self) else None
+        return start, values
+
+    def pack_raw(self, seq, **extra):
+        """ Batch of all buffered samples, which are removed """
+        count = len(self)
+        start, values = self._take(count)
+        header = dict(extra, kind="raw", start=start, rate=self.rate, count=count, seq=seq, channels=self.channels)
+        return pack(header, values)
+
+    def pack_aggregate(self, seq, window, **extra):
+        """ Batch of the statistics of every complete `window` ms of buffered samples, which are removed """
+        size = max(int(self.rate * window / 1000), 1)
+        count = len(self) // size
+        start, values = self._take(count * size)
+        windows = values.reshape(len(self.channels), count, size).astype(float)
+        statistics = np.stack([windows.min(axis=2), windows.max(axis=2), windows.mean(axis=2),
+                               np.sqrt(np.square(windows).mean(axis=2))], axis=1)
+        header = dict(extra, kind="aggregate", start=start, window=window, count=count, seq=seq, channels=self.channels)
+        return pack(header, statistics)
+
+    def windows(self, window):
+        """ Complete `window` ms windows buffered """
+        return len(self) // max(int(self.rate * window / 1000), 1)
@@ -0,0 +1,180 @@
+"""
+Bulk export of the stored sensor history.
+
+The history file is parsed in record batches by the Arrow CSV reader, which
+only converts the requested columns. Each batch is filtered by time range and
+device, then handed to the writer of the requested format: CSV, Arrow IPC
+stream or Parquet, with one row group per batch. The writer's output is
+yielded as soon as a batch is written. One batch is held at a time, so an
+export of any range takes memory bounded by BLOCK_SIZE. Arrow arrays go to
+the writers without conversion, and a batch kept whole is not even copied.
+Rows appended while an export runs are left out of it.
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+from csv import reader
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+BLOCK_SIZE = 4 * 1024 * 1024  # Bytes of the history file parsed per batch
+FORMATS = {  # Format -> (MIME type, file extension)
+    "csv": ("text/csv", ".csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", ".arrows"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+WRITERS = {
+    "csv": csv.CSVWriter,
+    "arrow": ipc.new_stream,
+    "parquet": lambda sink, schema: pq.ParquetWriter(sink, schema, compression="zstd"),
+}
+
+
+class _Snapshot(io.RawIOBase):
+    """ A file as it is when opened, up to its last complete line """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        tail = max(size - 64 * 1024, 0)
+        self._file.seek(tail)
+        self._end = tail + self._file.read(size - tail).rfind(b"\n") + 1
+        self._file.seek(0)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._end - self._file.tell())
+        return self._file.readinto(memoryview(buffer)[:size]) if size > 0 else 0
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class _Chunks:
+    """ Write-only file keeping what was written since the last take() """
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def header(path):
+    """ Column names of a history file """
+    with open(path, encoding="utf-8", newline="") as file:
+        return next(reader(file), [])
+
+
+def schema(channels):
+    """ Schema of exported rows: wall-clock time, device and the channels """
+    return pa.schema([("time", pa.timestamp("ms")), ("device", pa.string())]
+                     + [(channel, pa.float64()) for channel in channels])
+
+
+def batches(path, channels, start=None, end=None, devices=None):
+    """ Record batches of the rows of `devices` in [start, end) ms, with the given channels """
+    columns = ["time", "device"] + list(channels)
+    types = {"time": pa.int64(), "device": pa.string(), **{channel: pa.float64() for channel in channels}}
+    options = csv.ConvertOptions(column_types=types, include_columns=columns)
+    target = schema(channels)
+    with _Snapshot(path) as file:
+        for batch in csv.open_csv(file, read_options=csv.ReadOptions(block_size=BLOCK_SIZE), convert_options=options):
+            times = batch.column(0)
+            masks = []
+            if start is not None:
+                masks.append(pc.greater_equal(times, start))
+            if end is not None:
+                masks.append(pc.less(times, end))
+            if devices:
+                masks.append(pc.is_in(batch.column(1), pa.array(list(devices), pa.string())))
+            if masks:
+                mask = masks[0]
+                for other in masks[1:]:
+                    mask = pc.and_(mask, other)
+                if pc.all(mask).as_py() is not True:
+                    batch = batch.filter(mask)
+            if batch.num_rows:
+                yield pa.RecordBatch.from_arrays([batch.column(0).cast(pa.timestamp("ms"))] + batch.columns[1:],
+                                                 schema=target)
+
+
+def export(path, fmt, channels, start=None, end=None, devices=None):
+    """ Bytes of the selected history in `fmt`, yielded batch by batch """
+    sink = _Chunks()
+    writer = WRITERS[fmt](pa.PythonFile(sink, mode="w"), schema(channels))
+    for batch in batches(path, channels, start, end, devices):
+        writer.write_batch(batch)
+        data = sink.take()
+        if data:
+            yield data
+    writer.close()
+    yield sink.take()
+
+
+def measure(rows=1_000_000, devices=100, channels=16):
+    """ Export a synthetic history of `rows` rows in every format, times it and tracks Arrow memory """
+    rng = np.random.default_rng(0)
+    names = [f"Channel {i}" for i in range(channels)]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(",".join(["time", "device"] + [f'"{name}"' for name in names]) + "\n")
+            for first in range(0, rows, 100_000):
+                count = min(100_000, rows - first)
+                times = 1_700_000_000_000 + (first + np.arange(count)) * 2000 // devices
+                values = np.round(rng.uniform(0, 100, (count, channels)), 2).astype(str)
+                lines = [f'{t},"chiller-{i % devices}",' + ",".join(row) for i, (t, row) in
+                         enumerate(zip(times.tolist(), values.tolist()), first)]
+                file.write("\n".join(lines) + "\n")
+        size = os.path.getsize(path)
+
+        for fmt in FORMATS:
+            pool = pa.default_memory_pool()
+            baseline = pool.bytes_allocated()
+            start = time.perf_counter()
+            written = peak = 0
+            for data in export(path, fmt, names):
+                written += len(data)
+                peak = max(peak, pool.bytes_allocated() - baseline)
+            elapsed = time.perf_counter() - start
+            results.append({"format": fmt, "rows_per_second": rows / elapsed, "mb_per_second": size / elapsed / 1e6,
+                            "output_mb": written / 1e6, "peak_mb": peak / 1e6})
+    return size, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure history exports on a synthetic history file.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--channels", type=int, default=16)
+    args = parser.parse_args()
+    size, results = measure(args.rows, args.devices, args.channels)
+    print(f"{args.rows:,} rows, {size / 1e6:,.0f} MB of history")
+    for result in results:
+        print(f"  {result['format']:>8}: {result['rows_per_second']:,.0f} rows/s ({result['mb_per_second']:,.0f} MB/s), "
+              f"{result['output_mb']:,.0f} MB out, Arrow memory peak {result['peak_mb']:,.1f} MB")
@@ -0,0 +1,232 @@
+"""
+Fleet-wide summary of every device reporting to the dashboard.
+
+One row per device is kept up to date as its samples are stored: the latest
+value of the KPI channels, a sparkline of one of them averaged over fixed
+buckets, the minutes it reported in over the last day (for uptime) and the
+severity of its worst active alert. Rows live in numpy arrays grown as
+devices appear, so an update only costs the buckets its batch touches, and
+the overview sorts and pages the table vectorized, without ever reading the
+sample buffers.
+"""
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from hvac_alerts import SEVERITIES
+
+SPARK_POINTS = 30  # Buckets in a sparkline
+SPARK_BUCKET = 60_000  # ms averaged into one sparkline point
+UPTIME_MINUTES = 1440  # Window of the uptime, one day
+OFFLINE_AFTER = 60_000  # ms without samples before a device is shown offline
+PAGE_SIZE = 48  # Devices per overview page
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+MINUTE = 60_000
+
+
+def sparkline_text(values):
+    """ Values drawn with block characters, scaled to their own range, gaps as spaces """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return ""
+    low, high = values[valid].min(), values[valid].max()
+    levels = np.zeros(len(values), dtype=int)
+    if high > low:
+        levels[valid] = np.round((values[valid] - low) / (high - low) * (len(SPARK_CHARS) - 1))
+    return "".join(SPARK_CHARS[level] if ok else " " for level, ok in zip(levels, valid))
+
+
+def _grow(array, length, fill):
+    grown = np.full((length,) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class FleetSummary:
+    """ Per-device KPIs, sparklines, uptime and alert status, maintained as samples arrive """
+    def __init__(self, kpis, sparkline, totals=(), spark_points=SPARK_POINTS, spark_bucket=SPARK_BUCKET):
+        self.kpis = list(kpis)
+        self.sparkline = sparkline
+        self.totals = set(totals)  # KPIs summed over the fleet, the others are averaged
+        self.spark_bucket = spark_bucket
+        self.devices = {}  # Name -> row
+        self.names = []
+        self.version = 0  # Incremented on every update
+        self._lock = threading.Lock()
+        self._clock = None  # Latest minute seen, slots of older minutes expire as it advances
+
+        self.first_minute = np.empty(0, dtype=np.int64)
+        self.last_seen = np.empty(0)
+        self.latest = np.empty((0, len(self.kpis)))
+        self._spark = np.empty((0, spark_points))  # Completed buckets, oldest first
+        self._spark_bucket = np.empty(0, dtype=np.int64)  # Bucket being filled
+        self._spark_sum = np.empty(0)
+        self._spark_count = np.empty(0)
+        self._minutes = np.empty((0, UPTIME_MINUTES), dtype=bool)  # Ring of the minutes reported in
+        self._uptime = np.empty(0, dtype=int)  # Minutes set in the ring
+        self._severity = np.empty(0, dtype=int)  # Rank in SEVERITIES, len(SEVERITIES) when no alert
+
+    def _device(self, name):
+        row = self.devices.get(name)
+        if row is None:
+            row = self.devices[name] = len(self.names)
+            self.names.append(name)
+            if row >= len(self.last_seen):
+                size = max(2 * len(self.last_seen), 16)
+                self.first_minute = _grow(self.first_minute, size, -1)
+                self.last_seen = _grow(self.last_seen, size, np.nan)
+                self.latest = _grow(self.latest, size, np.nan)
+                self._spark = _grow(self._spark, size, np.nan)
+                self._spark_bucket = _grow(self._spark_bucket, size, -1)
+                self._spark_sum = _grow(self._spark_sum, size, 0.0)
+                self._spark_count = _grow(self._spark_count, size, 0.0)
+                self._minutes = _grow(self._minutes, size, False)
+                self._uptime = _grow(self._uptime, size, 0)
+                self._severity = _grow(self._severity, size, len(SEVERITIES))
+        return row
+
+    def _advance(self, minute):
+        """ Move the clock to `minute`, clearing the ring slots of the minutes leaving the window """
+        if self._clock is not None and minute <= self._clock:
+            return
+        span = UPTIME_MINUTES if self._clock is None else min(minute - self._clock, UPTIME_MINUTES)
+        slots = np.arange(minute - span + 1, minute + 1) % UPTIME_MINUTES
+        rows = len(self.names)
+        self._uptime[:rows] -= self._minutes[:rows][:, slots].sum(axis=1)
+        self._minutes[:rows, slots] = False
+        self._clock = minute
+
+    def update(self, times, columns, device):
+        """ Add a batch of samples of one device, `times` ascending in ms and `columns` of channel values """
+        times = np.asarray(times, dtype=np.int64)
+        if not len(times):
+            return
+        with self._lock:
+            row = self._device(device)
+            minutes = np.unique(times // MINUTE)
+            self._advance(int(minutes[-1]))
+            if self.first_minute[row] < 0:
+                self.first_minute[row] = minutes[0]
+            self.last_seen[row] = np.fmax(self.last_seen[row], times[-1])
+
+            for k, channel in enumerate(self.kpis):
+                values = np.asarray(columns.get(channel, ()), dtype=float)
+                values = values[~np.isnan(values)]
+                if len(values):
+                    self.latest[row, k] = values[-1]
+
+            minutes = minutes[minutes > self._clock - UPTIME_MINUTES]
+            slots = minutes % UPTIME_MINUTES
+            self._uptime[row] += np.count_nonzero(~self._minutes[row, slots])
+            self._minutes[row, slots] = True
+
+            if self.sparkline in columns:
+                self._add_spark(row, times, np.asarray(columns[self.sparkline], dtype=float))
+            self.version += 1
+
+    def _add_spark(self, row, times, values):
+        buckets = times // self.spark_bucket
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid, starts)
+        spark = self._spark[row]
+        for bucket, total, count in zip(buckets[starts], sums, counts):
+            current = self._spark_bucket[row]
+            if bucket < current:
+                continue  # Late samples of a closed bucket
+            if bucket > current:
+                if current >= 0:  # Close it, with a gap for every bucket without samples
+                    closed = [self._spark_sum[row] / self._spark_count[row] if self._spark_count[row] else np.nan]
+                    closed += [np.nan] * int(min(bucket - current - 1, len(spark)))
+                    shift = min(len(closed), len(spark))
+                    spark[:-shift] = spark[shift:].copy()
+                    spark[-shift:] = closed[-shift:]
+                self._spark_bucket[row] = bucket
+                self._spark_sum[row] = self._spark_count[row] = 0.0
+            self._spark_sum[row] += total
+            self._spark_count[row] += count
+
+    def set_status(self, device, severity):
+        """ Severity of the device's worst active alert, None when it has none """
+        with self._lock:
+            row = self._device(device)
+            self._severity[row] = SEVERITIES.index(severity) if severity in SEVERITIES else len(SEVERITIES)
+            self.version += 1
+
+    def overview(self, now, offset=0, limit=PAGE_SIZE):
+        """ Fleet totals and one page of device rows, alerting then offline devices first """
+        with self._lock:
+            self._advance(int(now // MINUTE))
+            rows = len(self.names)
+            online = now - self.last_seen[:rows] <= OFFLINE_AFTER
+            window = np.clip(self._clock - self.first_minute[:rows] + 1, 1, UPTIME_MINUTES)
+            uptime = self._uptime[:rows] / window
+            severity = self._severity[:rows]
+            latest = self.latest[:rows]
+            # Pages list the devices by severity, offline before online ones, each group in order of appearance.
+            # Only the groups on the page are looked up, nothing is sorted.
+            group = severity * 2 + online
+            counts = np.bincount(group, minlength=2 * len(SEVERITIES) + 2)
+            starts, ends = np.cumsum(counts) - counts, np.cumsum(counts)
+            order = []
+            for g in np.flatnonzero((ends > offset) & (starts < offset + limit)):
+                order.extend(np.flatnonzero(group == g)[max(offset - starts[g], 0):offset + limit - starts[g]])
+
+            kpis = {}
+            for k, channel in enumerate(self.kpis):
+                values = latest[online, k]
+                values = values[~np.isnan(values)]
+                kpis[channel] = float(values.sum() if channel in self.totals else values.mean()) if len(values) else None
+            summary = {"devices": rows, "online": int(online.sum()), "alerting": int((severity < len(SEVERITIES)).sum()),
+                       "uptime": float(uptime.mean()) if rows else None, "kpis": kpis}
+
+            devices = []
+            for row in order:
+                count = self._spark_count[row]
+                spark = np.r_[self._spark[row], self._spark_sum[row] / count if count else np.nan]
+                devices.append({
+                    "device": self.names[row], "online": bool(online[row]), "uptime": float(uptime[row]),
+                    "status": SEVERITIES[severity[row]] if severity[row] < len(SEVERITIES) else None,
+                    "last_seen": float(self.last_seen[row]),
+                    "latest": {channel: float(latest[row, k]) for k, channel in enumerate(self.kpis)},
+                    "sparkline": sparkline_text(spark[np.argmax(~np.isnan(spark)):]) if not np.isnan(spark).all() else "",
+                })
+        return summary, devices
+
+
+def measure(fleet_sizes=(100, 1_000, 10_000), samples=20, pages=100):
+    """ Feed `samples` samples to fleets of several sizes, time the updates and an overview page """
+    rng = np.random.default_rng(0)
+    kpis = ["Power (P)", "Temp (T)", "COP"]
+    results = []
+    for size in fleet_sizes:
+        fleet = FleetSummary(kpis, "Power (P)", totals=["Power (P)"])
+        start = time.perf_counter()
+        for i in range(samples):
+            for device in range(size):
+                fleet.update([i * 30_000], {channel: [rng.uniform(1, 10)] for channel in kpis}, f"chiller-{device}")
+        updates = (time.perf_counter() - start) / (samples * size)
+        for device in range(0, size, 10):
+            fleet.set_status(f"chiller-{device}", "warning")
+
+        start = time.perf_counter()
+        for _ in range(pages):
+            fleet.overview(samples * 30_000)
+        results.append({"devices": size, "update_us": updates * 1e6,
+                        "overview_ms": (time.perf_counter() - start) / pages * 1000})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure fleet summary updates and overview pages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000], help="Fleet sizes")
+    parser.add_argument("--samples", type=int, default=20, help="Samples per device")
+    args = parser.parse_args()
+    for result in measure(args.sizes, args.samples):
+        print(f"{result['devices']:>6,} devices: update {result['update_us']:.1f} µs/sample, "
+              f"overview page {result['overview_ms']:.2f} ms")
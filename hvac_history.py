@@ -0,0 +1,303 @@
+"""
+Stored history of the live HVAC sensor data.
+
+Every sample is appended, with the device it came from, to a CSV file and to
+a set of in-memory levels of increasing bucket size, each keeping the min,
+max, sum and count of every channel per bucket over all devices. A window is
+served from the finest level that still fits the requested number of points,
+so any zoom level costs a binary search and a slice. Windows are read in
+pages of their own width; the page after the one requested is computed in
+the background so playback never waits for it.
+
+Fine levels only keep their latest buckets, as set by RETENTION, windows
+reaching further back are served from coarser ones. Late samples, from
+devices lagging behind others, are merged into their buckets in time order.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as csv
+
+LEVELS = (1_000, 10_000, 60_000, 600_000, 3_600_000)  # Bucket sizes in ms, the first holds raw samples
+RETENTION = {1_000: 86_400_000, 10_000: 7 * 86_400_000}  # ms kept by the levels of these bucket sizes, others keep all
+MAX_POINTS = 1_000  # Points per window
+CHUNK_SIZE = 100_000  # Rows read from the history file at a time
+CACHE_PAGES = 64  # Pages kept by a WindowCache
+
+MIN, MAX, SUM, COUNT = range(4)
+
+
+def merge(stats, other):
+    """ Combine into `stats` the aggregates `other` of the same buckets """
+    stats[..., MIN] = np.fmin(stats[..., MIN], other[..., MIN])
+    stats[..., MAX] = np.fmax(stats[..., MAX], other[..., MAX])
+    stats[..., SUM:] += other[..., SUM:]
+
+
+class Level:
+    """ Aggregates of every channel over fixed-size time buckets, the oldest dropped past `max_buckets` """
+    def __init__(self, size, n_channels, max_buckets=None):
+        self.size = size
+        self.max_buckets = max_buckets
+        self.length = 0
+        self.times = np.empty(0, dtype=np.int64)
+        self.stats = np.empty((0, n_channels, 4))
+        self.expired = None  # Time of the first bucket kept once older ones were dropped
+
+    def _reserve(self, length):
+        if length <= len(self.times):
+            return
+        capacity = max(2 * len(self.times), 1024)
+        if self.max_buckets:
+            capacity = min(capacity, self.max_buckets + self.max_buckets // 4)
+        capacity = max(capacity, length)
+        times = np.empty(capacity, dtype=np.int64)
+        stats = np.empty((capacity,) + self.stats.shape[1:])
+        times[:self.length] = self.times[:self.length]
+        stats[:self.length] = self.stats[:self.length]
+        self.times, self.stats = times, stats
+
+    def _expire(self):
+        """ Drop the oldest buckets down to `max_buckets`, once a quarter more have accumulated """
+        if not self.max_buckets or self.length <= self.max_buckets + self.max_buckets // 4:
+            return
+        drop = self.length - self.max_buckets
+        self.times[:self.max_buckets] = self.times[drop:self.length]
+        self.stats[:self.max_buckets] = self.stats[drop:self.length]
+        self.length = self.max_buckets
+        self.expired = int(self.times[0])
+
+    def _merge(self, buckets, stats):
+        """ Add the aggregates of buckets not after the last one, inserting those missing in time order """
+        if len(buckets) == 1 and buckets[0] == self.times[self.length - 1]:  # The usual case, the last bucket
+            merge(self.stats[self.length - 1], stats[0])
+            return
+        times = self.times[:self.length]
+        index = np.searchsorted(times, buckets)
+        found = times[index] == buckets
+        existing = self.stats[index[found]]
+        merge(existing, stats[found])
+        self.stats[index[found]] = existing
+        if found.all():
+            return
+        missing = ~found
+        times = np.insert(times, index[missing], buckets[missing])
+        stats = np.insert(self.stats[:self.length], index[missing], stats[missing], axis=0)
+        self._reserve(len(times))
+        self.length = len(times)
+        self.times[:self.length] = times
+        self.stats[:self.length] = stats
+
+    def extend(self, times, values):
+        """ Add samples, `times` in ms and `values` of shape (samples, channels), in any order """
+        if len(times) > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind="stable")
+            times, values = times[order], values[order]
+        buckets = times // self.size * self.size
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        valid = ~np.isnan(values)
+        stats = np.stack([
+            np.fmin.reduceat(values, starts),
+            np.fmax.reduceat(values, starts),
+            np.add.reduceat(np.where(valid, values, 0.0), starts),
+            np.add.reduceat(valid, starts).astype(float),
+        ], axis=-1)
+        buckets = buckets[starts]
+
+        if self.length:  # Samples of the last bucket or late ones, from another device or redelivered
+            late = np.searchsorted(buckets, self.times[self.length - 1], side="right")
+            if late:
+                self._merge(buckets[:late], stats[:late])
+                buckets, stats = buckets[late:], stats[late:]
+
+        self._reserve(self.length + len(buckets))
+        self.times[self.length:self.length + len(buckets)] = buckets
+        self.stats[self.length:self.length + len(buckets)] = stats
+        self.length += len(buckets)
+        self._expire()
+
+    def slice(self, start, end):
+        """ Index range of the buckets starting in [start, end) """
+        times = self.times[:self.length]
+        return np.searchsorted(times, start), np.searchsorted(times, end)
+
+
+class HistoryStore:
+    """ Sensor history at several resolutions, optionally backed by a CSV file """
+    def __init__(self, channels, path=None, levels=LEVELS, load=True, retention=RETENTION):
+        self.channels = list(channels)
+        self.path = path
+        self.levels = [Level(size, len(self.channels), retention[size] // size if size in retention else None)
+                       for size in levels]
+        self.listeners = []  # Called with the earliest time of samples added before the latest bucket
+        self.write = True  # Whether appended samples go to the file, a single process should write it
+        self._lock = threading.Lock()
+        self._file = None
+        self._first = None  # Earliest time added, finer levels may have dropped it
+        if load and path and os.path.exists(path):  # Otherwise call load() before appending
+            self.load(path)
+
+    @property
+    def start(self):
+        size = self.levels[0].size
+        return self._first // size * size if self._first is not None else None
+
+    @property
+    def end(self):
+        level = self.levels[0]
+        return int(level.times[level.length - 1]) + level.size if level.length else None
+
+    def extend(self, times, values):
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=float).reshape(len(times), len(self.channels))
+        if not len(times):
+            return
+        first, end = int(times.min()), self.end
+        with self._lock:
+            for level in self.levels:
+                level.extend(times, values)
+            self._first = first if self._first is None else min(self._first, first)
+        if end is not None and first < end - self.levels[0].size:
+            for listener in self.listeners:
+                listener(first)
+
+    @property
+    def columns(self):
+        """ Columns of the history file """
+        return ["time", "device"] + self.channels
+
+    def load(self, path, migrate=True):
+        """ Load a history file, rewritten with the current columns if it has other ones and `migrate` is set """
+        columns = list(pd.read_csv(path, nrows=0).columns)
+        migrate = migrate and columns != self.columns
+        temporary = path + ".tmp"
+        for i, chunk in enumerate(pd.read_csv(path, chunksize=CHUNK_SIZE)):
+            values = chunk.reindex(columns=self.channels).apply(pd.to_numeric, errors="coerce")
+            self.extend(chunk["time"].to_numpy(), values.to_numpy(dtype=float))
+            if migrate:
+                values.insert(0, "time", chunk["time"])
+                values.insert(1, "device", chunk["device"] if "device" in chunk else "")  # Unknown before it was stored
+                values.to_csv(temporary, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        if migrate:
+            if not os.path.exists(temporary):  # No rows
+                pd.DataFrame(columns=self.columns).to_csv(temporary, index=False)
+            os.replace(temporary, path)
+
+    def append(self, timestamp, sample, device=""):
+        """ Add one sample (a dict of channel values) of a device and write it to the history file """
+        self.append_batch([timestamp], {channel: [value] for channel, value in sample.items()}, device)
+
+    def append_batch(self, times, columns, device=""):
+        """ Add samples of a device, `columns` of channel values aligned with `times` in ms, and write them at once """
+        times = np.asarray(times, dtype=np.int64)
+        values = np.column_stack([np.asarray(columns[channel], dtype=float) if channel in columns
+                                  else np.full(len(times), np.nan) for channel in self.channels])
+        self.extend(times, values)
+        if self.path and self.write and len(times):
+            if self._file is None:
+                new = not os.path.exists(self.path)
+                self._file = open(self.path, "ab")
+                if new:
+                    self._file.write((",".join(["time", "device"] + [f'"{c}"' for c in self.channels]) + "\n").encode())
+            rows = pa.table([pa.array(times), pa.array([device] * len(times), pa.string())]
+                            + [pa.array(column, from_pandas=True) for column in values.T],  # NaN as empty fields
+                            names=self.columns)
+            csv.write_csv(rows, self._file, csv.WriteOptions(include_header=False))
+            self._file.flush()
+
+    def level_for(self, width, max_points=MAX_POINTS, start=None):
+        """ Finest level with at most `max_points` buckets in `width` ms, still holding `start` when given """
+        for level in self.levels:
+            if width / level.size <= max_points and (start is None or level.expired is None or start >= level.expired):
+                return level
+        return self.levels[-1]
+
+    def query(self, channel, start, end, level):
+        """ Bucket times, mean, min and max of `channel` for the buckets of `level` in [start, end) """
+        index = self.channels.index(channel)
+        with self._lock:
+            lo, hi = level.slice(start, end)
+            times = level.times[lo:hi].copy()
+            stats = level.stats[lo:hi, index].copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = stats[:, SUM] / stats[:, COUNT]
+        return times, mean, stats[:, MIN], stats[:, MAX]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class WindowCache:
+    """ Serves windows of a HistoryStore from cached pages and prefetches the next page """
+    def __init__(self, store, max_pages=CACHE_PAGES):
+        self.store = store
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._generation = 0  # Incremented when late samples change complete pages
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        store.listeners.append(self.invalidate)
+
+    def invalidate(self, start):
+        """ Forget the pages ending after `start`, late samples were added there """
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._pages if (key[3] + 1) * key[2] > start]:
+                del self._pages[key]
+
+    def _page(self, key):
+        channel, size, width, index = key
+        level = next(level for level in self.store.levels if level.size == size)
+        generation = self._generation
+        page = self.store.query(channel, index * width, (index + 1) * width, level)
+        end = self.store.end
+        if end is not None and (index + 1) * width <= end - size:
+            with self._lock:  # Complete pages only change with late samples, later ones are still filling
+                if generation == self._generation:
+                    self._pages[key] = page
+                    while len(self._pages) > self.max_pages:
+                        self._pages.popitem(last=False)
+        return page
+
+    def page(self, channel, level, width, index):
+        key = (channel, level.size, width, index)
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                return self._pages[key]
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending.result()
+        return self._page(key)
+
+    def prefetch(self, channel, level, width, index):
+        key = (channel, level.size, width, index)
+        with self._lock:
+            if key in self._pages or key in self._pending:
+                return
+            future = self._executor.submit(self._page, key)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    def window(self, channel, start, end, max_points=MAX_POINTS):
+        """ Times, mean, min and max of `channel` in [start, end) at the finest level that fits """
+        width = max(int(end - start), 1)
+        level = self.store.level_for(width, max_points, start)
+        index = start // width
+        pages = [self.page(channel, level, width, index), self.page(channel, level, width, index + 1)]
+        self.prefetch(channel, level, width, index + 2)
+
+        times, mean, minimum, maximum = (np.concatenate(parts) for parts in zip(*pages))
+        lo, hi = np.searchsorted(times, start), np.searchsorted(times, end)
+        return level, times[lo:hi], mean[lo:hi], minimum[lo:hi], maximum[lo:hi]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,205 @@
+"""
+Pre-processing of sensor data between ingestion and storage.
+
+Samples go through the same stages whether they arrive as MQTT micro-batches
+or as chunks of a file:
+
+1. De-duplication by sequence number: redelivered messages are dropped.
+2. Outlier clipping to fixed per-channel limits and/or to `sigma` standard
+   deviations around the running mean.
+3. Resampling of irregular arrivals onto a grid of `period` ms, each grid
+   point being the mean of the samples in its bucket.
+4. Linear interpolation of gaps of at most `max_gap` grid points.
+
+Rows whose values may still change when the next batch arrives - the open
+resampling bucket and a trailing gap - are held back until then, so every
+row is emitted once and final.
+"""
+import warnings
+
+import numpy as np
+
+MAX_GAP = 3  # Grid points of a gap that are interpolated
+SEQ_WINDOW = 65_536  # Recent sequence numbers remembered for de-duplication, a few batches of a kHz sensor
+
+
+class Preprocessor:
+    """ Stateful pre-processing of one stream of samples, batch by batch """
+    def __init__(self, channels, limits=None, sigma=None, period=None, max_gap=MAX_GAP):
+        self.channels = list(channels)
+        limits = limits or {}
+        self.sigma = sigma
+        self.period = period
+        self.max_gap = max_gap
+        n = len(self.channels)
+        self._low = np.array([limits.get(channel, (-np.inf, np.inf))[0] for channel in self.channels], dtype=float)
+        self._high = np.array([limits.get(channel, (-np.inf, np.inf))[1] for channel in self.channels], dtype=float)
+        self._count, self._mean, self._m2 = np.zeros(n), np.zeros(n), np.zeros(n)  # Running statistics
+        self._seen = np.empty(0)  # Recent sequence numbers, sorted
+        self._open = (np.empty(0), np.empty((0, n)))  # Samples of the newest resampling bucket
+        self._last_bucket = None
+        self._held = (np.empty(0), np.empty((0, n)))  # Rows of a trailing gap
+        self._anchor = np.full((2, n), np.nan)  # Position and value of the last emitted valid value
+        self._rows = 0  # Rows seen, the position of rows without times
+        self._timed = False
+
+    def process(self, columns, times=None, seq=None):
+        """ Pre-process a batch of channel columns and return the (times, columns) ready for storage.
+        Without `times` rows are taken to be on a grid already and no times are returned.
+        """
+        length = len(times) if times is not None else len(next(iter(columns.values()), []))
+        values = np.column_stack([np.asarray(columns[channel], dtype=float) if channel in columns
+                                  else np.full(length, np.nan) for channel in self.channels]
+                                 ) if self.channels else np.empty((length, 0))
+        if seq is not None:
+            keep = self._deduplicate(np.asarray(seq, dtype=float))
+            values = values[keep]
+            times = np.asarray(times, dtype=float)[keep] if times is not None else None
+        values = self._clip(values)
+
+        self._timed = times is not None
+        if times is None:
+            positions = np.arange(self._rows, self._rows + len(values), dtype=float)
+            self._rows += len(values)
+        elif self.period:
+            positions, values = self._resample(np.asarray(times, dtype=float), values)
+        else:
+            positions = np.asarray(times, dtype=float)
+        positions, values = self._interpolate(positions, values)
+        return (positions if times is not None else None), self._columns(values)
+
+    def flush(self):
+        """ Emit the rows held back, as they are """
+        positions, values = self._open
+        if len(positions):
+            bucket = np.floor(positions[0] / self.period)
+            valid = ~np.isnan(values)
+            with np.errstate(invalid="ignore"):
+                mean = np.where(valid, values, 0.0).sum(axis=0) / valid.sum(axis=0)
+            self._held = (np.r_[self._held[0], bucket * self.period], np.vstack([self._held[1], mean]))
+            self._open = (np.empty(0), np.empty((0, len(self.channels))))
+        positions, values = self._interpolate(np.empty(0), np.empty((0, len(self.channels))), final=True)
+        return (positions if self._timed else None), self._columns(values)
+
+    def _columns(self, values):
+        return {channel: values[:, j] for j, channel in enumerate(self.channels)}
+
+    def _deduplicate(self, seq):
+        """ Mask of the messages not seen before, messages without a sequence number are kept """
+        numbered = ~np.isnan(seq)
+        first = np.zeros(len(seq), dtype=bool)
+        first[np.flatnonzero(numbered)[np.unique(seq[numbered], return_index=True)[1]]] = True
+        index = np.searchsorted(self._seen, seq).clip(max=max(len(self._seen) - 1, 0))
+        seen = self._seen[index] == seq if len(self._seen) else np.zeros(len(seq), dtype=bool)
+        keep = ~numbered | (first & ~seen)
+        new = np.sort(seq[numbered & keep])
+        if len(new):
+            if not len(self._seen) or new[0] > self._seen[-1]:
+                self._seen = np.r_[self._seen, new]  # Usually numbers only increase
+            else:
+                self._seen = np.union1d(self._seen, new)
+            self._seen = self._seen[-SEQ_WINDOW:]
+        return keep
+
+    def _clip(self, values):
+        values = np.clip(values, self._low, self._high)
+        if self.sigma and len(values):
+            valid = ~np.isnan(values)
+            count = valid.sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN channels
+                if (self._count > 1).all():
+                    centre, spread = self._mean, np.sqrt(self._m2 / self._count)
+                else:  # No running statistics yet, use robust ones of the batch
+                    centre = np.nanmedian(values, axis=0)
+                    spread = 1.4826 * np.nanmedian(np.abs(values - centre), axis=0)
+                    spread = np.where(spread > 0, spread, np.inf)
+                values = np.clip(values, centre - self.sigma * spread, centre + self.sigma * spread)
+
+                # Fold the clipped batch into the running statistics (Chan et al.)
+                mean = np.where(valid, values, 0.0).sum(axis=0) / count
+                m2 = np.where(valid, (values - mean) ** 2, 0.0).sum(axis=0)
+                total = self._count + count
+                delta = np.nan_to_num(mean - self._mean)
+                updated = count > 0
+                self._mean = np.where(updated, self._mean + delta * count / total, self._mean)
+                self._m2 = np.where(updated, self._m2 + np.nan_to_num(m2) + delta ** 2 * self._count * count / total,
+                                    self._m2)
+                self._count = total
+        return values
+
+    def _resample(self, times, values):
+        """ Mean of every closed bucket on the grid, with the points of short gaps added as NaN """
+        times = np.r_[self._open[0], times]
+        values = np.vstack([self._open[1], values])
+        buckets = np.floor(times / self.period).astype(np.int64)
+        if self._last_bucket is not None:  # Too late for buckets already emitted
+            late = buckets <= self._last_bucket
+            times, values, buckets = times[~late], values[~late], buckets[~late]
+        empty = np.empty(0), np.empty((0, len(self.channels)))
+        if not len(buckets):
+            return empty
+
+        newest = buckets == buckets.max()
+        self._open = (times[newest], values[newest])
+        buckets, values = buckets[~newest], values[~newest]
+        if not len(buckets):
+            return empty
+
+        order = np.argsort(buckets, kind="stable")
+        buckets, values = buckets[order], values[order]
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        valid = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            means = (np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+                     / np.add.reduceat(valid, starts, axis=0))
+        ids = buckets[starts]
+
+        previous = np.r_[ids[0] - 1 if self._last_bucket is None else self._last_bucket, ids[:-1]]
+        missing = ids - previous - 1
+        missing = np.where(missing <= self.max_gap, missing, 0)
+        lengths = missing + 1
+        ends = np.cumsum(lengths)
+        grid = np.repeat(ids - missing, lengths) + np.arange(ends[-1]) - np.repeat(ends - lengths, lengths)
+        rows = np.full((ends[-1], len(self.channels)), np.nan)
+        rows[ends - 1] = means
+        self._last_bucket = ids[-1]
+        return grid.astype(float) * self.period, rows
+
+    def _interpolate(self, positions, values, final=False):
+        """ Fill gaps of at most `max_gap` grid points and hold back a trailing gap that may still be filled """
+        positions = np.r_[self._held[0], positions]
+        values = np.vstack([self._held[1], values])
+        step = self.period or 1
+        filled = values.copy()
+        emit = len(positions)
+        for j in range(len(self.channels)):
+            column = values[:, j]
+            if not np.isnan(column).any():
+                continue
+            # Position 0 is the last valid value emitted before this batch
+            xs = np.r_[self._anchor[0, j], positions]
+            vs = np.r_[self._anchor[1, j], column]
+            valid = ~np.isnan(vs)
+            index = np.arange(len(vs))
+            previous = np.maximum.accumulate(np.where(valid, index, 0))
+            following = np.minimum.accumulate(np.where(valid, index, len(vs))[::-1])[::-1]
+            gap = ~valid & valid[previous]
+            inner = gap & (following < len(vs))
+            bounded = following.clip(max=len(vs) - 1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                short = (xs[bounded] - xs[previous]) / step - 1 <= self.max_gap
+                fill = inner & short
+                weight = (xs - xs[previous]) / (xs[bounded] - xs[previous])
+            filled[fill[1:], j] = (vs[previous] + (vs[bounded] - vs[previous]) * weight)[1:][fill[1:]]
+            trailing = gap & (following == len(vs)) & ((xs - xs[previous]) / step <= self.max_gap)
+            if not final and trailing.any():
+                emit = min(emit, int(np.argmax(trailing)) - 1)
+
+        self._held = (positions[emit:], values[emit:])
+        positions, filled = positions[:emit], filled[:emit]
+        for j in range(len(self.channels)):
+            valid = np.flatnonzero(~np.isnan(filled[:, j]))
+            if len(valid):
+                self._anchor[:, j] = positions[valid[-1]], filled[valid[-1], j]
+        return positions, filled
@@ -0,0 +1,166 @@
+"""
+Spectrum and spectrogram of high-rate sensor channels.
+
+Every channel of every device keeps a rolling STFT: samples are cut into
+overlapping Hann windowed frames as they arrive, each frame is transformed
+once and its power spectral density kept in a ring of the latest frames. A
+new batch only costs the frames it completes, the samples left over wait for
+the next one. Views read from the ring: the spectrum averages the latest
+frames (Welch), the spectrogram max-pools the ring down to a bounded number
+of cells so peaks survive any zoom.
+"""
+import time
+import argparse
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+N_FFT = 1024  # Samples per frame
+HOP = 256  # Samples between frame starts, 75% overlap
+MAX_FRAMES = 1024  # Frames kept per channel
+SPECTRUM_FRAMES = 16  # Latest frames averaged into the spectrum
+MAX_COLUMNS = 300  # Spectrogram cells along time
+MAX_ROWS = 256  # Spectrogram cells along frequency
+
+
+def decibels(power):
+    return 10 * np.log10(np.maximum(power, 1e-20))
+
+
+def pool_max(values, size, axis):
+    """ Max of consecutive groups along `axis`, so that at most `size` remain, and the group starts """
+    length = values.shape[axis]
+    starts = np.arange(0, length, -(-length // size)) if length > size else np.arange(length)
+    return np.maximum.reduceat(values, starts, axis=axis) if length > size else values, starts
+
+
+class STFTStream:
+    """ Rolling STFT of one channel sampled at a fixed rate """
+    def __init__(self, rate, n_fft=N_FFT, hop=HOP, max_frames=MAX_FRAMES):
+        self.rate = rate
+        self.n_fft = n_fft
+        self.hop = hop
+        self.window = np.hanning(n_fft).astype(np.float32)
+        self.scale = 2.0 / (rate * float(np.sum(self.window.astype(float) ** 2)))  # One-sided PSD
+        self.freqs = np.fft.rfftfreq(n_fft, 1.0 / rate)
+        self.power = np.zeros((max_frames, len(self.freqs)), dtype=np.float32)  # Ring of frame PSDs
+        self.times = np.zeros(max_frames)  # ms at the centre of every frame
+        self.count = 0  # Frames computed since the start, also the version of the views
+        self._tail = np.empty(0, dtype=np.float32)  # Samples not in a complete frame yet
+        self._tail_start = None  # ms of the first of them
+        self._lock = threading.Lock()
+
+    def extend(self, start, samples):
+        """ Add consecutive samples taken from `start` ms, returns the number of new frames """
+        samples = np.nan_to_num(np.asarray(samples, dtype=np.float32))
+        period = 1000.0 / self.rate
+        if self._tail_start is not None:
+            offset = round((self._tail_start + len(self._tail) * period - start) / period)
+            if offset > 0:  # Overlaps what was already added, a redelivered batch
+                samples, start = samples[offset:], start + offset * period
+            elif offset < 0:  # A gap, frames never span it
+                self._tail = self._tail[:0]
+        if not len(self._tail):
+            self._tail_start = start
+        data = np.concatenate([self._tail, samples])
+        count = (len(data) - self.n_fft) // self.hop + 1 if len(data) >= self.n_fft else 0
+        if count:
+            frames = sliding_window_view(data, self.n_fft)[::self.hop][:count] * self.window
+            spectra = np.fft.rfft(frames, axis=1)
+            power = (spectra.real ** 2 + spectra.imag ** 2) * self.scale
+            times = self._tail_start + (np.arange(count) * self.hop + self.n_fft / 2) * period
+            self._store(times, power)
+        self._tail = data[count * self.hop:]
+        self._tail_start += count * self.hop * period
+        return count
+
+    def _store(self, times, power):
+        size = len(self.times)
+        times, power = times[-size:], power[-size:]
+        index = (self.count + np.arange(len(times))) % size
+        with self._lock:
+            self.times[index] = times
+            self.power[index] = power
+            self.count += len(times)
+
+    def latest(self, frames):
+        """ Times and PSDs of up to `frames` of the latest frames, oldest first """
+        with self._lock:
+            frames = min(frames, self.count, len(self.times))
+            index = (self.count - frames + np.arange(frames)) % len(self.times)
+            return self.times[index], self.power[index]
+
+    def spectrum(self, frames=SPECTRUM_FRAMES):
+        """ Frequencies and PSD in dB averaged over the latest frames """
+        _, power = self.latest(frames)
+        return self.freqs, decibels(power.mean(axis=0)) if len(power) else np.empty(0)
+
+    def spectrogram(self, max_columns=MAX_COLUMNS, max_rows=MAX_ROWS):
+        """ Times, frequencies and PSD in dB (frequency x time) of every kept frame, pooled to bounded size """
+        times, power = self.latest(len(self.times))
+        power, columns = pool_max(power, max_columns, axis=0)
+        power, rows = pool_max(power, max_rows, axis=1)
+        return times[columns], self.freqs[rows], decibels(power.T)
+
+
+class SpectralService:
+    """ STFT streams of several channels of every device, created as their high-rate samples arrive """
+    def __init__(self, channels, n_fft=N_FFT, hop=HOP, max_frames=MAX_FRAMES):
+        self.channels = list(channels)
+        self.n_fft, self.hop, self.max_frames = n_fft, hop, max_frames
+        self.streams = {}  # (device, channel) -> STFTStream, every device's samples follow on only from its own
+
+    def extend(self, start, rate, columns, device=""):
+        """ Add a block of samples of every known channel in `columns`, taken by a device at `rate` Hz from `start` ms """
+        for channel in self.channels:
+            if channel not in columns:
+                continue
+            stream = self.streams.get((device, channel))
+            if stream is None or stream.rate != rate:
+                stream = self.streams[device, channel] = STFTStream(rate, self.n_fft, self.hop, self.max_frames)
+            stream.extend(start, columns[channel])
+
+    def get(self, channel, device=""):
+        """ Stream of a device's channel, None until it has a frame """
+        stream = self.streams.get((device, channel))
+        return stream if stream is not None and stream.count else None
+
+    def devices(self, channel=None):
+        """ Devices with a frame of `channel`, of any channel when not given """
+        return sorted({device for (device, name), stream in list(self.streams.items())
+                       if stream.count and channel in (None, name)})
+
+
+def measure(rate=10_000, seconds=60, batch_seconds=2.0):
+    """ Stream `seconds` of a 10 kHz-like vibration signal in batches, times the STFT and the views """
+    rng = np.random.default_rng(0)
+    samples = int(rate * batch_seconds)
+    t = np.arange(int(rate * seconds)) / rate
+    signal = (2.5 * np.sin(2 * np.pi * 50 * t) + 0.8 * np.sin(2 * np.pi * 1200 * t)
+              + rng.normal(0, 0.5, len(t))).astype(np.float32)
+    stream = STFTStream(rate)
+    start = time.perf_counter()
+    for i in range(0, len(signal), samples):
+        stream.extend(i * 1000.0 / rate, signal[i:i + samples])
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(20):
+        stream.spectrogram()
+        stream.spectrum()
+    views = (time.perf_counter() - start) / 20
+    freqs, power = stream.spectrum()
+    return {"samples_per_second": len(signal) / elapsed, "realtime": seconds / elapsed, "frames": stream.count,
+            "view_ms": views * 1000, "peak_hz": float(freqs[np.argmax(power)])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure rolling STFT throughput on a synthetic vibration stream.")
+    parser.add_argument("--rate", type=int, default=10_000, help="Samples per second")
+    parser.add_argument("--seconds", type=float, default=60, help="Seconds of signal streamed")
+    parser.add_argument("--batch", type=float, default=2.0, help="Seconds of samples per batch")
+    args = parser.parse_args()
+    result = measure(args.rate, args.seconds, args.batch)
+    print(f"{result['samples_per_second']:,.0f} samples/s on one core ({result['realtime']:,.0f}x real time), "
+          f"{result['frames']:,} frames, views in {result['view_ms']:.1f} ms, peak at {result['peak_hz']:.0f} Hz")
@@ -0,0 +1,157 @@
+"""
+On-disk spool of sensor readings waiting to be published.
+
+The spool is a ring file of fixed size: a header followed by a data region
+in which length-prefixed records are written one after the other, wrapping
+around at its end. When a reading doesn't fit, the oldest ones are dropped,
+so an outage of any length costs a bounded amount of disk and loses the
+oldest data first. The header also keeps the next sequence number, so
+sequence numbers keep increasing across restarts.
+"""
+import os
+import time
+import struct
+import argparse
+import tempfile
+import threading
+
+SPOOL_CAPACITY = 16 * 1024 * 1024  # Bytes of readings kept on disk
+
+_HEADER = struct.Struct("<8sQQQQQ")  # Magic, capacity, head, used bytes, records, next sequence number
+_LENGTH = struct.Struct("<I")
+_MAGIC = b"HVACSPL1"
+
+
+class Spool:
+    """ Bounded ring file of messages, the oldest are dropped when it is full """
+    def __init__(self, path, capacity=SPOOL_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.dropped = 0  # Records dropped to make room since the spool was opened
+        self._first = 0  # Records removed from the head since the spool was opened, the position of the oldest
+        self._lock = threading.Lock()
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        magic, stored_capacity, self._head, self._used, self._count, self._seq = _HEADER.unpack(
+            self._file.read(_HEADER.size).ljust(_HEADER.size, b"\0"))
+        if magic != _MAGIC or stored_capacity != capacity:
+            self._head = self._used = self._count = self._seq = 0  # New or resized, start over
+            self._file.truncate(_HEADER.size + capacity)
+            self._write_header()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def size(self):
+        """ Bytes of readings in the spool """
+        return self._used
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(_MAGIC, self.capacity, self._head, self._used, self._count, self._seq))
+        self._file.flush()
+
+    def _write(self, offset, data):
+        first = min(len(data), self.capacity - offset)
+        self._file.seek(_HEADER.size + offset)
+        self._file.write(data[:first])
+        if first < len(data):
+            self._file.seek(_HEADER.size)
+            self._file.write(data[first:])
+
+    def _read(self, offset, size):
+        first = min(size, self.capacity - offset)
+        self._file.seek(_HEADER.size + offset)
+        data = self._file.read(first)
+        if first < size:
+            self._file.seek(_HEADER.size)
+            data += self._file.read(size - first)
+        return data
+
+    def next_seq(self, count=1):
+        """ First of `count` sequence numbers for the next readings """
+        with self._lock:
+            seq = self._seq
+            self._seq += count
+            self._write_header()
+            return seq
+
+    def append(self, payload):
+        """ Add a message (bytes) at the end, dropping the oldest ones if there is no room """
+        record = _LENGTH.pack(len(payload)) + payload
+        if len(record) > self.capacity:
+            raise ValueError(f"Message of {len(payload)} bytes is larger than the spool")
+        with self._lock:
+            while self.capacity - self._used < len(record):
+                length, = _LENGTH.unpack(self._read(self._head, _LENGTH.size))
+                self._advance(1, _LENGTH.size + length)
+                self.dropped += 1
+            self._write((self._head + self._used) % self.capacity, record)
+            self._used += len(record)
+            self._count += 1
+            self._write_header()
+
+    def peek(self, limit, max_bytes=1024 * 1024):
+        """ Up to `limit` of the oldest messages, read at once, and the position of the first of them """
+        with self._lock:
+            data = self._read(self._head, min(self._used, max_bytes))
+            position = self._first
+        payloads, offset = [], 0
+        while len(payloads) < limit and offset + _LENGTH.size <= len(data):
+            length, = _LENGTH.unpack_from(data, offset)
+            if offset + _LENGTH.size + length > len(data):
+                if not payloads:  # A single message larger than max_bytes
+                    return self.peek(limit, _LENGTH.size + length)
+                break
+            payloads.append(data[offset + _LENGTH.size:offset + _LENGTH.size + length])
+            offset += _LENGTH.size + length
+        return payloads, position
+
+    def pop(self, payloads, position):
+        """ Remove messages returned by peek, those of them already dropped to make room are skipped """
+        with self._lock:
+            payloads = payloads[max(self._first - position, 0):]
+            if payloads:
+                self._advance(len(payloads), sum(_LENGTH.size + len(payload) for payload in payloads))
+                self._write_header()
+
+    def _advance(self, count, size):
+        self._first += count
+        self._head = (self._head + size) % self.capacity
+        self._used -= size
+        self._count -= count
+        if not self._count:
+            self._head = self._used = 0
+
+    def close(self):
+        self._file.close()
+
+
+def measure(records=100_000, payload_size=200, batch=500):
+    """ Append `records` messages to a fresh spool, then drain it in batches, both timed """
+    payload = b"x" * payload_size
+    with tempfile.TemporaryDirectory() as directory:
+        spool = Spool(os.path.join(directory, "spool.bin"))
+        start = time.perf_counter()
+        for _ in range(records):
+            spool.append(payload)
+        appended = time.perf_counter() - start
+
+        start = time.perf_counter()
+        while len(spool):
+            payloads, position = spool.peek(batch)
+            spool.pop(payloads, position)
+        drained = time.perf_counter() - start
+        spool.close()
+    return {"records": records, "append_per_second": records / appended, "drain_per_second": records / drained}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure spool append and drain throughput.")
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--payload-size", type=int, default=200, help="Bytes per reading")
+    parser.add_argument("--batch", type=int, default=500, help="Readings read per drain step")
+    args = parser.parse_args()
+    result = measure(args.records, args.payload_size, args.batch)
+    print(f"{result['records']:,} readings: append {result['append_per_second']:,.0f}/s, "
+          f"drain {result['drain_per_second']:,.0f}/s")
@@ -0,0 +1,187 @@
+"""
+Load test of the dashboard's live graph.
+
+Every simulated viewer polls `_dash-update-component` the way the browser
+does on each `interval-update` tick. A link delay, over which the request
+body is trickled, stands in for viewers on slow links: they hold their
+connection open the way remote control-room screens do.
+
+Measure a running dashboard:
+    python load_test.py --url http://127.0.0.1:8000 --viewers 10 50 200
+
+Compare worker classes, each started with gunicorn.conf.py:
+    python load_test.py --compare sync gevent
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlparse
+
+CALLBACK_PATH = "/_dash-update-component"
+LINK_PIECE_SIZE = 64  # Bytes sent at a time over a slow link
+
+
+def callback_body(n_intervals, channel="Voltage (V)", graph_state=None):
+    return json.dumps({
+        "output": "..live-graph.figure...live-graph.extendData...live-graph-state.data..",
+        "outputs": [
+            {"id": "live-graph", "property": "figure"},
+            {"id": "live-graph", "property": "extendData"},
+            {"id": "live-graph-state", "property": "data"}
+        ],
+        "inputs": [
+            {"id": "interval-update", "property": "n_intervals", "value": n_intervals},
+            {"id": "preprocess-dropdown", "property": "value", "value": channel},
+            {"id": "feature-extraction-dropdown", "property": "value", "value": None},
+            {"id": "device-dropdown", "property": "value", "value": None},
+            {"id": "graph-mode", "property": "value", "value": "live"},
+            {"id": "history-cursor", "property": "value", "value": 0},
+            {"id": "history-window", "property": "value", "value": 3600000}
+        ],
+        "changedPropIds": ["interval-update.n_intervals"],
+        "state": [{"id": "live-graph-state", "property": "data", "value": graph_state}]
+    }).encode()
+
+
+def viewer(url, stop_at, interval, link_delay, results, lock):
+    """ Poll the live graph callback every `interval` seconds until `stop_at` """
+    target = urlparse(url)
+    n_intervals = 0
+    conn = None
+    graph_state = None  # Kept between polls like the browser's dcc.Store
+    while time.monotonic() < stop_at:
+        n_intervals += 1
+        body = callback_body(n_intervals, graph_state=graph_state)
+        started = time.monotonic()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            conn.putrequest("POST", CALLBACK_PATH)
+            conn.putheader("Content-Type", "application/json")
+            conn.putheader("Content-Length", str(len(body)))
+            conn.putheader("Accept-Encoding", "gzip")
+            conn.endheaders()
+            # Trickle the body over `link_delay` seconds like a slow uplink does
+            pieces = [body[i:i + LINK_PIECE_SIZE] for i in range(0, len(body), LINK_PIECE_SIZE)]
+            for piece in pieces:
+                time.sleep(link_delay / len(pieces))
+                conn.send(piece)
+            response = conn.getresponse()
+            content = response.read()
+            ok = response.status in (200, 204)  # 204: nothing new since the last poll
+            if response.status == 200:
+                if response.getheader("Content-Encoding") == "gzip":
+                    content = gzip.decompress(content)
+                graph_state = json.loads(content)["response"].get("live-graph-state", {}).get("data", graph_state)
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn = None
+        latency = time.monotonic() - started
+        with lock:
+            results.append((ok, latency))
+        time.sleep(max(interval - latency, 0))
+
+
+def run(url, viewers, duration, interval, link_delay):
+    """ Run `viewers` concurrent viewers for `duration` seconds and summarize their requests """
+    results, lock = [], threading.Lock()
+    stop_at = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=viewer, args=(url, stop_at, interval, link_delay, results, lock), daemon=True)
+        for _ in range(viewers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    failed = sum(1 for ok, _ in results if not ok)
+
+    def percentile(p):
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)] if latencies else float("inf")
+
+    return {
+        "viewers": viewers,
+        "requests": len(results),
+        "failed": failed,
+        "per_second": len(latencies) / duration,
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99)
+    }
+
+
+def keeps_up(summary, interval):
+    """ Viewers are served when nearly all requests succeed within one update interval """
+    return summary["failed"] <= 0.01 * summary["requests"] and summary["p95"] <= interval
+
+
+def load_test(url, viewer_counts, duration, interval, link_delay):
+    print(f"{'viewers':>8} {'requests':>9} {'failed':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    capacity = 0
+    for viewers in viewer_counts:
+        summary = run(url, viewers, duration, interval, link_delay)
+        print(f"{summary['viewers']:>8} {summary['requests']:>9} {summary['failed']:>7} "
+              f"{summary['per_second']:>8.1f} {summary['p50'] * 1000:>8.0f} "
+              f"{summary['p95'] * 1000:>8.0f} {summary['p99'] * 1000:>8.0f}")
+        if keeps_up(summary, interval):
+            capacity = viewers
+    print(f"Capacity: {capacity} concurrent viewers")
+    return capacity
+
+
+def start_server(worker_class, port):
+    """ Start gunicorn with gunicorn.conf.py and the given worker class, wait until it answers """
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class, PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "python_hvac_iot_dashboard:server"],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start on port {port}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Chiller Dashboard live graph.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Dashboard to test")
+    parser.add_argument("--viewers", type=int, nargs="+", default=[10, 50, 100, 200, 400])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per viewer count")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls (interval-update)")
+    parser.add_argument("--link-delay", type=float, default=0.2,
+                        help="Seconds taken to send each request body, emulating a slow link")
+    parser.add_argument("--compare", nargs="+", metavar="WORKER_CLASS",
+                        help="Start gunicorn with each worker class in turn and test it")
+    parser.add_argument("--port", type=int, default=8765, help="Port used with --compare")
+    args = parser.parse_args()
+
+    if not args.compare:
+        load_test(args.url, args.viewers, args.duration, args.interval, args.link_delay)
+        sys.exit(0)
+
+    capacities = {}
+    for worker_class in args.compare:
+        print(f"\n== {worker_class} workers ==")
+        server = start_server(worker_class, args.port)
+        try:
+            capacities[worker_class] = load_test(
+                f"http://127.0.0.1:{args.port}", args.viewers, args.duration, args.interval, args.link_delay)
+        finally:
+            server.terminate()
+            server.wait()
+    print("\n" + ", ".join(f"{name}: {capacity} viewers" for name, capacity in capacities.items()))
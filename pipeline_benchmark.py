@@ -0,0 +1,134 @@
+"""
+End-to-end benchmark of the dashboard's ingest -> store -> render pipeline.
+
+The dashboard is imported with the in-process broker, so no network is
+involved and runs are repeatable. A publisher client sends synthetic readings
+(or raw edge batches), at a fixed rate or as fast as they are taken in; every
+message is timed from publish until the ingest batch it is in has been stored.
+The live graph is then rendered through the callback endpoint.
+
+    python pipeline_benchmark.py --messages 20000
+    python pipeline_benchmark.py --messages 2000 --rate 200
+    python pipeline_benchmark.py --messages 500 --edge-samples 2000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+START_MS = 1_700_000_000_000  # Timestamp of the first synthetic reading
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else float("nan")
+
+
+def readings(dashboard, count, edge_samples, seed=0):
+    """ Payloads of `count` synthetic messages, a reading or an edge batch each """
+    from hvac_edge import EdgeBuffer
+
+    rng = np.random.default_rng(seed)
+    channels = [channel for channel in dashboard.RAW_CHANNELS if channel in dashboard.CHANNEL_LIMITS]
+    if edge_samples:
+        buffer = EdgeBuffer(channels, rate=1000)
+        for i in range(count):
+            block = rng.uniform(1, 40, (len(channels), edge_samples))
+            buffer.extend(START_MS + i * edge_samples, block)
+            yield buffer.pack_raw(i * edge_samples)
+    else:
+        for i in range(count):
+            reading = {channel: round(float(value), 2) for channel, value in zip(channels, rng.uniform(1, 40, len(channels)))}
+            reading.update(timestamp=START_MS + i * dashboard.SAMPLE_PERIOD, seq=i)
+            yield json.dumps(reading)
+
+
+def run(messages, edge_samples=0, rate=0, renders=50):
+    from hvac_broker import create_client
+    import python_hvac_iot_dashboard as dashboard
+
+    # Time every message from publish until the batch it is in has been stored
+    done, finished = [], threading.Event()
+    ingest_pending = dashboard.ingest_pending
+
+    def timed_ingest_pending():
+        count = ingest_pending()
+        done.extend([time.perf_counter()] * count)
+        if len(done) >= messages:
+            finished.set()
+        return count
+
+    dashboard.ingest_pending = timed_ingest_pending  # Looked up by the ingest loop on every run
+    dashboard.start_ingest()
+    if not dashboard.ingest_connected.wait(timeout=60):
+        raise RuntimeError("The dashboard did not connect to the in-process broker")
+    payloads = list(readings(dashboard, messages, edge_samples))
+    publisher = create_client(client_id="benchmark-sensor", config=dashboard.BROKER_CONFIG)
+    publisher.connect()
+
+    sent = []
+    start = time.perf_counter()
+    for i, payload in enumerate(payloads):
+        if rate:
+            time.sleep(max(start + i / rate - time.perf_counter(), 0))
+        sent.append(time.perf_counter())
+        publisher.publish(dashboard.MQTT_TOPIC, payload, qos=1)
+    if not finished.wait(timeout=600):
+        raise RuntimeError(f"Only {len(done)} of {messages} messages were handled")
+    elapsed = done[-1] - start
+    latencies = [(end - begin) * 1000 for begin, end in zip(sent, done)]
+
+    # Render the full live graph, as a newly opened page does
+    client = dashboard.server.test_client()
+    body = {
+        "output": "..live-graph.figure...live-graph.extendData...live-graph-state.data..",
+        "outputs": [{"id": "live-graph", "property": "figure"}, {"id": "live-graph", "property": "extendData"},
+                    {"id": "live-graph-state", "property": "data"}],
+        "inputs": [{"id": "interval-update", "property": "n_intervals", "value": 1},
+                   {"id": "preprocess-dropdown", "property": "value", "value": "Voltage (V)"},
+                   {"id": "feature-extraction-dropdown", "property": "value", "value": None},
+                   {"id": "device-dropdown", "property": "value", "value": None},
+                   {"id": "graph-mode", "property": "value", "value": "live"},
+                   {"id": "history-cursor", "property": "value", "value": 0},
+                   {"id": "history-window", "property": "value", "value": 3_600_000}],
+        "changedPropIds": ["preprocess-dropdown.value"],
+        "state": [{"id": "live-graph-state", "property": "data", "value": None}],
+    }
+    render_times = []
+    for _ in range(renders):
+        begin = time.perf_counter()
+        response = client.post("/_dash-update-component", json=body)
+        render_times.append((time.perf_counter() - begin) * 1000)
+        assert response.status_code == 200, response.status_code
+
+    samples = messages * (edge_samples or 1)
+    return {
+        "messages": messages, "samples": samples, "stored": dashboard.samples_received,
+        "messages_per_second": messages / elapsed, "samples_per_second": samples / elapsed,
+        "latency_p50": percentile(latencies, 0.5), "latency_p99": percentile(latencies, 0.99),
+        "render_p50": percentile(render_times, 0.5), "render_p99": percentile(render_times, 0.99),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipeline on the in-process broker.")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--edge-samples", type=int, default=0, help="Publish raw edge batches of this many samples")
+    parser.add_argument("--rate", type=float, default=0, help="Messages per second, 0 for as fast as taken in")
+    parser.add_argument("--renders", type=int, default=50, help="Live graph renders timed")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ.update(HVAC_BROKER_BACKEND="inprocess",  # Before the dashboard is imported
+                      HVAC_HISTORY_PATH=os.path.join(directory, "history.csv"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    result = run(args.messages, args.edge_samples, args.rate, args.renders)
+    print(f"Ingest: {result['messages']:,} messages, {result['samples']:,} samples -> {result['stored']:,} rows stored")
+    print(f"  {result['messages_per_second']:,.0f} messages/s, {result['samples_per_second']:,.0f} samples/s")
+    print(f"  latency p50 {result['latency_p50']:.2f} ms, p99 {result['latency_p99']:.2f} ms")
+    print(f"Render: p50 {result['render_p50']:.1f} ms, p99 {result['render_p99']:.1f} ms")
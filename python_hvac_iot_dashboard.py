@@ -1,16 +1,40 @@
 import dash
-from dash import dcc, html
+from dash import dcc, html, ctx, no_update
 from dash.dependencies import Input, Output, State
+from flask import Flask, Response, request
 import plotly.graph_objs as go
-import paho.mqtt.client as mqtt
+import os
+import sys
 import time
 import json
+import zlib
+import base64
+import threading
 from collections import deque
+from functools import lru_cache
+from datetime import datetime, timezone
+import numpy as np
+from hvac_history import HistoryStore, WindowCache
+from hvac_alerts import AlertEngine, load_rules, DEFAULT_DEVICE
+from hvac_derived import DerivedChannels
+from hvac_preprocess import Preprocessor
+from hvac_edge import is_batch, unpack
+from hvac_spectrum import SpectralService, SPECTRUM_FRAMES
+from hvac_fleet import FleetSummary, PAGE_SIZE
+from hvac_export import FORMATS, export, header
+from hvac_broker import create_client, load_config
 
-# MQTT Broker Settings
-MQTT_BROKER = "mqtt.eclipseprojects.io"
-MQTT_PORT = 1883
+try:
+    import fcntl
+except ImportError:  # Windows, where the dashboard runs in a single process
+    fcntl = None
+
+# MQTT Broker Settings, from ymal.py and the environment
+BROKER_CONFIG = load_config()
+MQTT_BROKER = BROKER_CONFIG["host"]
+MQTT_PORT = BROKER_CONFIG["port"]
 MQTT_TOPIC = "hvac/sensor"
+MQTT_QOS = 1  # Keep the publishers' QoS, they resend unacknowledged readings
 
 # Live Sensor Data Storage
 MAX_DATA_POINTS = 50
@@ -22,22 +46,114 @@ sensor_data = {
     "Frequency (F)": deque(maxlen=MAX_DATA_POINTS),
     "Vibration": deque(maxlen=MAX_DATA_POINTS),
     "Temp (T)": deque(maxlen=MAX_DATA_POINTS),
-    "Flow Rate": deque(maxlen=MAX_DATA_POINTS)
+    "Flow Rate": deque(maxlen=MAX_DATA_POINTS),
+    "Vibration RMS": deque(maxlen=MAX_DATA_POINTS)  # From the aggregate batches of edge sensors
+}
+
+# Data Pre-processing between ingestion and storage
+RAW_CHANNELS = [category for category in sensor_data if category != "time"]
+CHANNEL_LIMITS = {"Voltage (V)": (0, 480), "Current (I)": (0, 100), "Power (P)": (0, 50000),
+                  "Frequency (F)": (45, 65), "Vibration": (-50, 50), "Temp (T)": (-20, 80), "Flow Rate": (0, 1000),
+                  "Vibration RMS": (0, 50)}
+SAMPLE_PERIOD = 2000  # ms, grid single readings are resampled onto, the sensors' send interval
+INGEST_INTERVAL = 0.1  # s between pre-processing runs over the messages received meanwhile
+preprocessors = {}  # Per device and grid, every device's stream is de-duplicated and resampled on its own
+
+def preprocessor_for(device, period=SAMPLE_PERIOD):
+    """ Pre-processing of a device's readings, `period` None for edge batches, sampled on their own grid already """
+    preprocessor = preprocessors.get((device, period))
+    if preprocessor is None:
+        preprocessor = preprocessors[device, period] = Preprocessor(RAW_CHANNELS, limits=CHANNEL_LIMITS, period=period)
+    return preprocessor
+
+# Spectrum & Spectrogram, rolling STFTs of the raw high-rate samples of edge sensors
+SPECTRAL_VIEWS = ("Frequency (F)", "T-F")  # Features Extraction options shown from them
+spectral = SpectralService(RAW_CHANNELS)
+
+# Derived Channels, computed from the raw ones as messages arrive and stored alongside them
+CHILLED_WATER_DELTA_T = 5.0  # K, design temperature difference across the evaporator
+DERIVED_CHANNELS = {
+    "Apparent Power (S)": "{Voltage (V)} * {Current (I)}",
+    "Power Factor": "{Power (P)} / {Apparent Power (S)}",
+    "Cooling Load (kW)": f"{{Flow Rate}} / 60 * 4.186 * {CHILLED_WATER_DELTA_T}",  # Flow Rate in L/min
+    "kW/ton": "{Power (P)} / 1000 / ({Cooling Load (kW)} / 3.517)",
+    "COP": "{Cooling Load (kW)} / ({Power (P)} / 1000)"
 }
+derived_channels = DerivedChannels(DERIVED_CHANNELS)
+for channel in derived_channels.names:
+    sensor_data[channel] = deque(maxlen=MAX_DATA_POINTS)
+sensor_lock = threading.Lock()  # Keeps the buffers aligned while a message is appended
+samples_received = 0  # Sequence number of the newest sample, clients track it for deltas
+
+# Live Graph Transport
+# "json": full window as JSON lists every tick
+# "typed": full window as base64 typed arrays (Plotly "bdata") every tick
+# "delta": full window as JSON lists once, then only the points added since the previous tick
+GRAPH_TRANSPORT = os.environ.get("HVAC_GRAPH_TRANSPORT", "delta")
+UPDATE_INTERVAL = 1000  # ms between graph updates
+
+# Stored History & Playback
+HISTORY_PATH = os.environ.get("HVAC_HISTORY_PATH", "hvac_history.csv")
+history = HistoryStore([category for category in sensor_data if category != "time"], HISTORY_PATH, load=False)
+history_windows = WindowCache(history)
+DAY_MS = 86_400_000
+HISTORY_WINDOWS = {"1 min": 60_000, "10 min": 600_000, "1 hour": 3_600_000, "6 hours": 21_600_000,
+                   "1 day": DAY_MS, "1 week": 7 * DAY_MS}
+PLAYBACK_SPEEDS = [1, 10, 60, 600, 3600]  # Seconds of history played per second
+
+# Alert Rules, replaced by the rules in ALERT_RULES_PATH when it exists
+ALERT_RULES_PATH = os.environ.get("HVAC_ALERT_RULES", "alert_rules.json")
+DEFAULT_ALERT_RULES = [
+    {"name": "Frequency out of band", "channel": "Frequency (F)", "min": 49, "max": 51, "severity": "critical"},
+    {"name": "Temp above setpoint", "channel": "Temp (T)", "max": 30, "for": 10},
+    {"name": "Power factor above 1", "channel": "Power Factor", "max": 1}
+]
+alert_engine = AlertEngine(load_rules(ALERT_RULES_PATH) if os.path.exists(ALERT_RULES_PATH) else DEFAULT_ALERT_RULES)
+ALERT_COLORS = {"critical": "#dc3545", "warning": "#fd7e14", "info": "#0d6efd"}
+
+# Fleet Overview, one summary row per device kept up to date as its samples are stored
+FLEET_KPIS = ["Power (P)", "Temp (T)", "Cooling Load (kW)", "COP"]
+FLEET_TOTALS = ["Power (P)", "Cooling Load (kW)"]  # Summed over the online devices, the others averaged
+FLEET_SPARKLINE = "Power (P)"
+fleet = FleetSummary(FLEET_KPIS, FLEET_SPARKLINE, totals=FLEET_TOTALS)
+alert_engine.on_status = fleet.set_status
 
 # Define Dashboard Sections
 sections = {
-    "Data Pre-processing": ["Voltage (V)", "Current (I)", "Power (P)", "Frequency (F)", "Vibration", "Temp (T)", "Flow Rate"],
+    "Data Pre-processing": ["Voltage (V)", "Current (I)", "Power (P)", "Frequency (F)", "Vibration", "Temp (T)", "Flow Rate",
+                           "Vibration RMS"] + derived_channels.names,
     "Features Extraction": ["Time (T)", "Frequency (F)", "T-F"],
     "Features Selection": ["AI", "Hybrid"],
     "Forecasting": ["Linear Regression", "Neural Networks", "Decision Tree"],
     "Fault Diagnosis": ["Anomaly Detection", "Predictive Maintenance"]
 }
 
+# Response Compression & Caching
+COMPRESS_MIN_SIZE = 1024  # Smaller responses are sent uncompressed
+STATIC_MAX_AGE = 31536000  # 1 year, static URLs change with their content
+
+server = Flask(__name__)
+server.config.update(
+    COMPRESS_ALGORITHM=["br", "gzip"],
+    COMPRESS_MIN_SIZE=COMPRESS_MIN_SIZE,
+    COMPRESS_MIMETYPES=["application/json", "application/javascript", "text/javascript",
+                        "text/css", "text/html"],
+    SEND_FILE_MAX_AGE_DEFAULT=STATIC_MAX_AGE  # Assets are served with a ?m=<mtime> cache buster
+)
+
 # Initialize Dash App
-app = dash.Dash(__name__)
+app = dash.Dash(__name__, server=server, compress=True)
 app.title = "Chiller Dashboard"
 
+@server.after_request
+def cache_static_bundles(response):
+    # Fingerprinted component bundles never change, let browsers skip revalidation
+    if (request.path.startswith(app.config.requests_pathname_prefix + "_dash-component-suites/")
+            and response.cache_control.max_age):
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
 # Title Bar
 title_bar = html.Div(
     id="title-bar",
@@ -47,7 +163,9 @@ title_bar = html.Div(
                            "border": "none", "font-size": "22px", "cursor": "pointer", "border-radius": "5px",
                            "margin-right": "15px"}),
         html.H2("Chiller Dashboard", style={"textAlign": "center", "color": "white", "margin": "0px",
-                                            "flex-grow": "1", "padding": "15px"})
+                                            "flex-grow": "1", "padding": "15px"}),
+        dcc.Link("Device", href="/", style={"color": "white", "margin-right": "20px", "font-weight": "bold"}),
+        dcc.Link("Fleet", href="/fleet", style={"color": "white", "margin-right": "20px", "font-weight": "bold"})
     ],
     style={"display": "flex", "alignItems": "center", "width": "100%", "background": "#0d6efd",
            "padding": "0px", "position": "fixed", "top": "0px", "left": "0px", "right": "0px",
@@ -77,6 +195,15 @@ sidebar = html.Div(
             clearable=True,
             style={"margin-bottom": "30px"}
         ),
+        html.Label("Device (spectral views):", style={"font-weight": "bold", "color": "#333"}),
+        dcc.Dropdown(
+            id="device-dropdown",
+            options=[],
+            value=None,
+            placeholder="First device streaming...",
+            clearable=True,
+            style={"margin-bottom": "30px"}
+        ),
         html.Label("Features Selection:", style={"font-weight": "bold", "color": "#333"}),
         dcc.Dropdown(
             id="feature-selection-dropdown",
@@ -114,15 +241,73 @@ sidebar = html.Div(
 content = html.Div(
     children=[
         title_bar,
+        dcc.Location(id="url"),
         html.Div(style={"height": "80px"}),
-        html.Div([
+        html.Div(id="device-view", children=[html.Div([
             html.H3("Selected Options: None", id="graph-title",
                     style={"textAlign": "center", "color": "#fff", "padding": "10px",
                            "background-color": "#0d6efd", "border-radius": "5px", "margin-bottom": "10px"}),
+            dcc.RadioItems(
+                id="graph-mode",
+                options=[{"label": " Live", "value": "live"}, {"label": " History", "value": "history"}],
+                value="live",
+                inline=True,
+                labelStyle={"margin-right": "20px"},
+                style={"margin-bottom": "10px"}
+            ),
+            html.Div(
+                id="history-controls",
+                children=[
+                    html.Div([
+                        dcc.DatePickerRange(id="history-range", clearable=True),
+                        dcc.Dropdown(
+                            id="history-window",
+                            options=[{"label": label, "value": value} for label, value in HISTORY_WINDOWS.items()],
+                            value=HISTORY_WINDOWS["1 hour"],
+                            clearable=False,
+                            style={"width": "130px"}
+                        ),
+                        dcc.Dropdown(
+                            id="playback-speed",
+                            options=[{"label": f"{speed}x", "value": speed} for speed in PLAYBACK_SPEEDS],
+                            value=60,
+                            clearable=False,
+                            style={"width": "100px"}
+                        ),
+                        html.Button("Play", id="playback-button", n_clicks=0,
+                                    style={"background": "#0d6efd", "color": "white", "border": "none",
+                                           "padding": "8px 20px", "cursor": "pointer", "border-radius": "5px"}),
+                    ], style={"display": "flex", "alignItems": "center", "gap": "15px", "margin-bottom": "10px"}),
+                    dcc.Slider(id="history-cursor", min=0, max=1, step=1000, value=0, marks={}, updatemode="drag"),
+                ],
+                style={"display": "none"}
+            ),
             dcc.Graph(id="live-graph", style={"height": "calc(90vh - 120px)"}),
+            dcc.Store(id="live-graph-state"),
         ], style={"border": "2px solid #0d6efd", "padding": "10px", "border-radius": "10px",
                   "background": "white", "margin": "10px", "box-shadow": "0px 4px 6px rgba(0,0,0,0.1)"}),
-        dcc.Interval(id="interval-update", interval=1000, n_intervals=0)
+        html.Div([
+            html.H4("Active Alerts", style={"margin": "0px 0px 10px 0px", "color": "#333"}),
+            html.Div(id="alerts-panel", children="No active alerts", style={"max-height": "200px", "overflow-y": "auto"}),
+            dcc.Store(id="alerts-version", data=-1),
+        ], style={"border": "2px solid #0d6efd", "padding": "10px", "border-radius": "10px",
+                  "background": "white", "margin": "10px", "box-shadow": "0px 4px 6px rgba(0,0,0,0.1)"})]),
+        html.Div(id="fleet-view", children=[
+            html.H3("Fleet Overview", style={"textAlign": "center", "color": "#fff", "padding": "10px",
+                                             "background-color": "#0d6efd", "border-radius": "5px",
+                                             "margin": "10px"}),
+            html.Div(id="fleet-summary", style={"display": "flex", "flex-wrap": "wrap", "gap": "10px",
+                                                "margin": "10px"}),
+            html.Div(id="fleet-grid", style={"display": "grid", "gap": "10px", "margin": "10px",
+                                             "grid-template-columns": "repeat(auto-fill, minmax(240px, 1fr))"}),
+            html.Div([
+                html.Button("◀", id="fleet-previous", n_clicks=0),
+                html.Span(id="fleet-page-label", style={"margin": "0px 15px"}),
+                html.Button("▶", id="fleet-next", n_clicks=0),
+            ], style={"textAlign": "center", "margin": "10px"}),
+            dcc.Store(id="fleet-page", data=0),
+        ], style={"display": "none"}),
+        dcc.Interval(id="interval-update", interval=UPDATE_INTERVAL, n_intervals=0)
     ],
     id="main-content",
     style={"margin-left": "0px", "padding": "15px", "background-color": "#ffffff",
@@ -133,26 +318,150 @@ content = html.Div(
 app.layout = html.Div([sidebar, content])
 
 # MQTT Callbacks
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
-        client.subscribe(MQTT_TOPIC)
+def on_connect(client, userdata, flags, reason_code, properties):
+    if reason_code == 0:
+        client.subscribe(MQTT_TOPIC, qos=MQTT_QOS)
+        ingest_connected.set()
+
+def on_disconnect(client, userdata, disconnect_flags, reason_code, properties):
+    ingest_connected.clear()
+
+def parse_message(payload):
+    """ Device, edge batch header (None for a single reading) and the samples of a message """
+    # Epoch ms are shifted to local wall-clock time, date axes show it as is
+    if is_batch(payload):
+        # Edge batch: raw sample blocks or aggregate windows, unpacked in bulk
+        header, taken, columns, seq = unpack(payload)
+        return header.get("device") or DEFAULT_DEVICE, header, (taken + time.localtime().tm_gmtoff * 1000, columns, seq)
+    reading = json.loads(payload.decode())
+    if not isinstance(reading, dict):
+        raise ValueError(f"Expected a JSON object, got {type(reading).__name__}")
+    # Spooled readings arrive late and carry the time they were taken
+    taken = float(reading.get("timestamp", time.time() * 1000))
+    values = [float(reading.get(category, np.nan)) for category in RAW_CHANNELS]
+    sample = (taken + time.localtime().tm_gmtoff * 1000, float(reading.get("seq", np.nan)), values)
+    return reading.get("device") or DEFAULT_DEVICE, None, sample
 
 def on_message(client, userdata, msg):
+    # Only parsed here, ingest_pending() pre-processes and stores the queued messages in batches
     try:
-        payload = json.loads(msg.payload.decode())
-        timestamp = time.strftime('%H:%M:%S')
-        sensor_data["time"].append(timestamp)
-        for category in sensor_data.keys():
-            if category != "time" and category in payload:
-                sensor_data[category].append(payload[category])
-    except:
-        pass
-
-mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-mqtt_client.on_connect = on_connect
-mqtt_client.on_message = on_message
-mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
-mqtt_client.loop_start()
+        ingest_queue.append(parse_message(msg.payload))
+    except (ValueError, KeyError, TypeError, zlib.error) as e:  # Also JSON and UTF-8 errors, both ValueErrors
+        print(f"⚠️ Dropped a malformed message on {msg.topic}: {e}")
+
+def ingest_pending():
+    """ Pre-process and store the messages queued since the last call, returns how many there were """
+    global messages_ingested
+    messages = []
+    while ingest_queue:
+        messages.append(ingest_queue.popleft())
+    readings = {}  # Device -> its single readings, pre-processed together
+    for device, header, sample in messages:
+        if header is None:
+            readings.setdefault(device, []).append(sample)
+            continue
+        taken, columns, seq = sample
+        if header["kind"] == "raw" and len(taken):
+            spectral.extend(taken[0], header["rate"], columns, device)
+        times, columns = preprocessor_for(device, None).process(columns, times=taken, seq=seq)
+        store_samples(times, columns, device)
+    for device, samples in readings.items():
+        taken, seq, values = (np.array(column, dtype=float) for column in zip(*samples))
+        times, columns = preprocessor_for(device).process(dict(zip(RAW_CHANNELS, values.T)), times=taken, seq=seq)
+        store_samples(times, columns, device)
+    messages_ingested += len(messages)
+    return len(messages)
+
+def store_samples(times, columns, device=None):
+    """ Add pre-processed samples and their derived channels to the live buffers, history, alerts and fleet """
+    global samples_received
+    if not len(times):
+        return
+    device = device or DEFAULT_DEVICE
+    columns.update(derived_channels.compute(times, columns))
+    times = times.astype(np.int64)
+    with sensor_lock:
+        sensor_data["time"].extend(times[-MAX_DATA_POINTS:].tolist())
+        for category, values in columns.items():
+            sensor_data[category].extend(values[-MAX_DATA_POINTS:].tolist())
+        samples_received += len(times)
+    fleet.update(times, columns, device)
+    history.append_batch(times, columns, device)
+    alert_engine.submit_batch(times, columns, device)
+
+# Ingestion, started in the background once per process after the app is initialised. Nothing
+# connects or starts a thread at import, so gunicorn can preload the module and fork workers.
+# Every worker ingests every message, but only the one holding the history lock migrates and
+# appends to the history file.
+RECONNECT_DELAY = (1, 60)  # s, backoff doubling from the first to the second while the broker is unreachable
+mqtt_client = None
+ingest_connected = threading.Event()
+ingest_queue = deque()  # Parsed messages waiting to be pre-processed and stored
+messages_ingested = 0  # Messages pre-processed and stored since the start
+_ingest_lock = threading.Lock()
+_ingest_pid = None  # Process that started ingestion, a forked worker starts its own
+_history_lock = None  # Lock file held by the process writing the history, until it exits
+
+def offload(function, *args):
+    """ Call CPU-bound work, in a native thread when gevent patched this worker, so greenlets keep being served """
+    if "gevent" in sys.modules:
+        from gevent import get_hub, monkey
+        if monkey.is_module_patched("threading"):
+            return get_hub().threadpool.apply(function, args)
+    return function(*args)
+
+def start_ingest():
+    """ Load the stored history, then connect to the broker without blocking, once per process """
+    global _ingest_pid
+    if _ingest_pid == os.getpid():
+        return
+    with _ingest_lock:
+        if _ingest_pid == os.getpid():
+            return
+        _ingest_pid = os.getpid()
+    threading.Thread(target=run_ingest, name="ingest", daemon=True).start()
+
+def claim_history():
+    """ Whether this process writes the history file: the first of the workers to lock it """
+    global _history_lock
+    if fcntl is None:
+        return True
+    file = open(HISTORY_PATH + ".lock", "a")
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        return False
+    _history_lock = file
+    return True
+
+def run_ingest():
+    global mqtt_client
+    history.write = claim_history()
+    if os.path.exists(HISTORY_PATH):
+        try:
+            offload(history.load, HISTORY_PATH, history.write)  # Only the writer migrates the file
+        except Exception as e:
+            # Appending to a file that could not be read or migrated would corrupt it
+            history.write = False
+            print(f"❌ Loading the history from {HISTORY_PATH} failed, it is not written to: {e}")
+    mqtt_client = create_client(config=BROKER_CONFIG)
+    mqtt_client.on_connect = on_connect
+    mqtt_client.on_disconnect = on_disconnect
+    mqtt_client.on_message = on_message
+    mqtt_client.reconnect_delay_set(*RECONNECT_DELAY)
+    mqtt_client.connect_async(MQTT_BROKER, MQTT_PORT, 60)
+    mqtt_client.loop_start()  # Connects and reconnects in its own thread
+    alert_engine.start()
+    while True:
+        time.sleep(INGEST_INTERVAL)
+        try:
+            offload(ingest_pending)
+        except Exception as e:
+            print(f"❌ Storing received messages failed, they are dropped: {e}")
+
+# Workers started by gunicorn.conf.py begin ingesting right away, other servers on the first request
+server.before_request(start_ingest)
 
 # Callbacks
 @app.callback(
@@ -176,30 +485,339 @@ def toggle_sidebar(n_clicks, sidebar_style, content_style):
 def update_title(preprocess_value):
     return f"Selected Option: {preprocess_value}" if preprocess_value else "Selected Options: None"
 
+def typed_array(values, dtype="f8"):
+    # Plotly.js has no 64-bit integer arrays, epoch ms fit exactly in float64
+    data = np.asarray(values, dtype="<" + dtype)
+    array = {"dtype": dtype, "bdata": base64.b64encode(data.tobytes()).decode("ascii")}
+    if data.ndim > 1:
+        array["shape"] = ", ".join(map(str, data.shape))
+    return array
+
+def date_ms(date):
+    # Picked dates are wall-clock dates, like the stored timestamps
+    return int(datetime.fromisoformat(date[:10]).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def history_bounds(start_date, end_date):
+    """ Picked date range in ms, the whole stored history where unset """
+    start = date_ms(start_date) if start_date else history.start
+    end = date_ms(end_date) + DAY_MS if end_date else history.end
+    return start, end
+
+def snapshot(channel):
+    """ Sequence number of the newest sample and the aligned time and value windows """
+    with sensor_lock:
+        times, values = list(sensor_data["time"]), list(sensor_data[channel])
+        seq = samples_received
+    count = min(len(times), len(values))
+    return seq, times[-count:] if count else [], values[-count:] if count else []
+
+def empty_figure(title="No Data Available"):
+    return go.Figure(
+        data=[go.Scatter(x=[], y=[], mode="lines+markers")],
+        layout=go.Layout(title=title, xaxis={"title": "Time"}, yaxis={"title": "Sensor Value"})
+    )
+
+def history_figure(channel, cursor, window):
+    """ Stored window [cursor, cursor + window) of a channel, with its min-max band when aggregated """
+    level, times, mean, minimum, maximum = history_windows.window(channel, cursor, cursor + window)
+    if not len(times):
+        return empty_figure()
+    encode = (lambda values: values.tolist()) if GRAPH_TRANSPORT == "json" else typed_array
+    data = []
+    if level.size > history.levels[0].size:
+        times = times + level.size // 2  # Plot buckets at their centre
+        data.append({"type": "scatter", "x": encode(times), "y": encode(maximum), "mode": "lines",
+                     "line": {"width": 0}, "showlegend": False, "hoverinfo": "skip"})
+        data.append({"type": "scatter", "x": encode(times), "y": encode(minimum), "mode": "lines",
+                     "line": {"width": 0}, "fill": "tonexty", "fillcolor": "rgba(13,110,253,0.2)",
+                     "name": "Min-Max"})
+    data.append({"type": "scatter", "x": encode(times), "y": encode(mean), "mode": "lines",
+                 "line": {"color": "#0d6efd"}, "name": channel})
+    layout = go.Layout(
+        title=f"HVAC Sensor History: {channel}",
+        xaxis={"title": "Time", "type": "date", "range": [cursor, cursor + window]},
+        yaxis={"title": channel},
+        template="plotly_white"
+    )
+    return {"data": data, "layout": layout}
+
+@lru_cache(maxsize=16)
+def spectral_figure(device, channel, view, version):
+    """ Spectrum or spectrogram of a device's channel STFT at `version`, shared by every viewer of it """
+    stream = spectral.get(channel, device)
+    if stream is None:
+        return empty_figure(f"No high-rate samples of {channel} from {device}")
+    encode = (lambda values: values.tolist()) if GRAPH_TRANSPORT == "json" else typed_array
+    if view == "T-F":
+        times, freqs, power = stream.spectrogram()
+        trace = {"type": "heatmap", "x": encode(times), "y": encode(freqs),
+                 "z": power.tolist() if GRAPH_TRANSPORT == "json" else typed_array(power, "f4"),
+                 "colorscale": "Viridis", "colorbar": {"title": {"text": "dB/Hz"}}}
+        title = f"Spectrogram: {channel} of {device}"
+        xaxis = {"title": "Time", "type": "date", "tickformat": "%H:%M:%S"}
+        yaxis = {"title": "Frequency (Hz)"}
+    else:
+        freqs, power = stream.spectrum()
+        trace = {"type": "scatter", "x": encode(freqs), "y": encode(power), "mode": "lines", "name": channel}
+        title = f"Spectrum: {channel} of {device} (latest {SPECTRUM_FRAMES} frames)"
+        xaxis = {"title": "Frequency (Hz)"}
+        yaxis = {"title": "PSD (dB/Hz)"}
+    layout = go.Layout(title=f"{title}, {stream.rate:g} Hz sampling", xaxis=xaxis, yaxis=yaxis,
+                       template="plotly_white")
+    return {"data": [trace], "layout": layout}
+
+def format_time(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%H:%M:%S")
+
 @app.callback(
-    Output("live-graph", "figure"),
+    [Output("alerts-panel", "children"), Output("alerts-version", "data")],
     Input("interval-update", "n_intervals"),
-    Input("preprocess-dropdown", "value")
+    State("alerts-version", "data")
+)
+def update_alerts(n_intervals, version):
+    if alert_engine.version == version:
+        return no_update, no_update
+    alerts = alert_engine.alerts()
+    if not alerts:
+        return "No active alerts", alert_engine.version
+    rows = [
+        html.Div([
+            html.Span(alert["severity"].upper(), style={"color": "white", "padding": "2px 8px", "border-radius": "4px",
+                                                         "background": ALERT_COLORS.get(alert["severity"], "#6c757d"),
+                                                         "font-size": "12px", "margin-right": "10px"}),
+            html.B(alert["rule"]),
+            html.Span(f" on {alert['device']}: {alert['value']:.2f} since {format_time(alert['since'])}"
+                      + (f" (×{alert['count']})" if alert["count"] > 1 else ""), style={"color": "#555"}),
+        ], style={"padding": "4px 0px", "border-bottom": "1px solid #eee"})
+        for alert in alerts
+    ]
+    return rows, alert_engine.version
+
+@app.callback(
+    [Output("device-view", "style"), Output("fleet-view", "style")],
+    Input("url", "pathname")
+)
+def toggle_view(pathname):
+    if pathname == "/fleet":
+        return {"display": "none"}, {"display": "block"}
+    return {"display": "block"}, {"display": "none"}
+
+def format_kpi(value, digits=1):
+    return "–" if value is None or value != value else f"{value:,.{digits}f}"
+
+def fleet_tile(label, value):
+    return html.Div([
+        html.Div(label, style={"color": "#555", "font-size": "12px"}),
+        html.Div(value, style={"font-size": "22px", "font-weight": "bold", "color": "#333"}),
+    ], style={"border": "2px solid #0d6efd", "border-radius": "10px", "padding": "10px", "min-width": "130px",
+              "background": "white", "box-shadow": "0px 4px 6px rgba(0,0,0,0.1)"})
+
+def fleet_card(device):
+    status = device["status"] or ("ok" if device["online"] else "offline")
+    color = ALERT_COLORS.get(device["status"], "#198754" if device["online"] else "#6c757d")
+    return html.Div([
+        html.Div([
+            html.B(device["device"], style={"flex-grow": "1"}),
+            html.Span(status.upper(), style={"color": "white", "padding": "2px 8px", "border-radius": "4px",
+                                             "background": color, "font-size": "12px"}),
+        ], style={"display": "flex", "alignItems": "center"}),
+        html.Div(device["sparkline"] or " ", title=f"{FLEET_SPARKLINE}, last {len(device['sparkline'])} min",
+                 style={"font-size": "20px", "color": "#0d6efd", "letter-spacing": "1px", "white-space": "nowrap",
+                        "overflow": "hidden"}),
+        html.Div([html.Div(f"{channel}: {format_kpi(value, 2)}") for channel, value in device["latest"].items()],
+                 style={"font-size": "13px", "color": "#333"}),
+        html.Div(f"Uptime (24 h): {device['uptime']:.0%} · last seen {format_time(device['last_seen'])}",
+                 style={"font-size": "12px", "color": "#555", "margin-top": "5px"}),
+    ], style={"border": f"2px solid {color}", "border-radius": "10px", "padding": "10px", "background": "white",
+              "box-shadow": "0px 4px 6px rgba(0,0,0,0.1)"})
+
+@app.callback(
+    Output("fleet-page", "data"),
+    Input("fleet-previous", "n_clicks"),
+    Input("fleet-next", "n_clicks"),
+    State("fleet-page", "data")
 )
-def update_graph(n_intervals, preprocess_value):
+def change_fleet_page(previous_clicks, next_clicks, page):
+    pages = max(-(-len(fleet.names) // PAGE_SIZE), 1)
+    step = -1 if ctx.triggered_id == "fleet-previous" else 1 if ctx.triggered_id == "fleet-next" else 0
+    return min(max(page + step, 0), pages - 1)
+
+@app.callback(
+    [Output("fleet-summary", "children"), Output("fleet-grid", "children"), Output("fleet-page-label", "children")],
+    Input("interval-update", "n_intervals"),
+    Input("fleet-page", "data"),
+    Input("url", "pathname")
+)
+def update_fleet(n_intervals, page, pathname):
+    if pathname != "/fleet":
+        return no_update, no_update, no_update
+    # One page of the summary table, the cost doesn't grow with the fleet
+    now = (time.time() + time.localtime().tm_gmtoff) * 1000
+    summary, devices = fleet.overview(now, page * PAGE_SIZE, PAGE_SIZE)
+    tiles = [
+        fleet_tile("Devices", f"{summary['devices']:,}"),
+        fleet_tile("Online", f"{summary['online']:,}"),
+        fleet_tile("Alerting", f"{summary['alerting']:,}"),
+        fleet_tile("Uptime (24 h)", "–" if summary["uptime"] is None else f"{summary['uptime']:.0%}"),
+    ] + [
+        fleet_tile(f"{'Total' if channel in FLEET_TOTALS else 'Mean'} {channel}", format_kpi(value))
+        for channel, value in summary["kpis"].items()
+    ]
+    pages = max(-(-summary["devices"] // PAGE_SIZE), 1)
+    return tiles, [fleet_card(device) for device in devices] or "No devices yet", f"Page {page + 1} of {pages}"
+
+@app.callback(
+    Output("history-controls", "style"),
+    Input("graph-mode", "value"),
+    State("history-controls", "style")
+)
+def toggle_history_controls(mode, controls_style):
+    controls_style["display"] = "block" if mode == "history" else "none"
+    return controls_style
+
+@app.callback(
+    Output("playback-button", "children"),
+    Input("playback-button", "n_clicks")
+)
+def toggle_playback(n_clicks):
+    return "Pause" if n_clicks % 2 else "Play"
+
+@app.callback(
+    [Output("history-cursor", "min"), Output("history-cursor", "max"), Output("history-cursor", "value")],
+    Input("interval-update", "n_intervals"),
+    Input("history-range", "start_date"),
+    Input("history-range", "end_date"),
+    Input("history-window", "value"),
+    Input("graph-mode", "value"),
+    [State("history-cursor", "value"), State("playback-button", "n_clicks"), State("playback-speed", "value")]
+)
+def update_cursor(n_intervals, start_date, end_date, window, mode, cursor, play_clicks, speed):
+    start, end = history_bounds(start_date, end_date)
+    if mode != "history" or start is None:
+        return no_update, no_update, no_update
+    last = max(end - window, start)
+    if ctx.triggered_id == "interval-update":
+        if not play_clicks % 2:
+            return no_update, no_update, no_update
+        cursor = (cursor or start) + speed * UPDATE_INTERVAL
+    cursor = min(max(cursor or start, start), last)
+    return start, last, cursor
+
+@app.callback(
+    Output("device-dropdown", "options"),
+    Input("interval-update", "n_intervals"),
+    State("device-dropdown", "options")
+)
+def update_devices(n_intervals, options):
+    devices = spectral.devices()
+    if [option["value"] for option in options or []] == devices:
+        return no_update
+    return [{"label": device, "value": device} for device in devices]
+
+@app.callback(
+    [Output("live-graph", "figure"), Output("live-graph", "extendData"), Output("live-graph-state", "data")],
+    Input("interval-update", "n_intervals"),
+    Input("preprocess-dropdown", "value"),
+    Input("feature-extraction-dropdown", "value"),
+    Input("device-dropdown", "value"),
+    Input("graph-mode", "value"),
+    Input("history-cursor", "value"),
+    Input("history-window", "value"),
+    State("live-graph-state", "data")
+)
+def update_graph(n_intervals, preprocess_value, feature, device, mode, cursor, window, graph_state):
+    if mode == "history":
+        if ctx.triggered_id == "interval-update":
+            return no_update, no_update, no_update  # Playback moves the cursor instead
+        if not preprocess_value or history.start is None:
+            return empty_figure(), no_update, None
+        return history_figure(preprocess_value, cursor or history.start, window), no_update, None
+
+    if preprocess_value and feature in SPECTRAL_VIEWS:
+        # Re-rendered only when the device's STFT of the channel has new frames
+        devices = spectral.devices(preprocess_value)
+        device = device or (devices[0] if devices else DEFAULT_DEVICE)
+        stream = spectral.get(preprocess_value, device)
+        state = {"channel": preprocess_value, "view": feature, "device": device,
+                 "seq": stream.count if stream else 0, "worker": os.getpid()}
+        if graph_state == state:
+            return no_update, no_update, no_update
+        return spectral_figure(device, preprocess_value, feature, state["seq"]), no_update, state
+
     if not sensor_data["time"] or not preprocess_value:
-        return go.Figure(
-            data=[go.Scatter(x=[], y=[], mode="lines+markers")],
-            layout=go.Layout(title="No Data Available", xaxis={"title": "Time"}, yaxis={"title": "Sensor Value"})
-        )
-    trace = go.Scatter(
-        x=list(sensor_data["time"]),
-        y=list(sensor_data[preprocess_value]),
-        mode="lines+markers",
-        name=preprocess_value
-    )
+        return empty_figure(), no_update, None
+
+    # Sequence numbers are counted by every worker process, deltas only follow on from the same one
+    seq, times, values = snapshot(preprocess_value)
+    state = {"channel": preprocess_value, "seq": seq, "worker": os.getpid()}
+    if GRAPH_TRANSPORT == "delta" and graph_state and graph_state.get("channel") == preprocess_value \
+            and graph_state.get("worker") == state["worker"] and "view" not in graph_state:
+        added = seq - graph_state["seq"]
+        if added == 0:
+            return no_update, no_update, no_update
+        if 0 < added <= len(times):
+            update = {"x": [times[-added:]], "y": [values[-added:]]}
+            return no_update, [update, [0], MAX_DATA_POINTS], state
+
+    if GRAPH_TRANSPORT in ("json", "delta"):  # Plotly.js only extends traces of plain arrays
+        x, y = times, values
+    else:
+        x, y = typed_array(times), typed_array(values)
+    trace = {"type": "scatter", "x": x, "y": y, "mode": "lines+markers", "name": preprocess_value}
     layout = go.Layout(
         title=f"Live HVAC Sensor Data: {preprocess_value}",
-        xaxis={"title": "Time"},
+        xaxis={"title": "Time", "type": "date", "tickformat": "%H:%M:%S"},
         yaxis={"title": preprocess_value},
         template="plotly_white"
     )
-    return {"data": [trace], "layout": layout}
+    return {"data": [trace], "layout": layout}, no_update, state
+
+# Export API
+def export_time(value):
+    # Epoch ms or an ISO date / date-time, wall-clock like the stored timestamps
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+@server.route("/api/export")
+def export_history():
+    """ Stored history as CSV, Arrow IPC or Parquet, streamed straight from the history file
+
+    GET /api/export?format=parquet&devices=chiller-1,chiller-2&channels=Temp (T),Power (P)&start=2026-10-01&end=2026-11-01
+    Every parameter is optional: CSV of every device and channel over the whole history by default.
+    """
+    fmt = request.args.get("format", "csv")
+    channels = [c.strip() for c in request.args.get("channels", "").split(",") if c.strip()] or history.channels
+    devices = [d.strip() for d in request.args.get("devices", "").split(",") if d.strip()]
+    unknown = [channel for channel in channels if channel not in history.channels]
+    if fmt not in FORMATS:
+        return {"error": f"Unknown format {fmt!r}, use one of {', '.join(FORMATS)}"}, 400
+    if unknown:
+        return {"error": f"Unknown channels: {', '.join(unknown)}"}, 400
+    try:
+        start, end = export_time(request.args.get("start")), export_time(request.args.get("end"))
+    except ValueError as e:
+        return {"error": f"Invalid time: {e}"}, 400
+    if not os.path.exists(HISTORY_PATH):
+        return {"error": "No history stored yet"}, 404
+    # Checked before the response starts, an export can't fail once its headers are sent
+    columns = header(HISTORY_PATH)
+    missing = [column for column in ["time", "device"] + channels if column not in columns]
+    if missing:
+        return ({"error": f"The history file has no {', '.join(missing)} column yet, it is being migrated"},
+                503, {"Retry-After": "10"})
+
+    def stream():
+        # Every batch is parsed, filtered and written off the event loop, live callbacks aren't held up
+        chunks = export(HISTORY_PATH, fmt, channels, start, end, devices)
+        while (data := offload(next, chunks, None)) is not None:
+            yield data
+
+    mimetype, extension = FORMATS[fmt]
+    return Response(stream(), mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="hvac_history{extension}"'})
 
 # ✅ Expose server for deployment
 server = app.server
@@ -0,0 +1,17 @@
+import os
+import sys
+
+# The dashboard modules live at the repository root, next to this directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def dashboard(tmp_path_factory):
+    """ The dashboard module on the in-process broker, with a history file of its own """
+    os.environ.update(HVAC_BROKER_BACKEND="inprocess",  # Before the dashboard is imported
+                      HVAC_HISTORY_PATH=str(tmp_path_factory.mktemp("history") / "history.csv"))
+    import python_hvac_iot_dashboard
+    python_hvac_iot_dashboard._ingest_pid = os.getpid()  # No background ingestion, tests store what they send
+    return python_hvac_iot_dashboard
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from hvac_alerts import AlertEngine, compile_expression
+
+
+def events(engine):
+    return [(event["event"], event["rule"], event["device"], event.get("raised"), event.get("resolved"))
+            for event in engine.events]
+
+
+def test_threshold_raises_once_and_resolves_back_in_range():
+    engine = AlertEngine([{"name": "band", "channel": "f", "min": 49, "max": 51}])
+    engine.evaluate([0, 1000, 2000, 3000, 4000], ["a"] * 5, {"f": [50, 52, 53, 48, 50]})
+
+    # Out of range from 1000 to 3000 without a gap, one alert until 4000
+    assert events(engine) == [("raised", "band", "a", 1000.0, None), ("resolved", "band", "a", 1000.0, 4000.0)]
+    assert engine.active == {}
+
+
+def test_alert_stays_active_across_batches_until_back_in_range():
+    engine = AlertEngine([{"name": "hot", "channel": "t", "max": 30}])
+    engine.evaluate([0], ["a"], {"t": [35]})
+    engine.evaluate([1000, 2000], ["a", "a"], {"t": [36, 31]})
+    assert [alert["raised"] for alert in engine.alerts()] == [0.0]
+    assert len(engine.events) == 1
+
+    engine.evaluate([3000, 4000], ["a", "a"], {"t": [25, 40]})
+    assert [event["event"] for event in engine.events] == ["raised", "resolved", "raised"]
+    assert engine.alerts()[0]["count"] == 2 and engine.alerts()[0]["since"] == 4000.0
+
+
+def test_missing_values_do_not_violate():
+    engine = AlertEngine([{"name": "hot", "channel": "t", "max": 30}])
+    engine.evaluate([0, 1000], ["a", "a"], {"t": [np.nan, 20]})
+    engine.submit(2000, {}, "a")  # Without the channel at all
+    engine.flush()
+    assert not engine.events
+
+
+def test_sustained_rule_waits_for_its_duration():
+    engine = AlertEngine([{"name": "hot", "channel": "t", "max": 30, "for": 10}])
+    engine.evaluate([0, 5000], ["a", "a"], {"t": [35, 35]})
+    assert not engine.events
+    engine.evaluate([9000], ["a"], {"t": [35]})
+    assert not engine.events
+    engine.evaluate([10_000, 11_000], ["a", "a"], {"t": [35, 35]})
+    assert [(event["since"], event["raised"]) for event in engine.events] == [(0.0, 10_000.0)]
+
+
+def test_sustained_rule_restarts_after_a_reading_in_range():
+    engine = AlertEngine([{"name": "hot", "channel": "t", "max": 30, "for": 10}])
+    engine.evaluate([0, 8000, 9000, 15_000, 19_000], ["a"] * 5, {"t": [35, 35, 20, 35, 35]})
+    assert not engine.events
+    engine.evaluate([25_000], ["a"], {"t": [35]})
+    assert [(event["since"], event["raised"]) for event in engine.events] == [(15_000.0, 25_000.0)]
+
+
+def test_devices_are_followed_on_their_own():
+    engine = AlertEngine([{"name": "hot", "channel": "t", "max": 30, "for": 2}])
+    # Interleaved messages, "b" is in range in between so never violated for 2 s
+    engine.evaluate([0, 0, 1000, 1000, 2000, 2000], ["a", "b", "a", "b", "a", "b"], {"t": [35, 35, 35, 20, 35, 35]})
+    assert [(event["device"], event["raised"]) for event in engine.events] == [("a", 2000.0)]
+
+
+def test_rate_of_change_is_per_device():
+    engine = AlertEngine([{"name": "rising", "channel": "t", "rate": True, "max": 0.5}])
+    engine.evaluate([0, 0], ["a", "b"], {"t": [20, 30]})
+    engine.evaluate([10_000, 10_000], ["a", "b"], {"t": [30, 31]})  # 1 K/s and 0.1 K/s
+    assert [(event["device"], event["value"]) for event in engine.events] == [("a", 1.0)]
+
+
+def test_cross_channel_expression():
+    engine = AlertEngine([{"name": "pf", "expr": "{P} / ({V} * {I})", "max": 1, "severity": "critical"}])
+    statuses = []
+    engine.on_status = lambda device, severity: statuses.append((device, severity))
+    engine.evaluate([0, 1000], ["a", "a"], {"P": [900, 1100], "V": [100, 100], "I": [10, 10]})
+    assert [event["value"] for event in engine.events] == [1.1]
+    assert statuses == [("a", "critical")]
+
+
+def test_submitted_messages_are_evaluated_on_flush():
+    engine = AlertEngine([{"name": "hot", "channel": "t", "max": 30}])
+    engine.submit(0, {"t": 35}, "a")
+    engine.submit_batch([1000, 2000], {"t": [20, 40]}, "b")
+    assert not engine.events
+    engine.flush()
+    assert [(event["device"], event["raised"]) for event in engine.events] == [("a", 0.0), ("b", 2000.0)]
+
+
+def test_expressions_only_allow_arithmetic():
+    channels, evaluate = compile_expression("sqrt({a}) + abs({b})")
+    assert channels == ["a", "b"]
+    assert evaluate({"a": np.array([4.0]), "b": np.array([-1.0]), "time": np.zeros(1)}).tolist() == [3.0]
+    with pytest.raises(ValueError):
+        compile_expression("__import__('os').system('true')")
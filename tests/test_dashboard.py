@@ -0,0 +1,88 @@
+import numpy as np
+
+CHANNEL = "Voltage (V)"
+
+
+def live_graph(client, graph_state):
+    """ Outputs of the live graph callback for the next tick, as the page requests it """
+    body = {
+        "output": "..live-graph.figure...live-graph.extendData...live-graph-state.data..",
+        "outputs": [{"id": "live-graph", "property": "figure"}, {"id": "live-graph", "property": "extendData"},
+                    {"id": "live-graph-state", "property": "data"}],
+        "inputs": [{"id": "interval-update", "property": "n_intervals", "value": 1},
+                   {"id": "preprocess-dropdown", "property": "value", "value": CHANNEL},
+                   {"id": "feature-extraction-dropdown", "property": "value", "value": None},
+                   {"id": "device-dropdown", "property": "value", "value": None},
+                   {"id": "graph-mode", "property": "value", "value": "live"},
+                   {"id": "history-cursor", "property": "value", "value": 0},
+                   {"id": "history-window", "property": "value", "value": 3_600_000}],
+        "changedPropIds": ["interval-update.n_intervals"],
+        "state": [{"id": "live-graph-state", "property": "data", "value": graph_state}],
+    }
+    response = client.post("/_dash-update-component", json=body)
+    assert response.status_code == 200
+    return response.get_json()["response"]
+
+
+def extend_traces(figure, update, max_points):
+    """ What Plotly.extendTraces does to the figure in the browser, which only extends plain arrays """
+    data, indices, _ = update
+    for index in indices:
+        trace = figure["data"][index]
+        for key, values in data.items():
+            assert isinstance(trace[key], list), f"cannot extend missing or non-array attribute: {key}"
+            trace[key] = (trace[key] + values[0])[-max_points:]
+
+
+def test_live_graph_deltas_extend_the_first_figure(dashboard):
+    client = dashboard.server.test_client()
+    start = 1_700_000_000_000
+    dashboard.store_samples(start + np.arange(10) * 2000, {CHANNEL: np.arange(10.0)})
+    outputs = live_graph(client, None)
+    figure = outputs["live-graph"]["figure"]
+    state = outputs["live-graph-state"]["data"]
+
+    for tick in range(1, 4):
+        times = start + (10 * tick + np.arange(10)) * 2000
+        dashboard.store_samples(times, {CHANNEL: 10.0 * tick + np.arange(10)})
+        outputs = live_graph(client, state)
+        assert "figure" not in outputs["live-graph"]
+        extend_traces(figure, outputs["live-graph"]["extendData"], dashboard.MAX_DATA_POINTS)
+        state = outputs["live-graph-state"]["data"]
+
+    assert figure["data"][0]["y"] == dashboard.snapshot(CHANNEL)[2]
+    assert figure["data"][0]["y"][-1] == 39.0
+
+
+class Message:
+    topic = "hvac/sensor"
+
+    def __init__(self, payload):
+        self.payload = payload if isinstance(payload, bytes) else payload.encode()
+
+
+def test_malformed_messages_are_dropped_and_logged(dashboard, capsys):
+    for payload in ["{not json", "[1, 2]", '{"Voltage (V)": "high"}', b"\x78\x9c garbage"]:
+        dashboard.on_message(None, None, Message(payload))
+        assert "Dropped a malformed message" in capsys.readouterr().out
+    assert not dashboard.ingest_queue
+
+
+def test_readings_and_edge_batches_are_stored_in_bulk(dashboard):
+    import json
+    from hvac_edge import EdgeBuffer
+
+    start = 1_800_000_000_000
+    for i in range(5):
+        reading = {CHANNEL: 230.0 + i, "timestamp": start + i * dashboard.SAMPLE_PERIOD, "seq": i, "device": "reader"}
+        dashboard.on_message(None, None, Message(json.dumps(reading)))
+    dashboard.on_message(None, None, Message(json.dumps(reading)))  # Redelivered
+    buffer = EdgeBuffer([CHANNEL], rate=1000)
+    buffer.extend(start, np.full((1, 2000), 220.0))
+    dashboard.on_message(None, None, Message(buffer.pack_raw(0, device="edge")))
+
+    received = dashboard.samples_received
+    assert dashboard.ingest_pending() == 7
+    # The open 2 s bucket of the readings waits for the next one, raw samples are stored at their own rate
+    assert dashboard.samples_received - received == 4 + 2000
+    assert dashboard.spectral.get(CHANNEL, "edge") is not None
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+
+from hvac_edge import EdgeBuffer, is_batch, unpack
+
+CHANNELS = ["Vibration", "Temp (T)"]
+
+
+def buffered(samples=2000, rate=1000, start=1_700_000_000_000):
+    rng = np.random.default_rng(0)
+    block = rng.normal(0, 2, (len(CHANNELS), samples)).astype(np.float32)
+    buffer = EdgeBuffer(CHANNELS, rate)
+    buffer.extend(start, block[:, :samples // 2])
+    buffer.extend(start + samples // 2 * 1000 / rate, block[:, samples // 2:])
+    return buffer, block
+
+
+def test_raw_batch_round_trip():
+    buffer, block = buffered()
+    payload = buffer.pack_raw(100, device="chiller-1")
+    assert is_batch(payload) and not is_batch(json.dumps({"seq": 1}).encode())
+    assert len(buffer) == 0 and buffer.start is None
+
+    header, times, columns, seq = unpack(payload)
+    assert header["kind"] == "raw" and header["device"] == "chiller-1"
+    assert times[0] == 1_700_000_000_000 and np.allclose(np.diff(times), 1.0)
+    assert seq.tolist() == list(range(100, 2100))
+    for channel, values in zip(CHANNELS, block):
+        assert np.array_equal(columns[channel], values)
+
+
+def test_aggregate_batch_round_trip():
+    buffer, block = buffered(samples=2050)
+    payload = buffer.pack_aggregate(7, 100)
+    assert len(buffer) == 50  # The incomplete window waits for the next batch
+    assert buffer.start == 1_700_000_000_000 + 2000
+
+    header, times, columns, seq = unpack(payload)
+    assert header["kind"] == "aggregate" and header["count"] == 20
+    assert times.tolist() == [1_700_000_000_000 + 100 * i for i in range(20)]
+    assert seq.tolist() == list(range(7, 27))
+    windows = block[0, :2000].astype(float).reshape(20, 100)
+    assert np.allclose(columns["Vibration"], windows.mean(axis=1), atol=1e-5)
+    assert np.allclose(columns["Vibration Min"], windows.min(axis=1))
+    assert np.allclose(columns["Vibration Max"], windows.max(axis=1))
+    assert np.allclose(columns["Vibration RMS"], np.sqrt(np.square(windows).mean(axis=1)), atol=1e-5)
+    assert sorted(columns) == sorted(f"{channel}{suffix}" for channel in CHANNELS
+                                     for suffix in ("", " Min", " Max", " RMS"))
+
+
+def test_vibration_rms_is_stored_from_aggregate_batches(dashboard):
+    class Message:
+        topic = "hvac/sensor"
+
+    buffer, block = buffered(samples=4000, start=1_750_000_000_000)  # Times no other test stores
+    message = Message()
+    message.payload = buffer.pack_aggregate(0, 100, device="edge-aggregate")
+    dashboard.on_message(None, None, message)
+    dashboard.ingest_pending()
+
+    level = dashboard.history.levels[0]
+    start = 1_750_000_000_000 + dashboard.time.localtime().tm_gmtoff * 1000
+    times, mean, _, _ = dashboard.history.query("Vibration RMS", start, start + 4000, level)
+    windows = block[0].astype(float).reshape(40, 100)
+    expected = np.sqrt(np.square(windows).mean(axis=1)).reshape(4, 10).mean(axis=1)  # 1 s history buckets
+    assert times.tolist() == [start + 1000 * i for i in range(4)]
+    assert np.allclose(mean, expected, atol=1e-5)
@@ -0,0 +1,71 @@
+import io
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as csv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+
+from hvac_export import FORMATS, export
+from hvac_history import HistoryStore
+
+CHANNELS = ["Temp (T)", "Power (P)"]
+
+
+def read(data, fmt):
+    if fmt == "csv":
+        return csv.read_csv(io.BytesIO(data))
+    if fmt == "arrow":
+        return ipc.open_stream(data).read_all()
+    return pq.read_table(io.BytesIO(data))
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = str(tmp_path / "history.csv")
+    store = HistoryStore(CHANNELS, path)
+    for i, device in enumerate(["chiller-1", "chiller-2", 'odd, "quoted"']):
+        times = 1_700_000_000_000 + np.arange(100) * 1000
+        store.append_batch(times, {"Temp (T)": np.arange(100.0) + i, "Power (P)": np.full(100, np.nan)}, device)
+    store.close()
+    return path
+
+
+@pytest.mark.parametrize("fmt", list(FORMATS))
+def test_export_round_trips_every_format(history, fmt):
+    table = read(b"".join(export(history, fmt, CHANNELS)), fmt)
+    assert table.column_names == ["time", "device"] + CHANNELS
+    assert table.num_rows == 300
+    times = table.column("time").cast(pa.timestamp("ms")).cast(pa.int64())
+    assert times.to_pylist()[:2] == [1_700_000_000_000, 1_700_000_001_000]
+    assert table.column("Power (P)").null_count == 300
+    assert table.column("device").to_pylist()[-1] == 'odd, "quoted"'
+
+
+@pytest.mark.parametrize("fmt", list(FORMATS))
+def test_export_filters_time_devices_and_channels(history, fmt):
+    start = 1_700_000_000_000 + 10_000
+    data = b"".join(export(history, fmt, ["Temp (T)"], start, start + 5000, ["chiller-2"]))
+    table = read(data, fmt)
+    assert table.column_names == ["time", "device", "Temp (T)"]
+    assert table.column("Temp (T)").to_pylist() == [11.0, 12.0, 13.0, 14.0, 15.0]
+    assert set(table.column("device").to_pylist()) == {"chiller-2"}
+
+
+def test_export_endpoint(dashboard, tmp_path, monkeypatch):
+    client = dashboard.server.test_client()
+    start = 1_760_000_000_000  # Times no other test stores
+    dashboard.history.append_batch(start + np.arange(3) * 1000, {"Temp (T)": [20.0, 21.0, 22.0]}, "exported")
+    response = client.get(f"/api/export?format=parquet&devices=exported&channels=Temp (T)&start={start}")
+    assert response.status_code == 200
+    assert read(response.data, "parquet").column("Temp (T)").to_pylist() == [20.0, 21.0, 22.0]
+    assert client.get("/api/export?format=xml").status_code == 400
+    assert client.get("/api/export?channels=Unknown").status_code == 400
+
+    # A history file written before devices were stored, until it is migrated
+    old = tmp_path / "old.csv"
+    old.write_text('time,"Temp (T)"\n1000,20.0\n', encoding="utf-8")
+    monkeypatch.setattr(dashboard, "HISTORY_PATH", str(old))
+    response = client.get("/api/export")
+    assert response.status_code == 503 and response.headers["Retry-After"]
@@ -0,0 +1,67 @@
+import numpy as np
+
+from hvac_fleet import FleetSummary, sparkline_text, MINUTE, OFFLINE_AFTER, SPARK_CHARS
+
+KPIS = ["Power (P)", "Temp (T)"]
+
+
+def fleet(**options):
+    return FleetSummary(KPIS, "Power (P)", totals=["Power (P)"], **options)
+
+
+def test_sparkline_text_scales_to_its_range():
+    assert sparkline_text([0, 5, 10]) == SPARK_CHARS[0] + SPARK_CHARS[4] + SPARK_CHARS[-1]
+    assert sparkline_text([1, np.nan, 1]) == SPARK_CHARS[0] + " " + SPARK_CHARS[0]
+    assert sparkline_text([np.nan]) == ""
+
+
+def test_summary_totals_and_averages_online_devices():
+    summary = fleet()
+    summary.update([0], {"Power (P)": [100.0], "Temp (T)": [20.0]}, "a")
+    summary.update([0, 1000], {"Power (P)": [50.0, 300.0], "Temp (T)": [26.0, np.nan]}, "b")
+    summary.update([0], {"Power (P)": [1000.0], "Temp (T)": [90.0]}, "c")
+    summary.update([OFFLINE_AFTER + 1000], {"Power (P)": [np.nan]}, "a")  # "c" is offline by then
+
+    totals, devices = summary.overview(OFFLINE_AFTER + 1000)
+    assert totals["devices"] == 3 and totals["online"] == 2 and totals["alerting"] == 0
+    assert totals["kpis"] == {"Power (P)": 400.0, "Temp (T)": 23.0}  # The latest value of each channel
+    assert {device["device"]: device["online"] for device in devices} == {"a": True, "b": True, "c": False}
+
+
+def test_uptime_counts_the_minutes_reported_in():
+    summary = fleet()
+    for minute in (0, 1, 2, 5):
+        summary.update([minute * MINUTE + 10], {"Power (P)": [1.0]}, "a")
+    summary.update([5 * MINUTE], {"Power (P)": [1.0]}, "b")
+
+    _, devices = summary.overview(5 * MINUTE + 30_000)
+    uptime = {device["device"]: device["uptime"] for device in devices}
+    assert uptime == {"a": 4 / 6, "b": 1.0}
+
+
+def test_pages_list_alerting_then_offline_devices_first():
+    summary = fleet()
+    for i in range(10):
+        summary.update([0 if i % 3 else OFFLINE_AFTER * 2], {"Power (P)": [float(i)]}, f"d{i}")
+    summary.set_status("d4", "warning")
+    summary.set_status("d7", "critical")
+    summary.set_status("d2", "warning")
+    summary.set_status("d2", None)  # Resolved
+
+    _, devices = summary.overview(OFFLINE_AFTER * 2, limit=100)
+    order = [device["device"] for device in devices]
+    assert order == ["d7", "d4", "d1", "d2", "d5", "d8", "d0", "d3", "d6", "d9"]
+    assert [device["status"] for device in devices[:3]] == ["critical", "warning", None]
+
+    pages = [summary.overview(OFFLINE_AFTER * 2, offset, 3)[1] for offset in range(0, 10, 3)]
+    assert [device["device"] for page in pages for device in page] == order
+
+
+def test_sparkline_averages_buckets_and_leaves_gaps():
+    summary = fleet(spark_points=4, spark_bucket=1000)
+    summary.update([0, 500, 1000, 3000, 3500], {"Power (P)": [1.0, 3.0, 4.0, 8.0, 8.0]}, "a")
+    summary.update([200], {"Power (P)": [100.0]}, "a")  # Late, its bucket is closed
+
+    _, (device,) = summary.overview(3500)
+    # Buckets 0 to 3: means 2 and 4, a gap, then the open bucket
+    assert device["sparkline"] == sparkline_text([2.0, 4.0, np.nan, 8.0])
@@ -0,0 +1,97 @@
+import numpy as np
+
+from hvac_history import HistoryStore, Level, WindowCache, MIN, MAX, SUM, COUNT
+
+
+def buckets(level):
+    return level.times[:level.length].tolist(), level.stats[:level.length, 0].tolist()
+
+
+def test_samples_in_any_order_give_the_same_buckets():
+    rng = np.random.default_rng(0)
+    times = rng.integers(0, 100_000, 2000)
+    values = rng.normal(size=(2000, 1))
+    ordered = Level(1000, 1)
+    order = np.argsort(times, kind="stable")
+    ordered.extend(times[order], values[order])
+
+    shuffled = Level(1000, 1)
+    for part in np.array_split(rng.permutation(2000), 17):  # Late batches land before the last bucket
+        shuffled.extend(times[part], values[part])
+
+    assert shuffled.times[:shuffled.length].tolist() == ordered.times[:ordered.length].tolist()
+    assert np.allclose(shuffled.stats[:shuffled.length], ordered.stats[:ordered.length])
+
+
+def test_late_samples_merge_into_their_bucket_or_a_new_one():
+    level = Level(1000, 1)
+    level.extend(np.array([0, 3500, 5200]), np.array([[1.0], [2.0], [3.0]]))
+    level.extend(np.array([3100, 1700]), np.array([[4.0], [np.nan]]))
+
+    times, stats = buckets(level)
+    assert times == [0, 1000, 3000, 5000]
+    assert stats[1][COUNT] == 0 and np.isnan(stats[1][MIN])  # Only a missing value
+    assert stats[2][MIN] == 2.0 and stats[2][MAX] == 4.0 and stats[2][SUM] == 6.0 and stats[2][COUNT] == 2
+
+
+def test_levels_expire_their_oldest_buckets():
+    store = HistoryStore(["a"], levels=(1000, 10_000, 60_000), retention={1000: 20_000, 10_000: 100_000})
+    store.extend(np.arange(0, 300_000, 500), np.ones(600))
+
+    fine, middle, coarse = store.levels
+    assert 20 <= fine.length <= 25 and fine.times[fine.length - 1] == 299_000
+    assert 10 <= middle.length <= 12 and middle.times[middle.length - 1] == 290_000
+    assert coarse.length == 5 and coarse.expired is None
+    assert store.start == 0
+
+    # Windows reaching before what a level kept are served by a coarser one
+    assert store.level_for(10_000, max_points=100, start=290_000) is fine
+    assert store.level_for(10_000, max_points=100, start=200_000) is middle
+    assert store.level_for(10_000, max_points=100, start=0) is coarse
+
+
+def test_window_cache_serves_complete_pages_and_prefetches_the_next():
+    store = HistoryStore(["a"], levels=(1000,))
+    store.extend(np.arange(0, 100_000, 1000), np.arange(100.0))
+    cache = WindowCache(store)
+    queries = []
+    query = store.query
+    store.query = lambda *args: queries.append(args[1]) or query(*args)
+
+    level, times, mean, _, _ = cache.window("a", 10_000, 20_000)
+    assert times.tolist() == list(range(10_000, 20_000, 1000))
+    assert mean.tolist() == list(range(10, 20))
+    cache.page("a", level, 10_000, 3)  # Waits for the prefetch
+    assert sorted(queries) == [10_000, 20_000, 30_000]  # The window's pages and the next one
+
+    queries.clear()
+    cache.window("a", 10_000, 20_000)
+    cache.window("a", 20_000, 30_000)
+    assert set(queries) <= {40_000}  # Only the prefetch of the page after
+    cache.shutdown()
+
+
+def test_late_samples_invalidate_cached_pages():
+    store = HistoryStore(["a"], levels=(1000,))
+    store.extend(np.arange(0, 100_000, 1000), np.ones(100))
+    cache = WindowCache(store)
+    cache.window("a", 10_000, 20_000)
+
+    store.extend([15_000], [[4.0]])
+    _, times, mean, _, maximum = cache.window("a", 10_000, 20_000)
+    assert mean[times.tolist().index(15_000)] == 2.5 and maximum.max() == 4.0
+    cache.shutdown()
+
+
+def test_history_file_is_reloaded(tmp_path):
+    path = str(tmp_path / "history.csv")
+    store = HistoryStore(["a", "b"], path)
+    store.append(1000, {"a": 1.0}, "chiller-1")
+    store.append_batch([2000, 3000], {"a": [2.0, np.nan], "b": [5.0, 6.0]}, "chiller-2")
+    store.close()
+
+    loaded = HistoryStore(["a", "b"], path)
+    for channel in ("a", "b"):
+        for part, expected in zip(loaded.query(channel, 0, 4000, loaded.levels[0]),
+                                  store.query(channel, 0, 4000, store.levels[0])):
+            np.testing.assert_array_equal(part, expected)
@@ -0,0 +1,94 @@
+import numpy as np
+
+from hvac_preprocess import Preprocessor
+
+
+def test_redelivered_messages_are_dropped():
+    preprocessor = Preprocessor(["a"])
+    times, columns = preprocessor.process({"a": [1.0, 2.0, 2.0, 3.0]}, times=[0, 1, 1, 2], seq=[0, 1, 1, 2])
+    assert times.tolist() == [0, 1, 2]
+    assert columns["a"].tolist() == [1.0, 2.0, 3.0]
+
+    # Redelivered in a later batch, next to a new one and one without a sequence number
+    times, columns = preprocessor.process({"a": [2.0, 4.0, 5.0]}, times=[1, 3, 4], seq=[1, 3, np.nan])
+    assert times.tolist() == [3, 4]
+    assert columns["a"].tolist() == [4.0, 5.0]
+
+
+def test_values_are_clipped_to_limits():
+    preprocessor = Preprocessor(["a", "b"], limits={"a": (0, 10)})
+    _, columns = preprocessor.process({"a": [-5.0, 5.0, 50.0], "b": [-5.0, 5.0, 50.0]}, times=[0, 1, 2])
+    assert columns["a"].tolist() == [0.0, 5.0, 10.0]
+    assert columns["b"].tolist() == [-5.0, 5.0, 50.0]
+
+
+def test_outliers_are_clipped_to_sigma():
+    rng = np.random.default_rng(0)
+    values = rng.normal(100, 1, 1000)
+    values[500] = 1000
+    preprocessor = Preprocessor(["a"], sigma=6)
+    _, columns = preprocessor.process({"a": values})
+    assert columns["a"][500] < 110
+    assert np.array_equal(np.delete(columns["a"], 500), np.delete(values, 500))
+
+    # Later batches are clipped around the running statistics
+    _, columns = preprocessor.process({"a": [100.0, -1000.0]})
+    assert columns["a"][0] == 100.0 and 90 < columns["a"][1] < 100
+
+
+def test_arrivals_are_resampled_onto_the_grid():
+    preprocessor = Preprocessor(["a"], period=1000)
+    times, columns = preprocessor.process({"a": [1.0, 3.0, 5.0, 7.0]}, times=[100, 900, 1500, 2100])
+    # The bucket of 2100 may still get samples, it is held back
+    assert times.tolist() == [0, 1000]
+    assert columns["a"].tolist() == [2.0, 5.0]
+
+    times, columns = preprocessor.process({"a": [9.0, 11.0]}, times=[2900, 3200])
+    assert times.tolist() == [2000]
+    assert columns["a"].tolist() == [8.0]
+    times, columns = preprocessor.flush()
+    assert times.tolist() == [3000]
+    assert columns["a"].tolist() == [11.0]
+
+
+def test_short_gaps_are_interpolated():
+    preprocessor = Preprocessor(["a"], period=1000, max_gap=2)
+    times, columns = preprocessor.process({"a": [0.0, np.nan, np.nan, 3.0, 4.0]}, times=[0, 1000, 2000, 3000, 4000])
+    assert times.tolist() == [0, 1000, 2000, 3000]
+    assert columns["a"].tolist() == [0.0, 1.0, 2.0, 3.0]
+
+    # A grid point without arrivals is a gap too
+    times, columns = preprocessor.process({"a": [6.0, 7.0]}, times=[6000, 7000])
+    assert times.tolist() == [4000, 5000, 6000]
+    assert columns["a"].tolist() == [4.0, 5.0, 6.0]
+
+
+def test_long_gaps_are_kept():
+    preprocessor = Preprocessor(["a"], max_gap=2)
+    _, columns = preprocessor.process({"a": [0.0, np.nan, np.nan, np.nan, 4.0, 5.0]})
+    assert np.isnan(columns["a"][1:4]).all()
+    assert columns["a"][[0, 4, 5]].tolist() == [0.0, 4.0, 5.0]
+
+
+def test_trailing_gap_waits_for_the_next_batch():
+    preprocessor = Preprocessor(["a"], max_gap=3)
+    _, columns = preprocessor.process({"a": [1.0, 2.0, np.nan, np.nan]})
+    assert columns["a"].tolist() == [1.0, 2.0]
+    _, columns = preprocessor.process({"a": [5.0]})
+    assert columns["a"].tolist() == [3.0, 4.0, 5.0]
+
+
+def test_batches_give_the_rows_of_a_single_batch():
+    rng = np.random.default_rng(1)
+    times = np.sort(rng.uniform(0, 100_000, 500))
+    values = np.where(rng.uniform(size=500) < 0.1, np.nan, rng.normal(size=500))
+
+    def run(size):
+        preprocessor = Preprocessor(["a"], period=1000)
+        parts = [preprocessor.process({"a": values[i:i + size]}, times=times[i:i + size]) for i in range(0, 500, size)]
+        parts.append(preprocessor.flush())
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1]["a"] for part in parts])
+
+    (whole_times, whole), (batched_times, batched) = run(500), run(37)
+    assert np.array_equal(batched_times, whole_times)
+    assert np.allclose(batched, whole, equal_nan=True)
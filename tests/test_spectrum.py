@@ -0,0 +1,27 @@
+import numpy as np
+
+from hvac_spectrum import SpectralService
+
+RATE = 1_000
+
+
+def tone(frequency, start, samples):
+    t = (start + np.arange(samples)) / RATE
+    return np.sin(2 * np.pi * frequency * t)
+
+
+def test_devices_keep_their_own_streams():
+    spectral = SpectralService(["Vibration"], n_fft=256, hop=64)
+    tones = {"chiller-a": 50, "chiller-b": 200}
+    for i in range(10):  # Both devices send batches of the same times
+        for device, frequency in tones.items():
+            start = i * 500
+            spectral.extend(start * 1000 / RATE, RATE, {"Vibration": tone(frequency, start, 500)}, device)
+
+    assert spectral.devices() == ["chiller-a", "chiller-b"]
+    for device, frequency in tones.items():
+        stream = spectral.get("Vibration", device)
+        assert stream.count == (5000 - 256) // 64 + 1
+        freqs, power = stream.spectrum()
+        assert abs(freqs[np.argmax(power)] - frequency) < RATE / 256
+    assert spectral.get("Vibration") is None
@@ -0,0 +1,88 @@
+import pytest
+
+from hvac_spool import Spool
+
+
+def message(i, size=10):
+    return f"{i:0{size}d}".encode()
+
+
+def drain(spool, batch=3):
+    received = []
+    while len(spool):
+        payloads, position = spool.peek(batch)
+        received += payloads
+        spool.pop(payloads, position)
+    return received
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "spool.bin")
+
+
+def test_records_wrap_around_the_end(path):
+    spool = Spool(path, capacity=100)  # Seven 14 byte records
+    for i in range(5):
+        spool.append(message(i))
+    payloads, position = spool.peek(4)
+    spool.pop(payloads, position)
+    for i in range(5, 10):  # Written across the end of the data region
+        spool.append(message(i))
+    assert spool.dropped == 0
+    assert drain(spool) == [message(i) for i in range(4, 10)]
+    assert spool.size == 0
+
+
+def test_overflow_while_draining_drops_only_the_oldest(path):
+    spool = Spool(path, capacity=1000)  # 71 records
+    for i in range(70):
+        spool.append(message(i))
+    payloads, position = spool.peek(10)
+    for i in range(70, 78):  # Appended while the batch is being sent
+        spool.append(message(i))
+    assert spool.dropped == 7
+    spool.pop(payloads, position)  # Only the last three of the batch were still in the spool
+    assert drain(spool) == [message(i) for i in range(10, 78)]
+
+
+def test_overflow_past_a_whole_batch(path):
+    spool = Spool(path, capacity=1000)
+    for i in range(70):
+        spool.append(message(i))
+    payloads, position = spool.peek(5)
+    for i in range(70, 80):
+        spool.append(message(i))
+    spool.pop(payloads, position)
+    assert drain(spool) == [message(i) for i in range(9, 80)]
+
+
+def test_variable_length_records_survive_overflow_while_draining(path):
+    spool = Spool(path, capacity=1000)
+    sizes = [5 + (i * 7) % 40 for i in range(200)]
+    for i in range(40):
+        spool.append(message(i, sizes[i]))
+    received = []
+    for start in range(40, 200, 10):
+        payloads, position = spool.peek(6)
+        for i in range(start, start + 10):
+            spool.append(message(i, sizes[i]))
+        spool.pop(payloads, position)
+        received += payloads
+    received += drain(spool)
+    kept = [int(payload) for payload in received]
+    assert kept == sorted(set(kept))  # In order, none twice
+    assert kept[-1] == 199 and 200 - len(kept) <= spool.dropped
+
+
+def test_state_is_kept_across_restarts(path):
+    spool = Spool(path, capacity=100)
+    for i in range(8):
+        spool.append(message(i))
+    seq = spool.next_seq(3)
+    spool.close()
+
+    spool = Spool(path, capacity=100)
+    assert len(spool) == 7
+    assert spool.next_seq() == seq + 3
+    assert drain(spool) == [message(i) for i in range(1, 8)]
@@ -1,2 +1,3 @@
 Broker: mqtt.eclipseprojects.io
-Port: 1883
\ No newline at end of file
+Port: 1883
+Backend: paho
\ No newline at end of file